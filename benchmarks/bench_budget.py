@@ -0,0 +1,70 @@
+"""Cost of complexity budgets, and how early they stop oversized requests.
+
+Times ``sql_parse`` on requests far over a ``Budget`` (a long IN list, a
+deep tree, many conditions) with and without the budget, and on a normal
+request, where the budget is only overhead.
+
+    python benchmarks/bench_budget.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from jsonsql import Budget, JsonSQL  # noqa: E402
+
+BUDGET = Budget(max_depth=32, max_leaves=256, max_in_list=1000, max_joins=4,
+                max_items=64, max_order_by=8)
+
+
+def make_jsonsql(budget) -> JsonSQL:
+    return JsonSQL(
+        allowed_queries=["SELECT"],
+        allowed_items=["*"],
+        allowed_tables=["users"],
+        allowed_connections=["WHERE"],
+        allowed_columns={"id": int, "name": str},
+        template_cache_size=0,
+        budget=budget,
+    )
+
+
+def select(where):
+    return {"query": "SELECT", "items": ["*"], "from": "users", "where": where}
+
+
+def deep(depth):
+    logic = {"id": {"=": 0}}
+    for i in range(depth):
+        logic = {"AND" if i % 2 else "OR": [logic, {"name": {"=": str(i)}}]}
+    return logic
+
+
+CASES = {
+    "normal": select({"OR": [{"id": {"IN": [1, 2, 3]}}, {"name": {"=": "x"}}]}),
+    "IN list of 100000": select({"id": {"IN": list(range(100000))}}),
+    "depth 5000": select(deep(5000)),
+    "10000 conditions": select({"OR": [{"id": {"=": i}} for i in range(10000)]}),
+}
+
+
+def best(call, number: int) -> float:
+    """Best of several runs, in microseconds per call."""
+    return min(timeit.repeat(call, number=number, repeat=5)) / number * 1e6
+
+
+def main() -> None:
+    print(f"{'case':<20} {'no budget us':>13} {'budget us':>11}")
+    for name, request in CASES.items():
+        number = 20000 if name == "normal" else 5
+        times = []
+        for budget in (None, BUDGET):
+            jsonsql = make_jsonsql(budget)
+            times.append(best(lambda: jsonsql.sql_parse(request), number))
+        print(f"{name:<20} {times[0]:>13.1f} {times[1]:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
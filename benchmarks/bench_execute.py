@@ -0,0 +1,73 @@
+"""Peak memory of reading a large SQLite result: fetchall vs ``execute``.
+
+``JsonSQL.execute`` fetches rows in batches, so its peak memory should stay
+flat as the result grows, while ``fetchall`` grows with it.
+
+    python benchmarks/bench_execute.py
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from jsonsql import ConnectionPool, JsonSQL  # noqa: E402
+
+SIZES = (10000, 100000, 1000000)
+
+
+def build(path: str, rows: int) -> None:
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE events (id INTEGER, name TEXT)")
+    connection.executemany("INSERT INTO events VALUES (?, ?)",
+                           ((i, f"event {i}") for i in range(rows)))
+    connection.commit()
+    connection.close()
+
+
+def measure(function) -> tuple:
+    tracemalloc.start()
+    start = time.perf_counter()
+    count = function()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return count, seconds, peak
+
+
+def main() -> None:
+    jsonsql = JsonSQL(allowed_queries=["SELECT"], allowed_items=["*"],
+                      allowed_tables=["events"], allowed_columns={"id": int})
+    request = {"query": "SELECT", "items": ["*"], "from": "events",
+               "where": {"id": {">=": 0}}}
+    valid, sql, params = jsonsql.sql_parse(request)
+    assert valid
+
+    print(f"{'rows':>9} {'method':>9} {'seconds':>8} {'peak MiB':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in SIZES:
+            path = os.path.join(directory, f"events{size}.db")
+            build(path, size)
+
+            def fetchall():
+                connection = sqlite3.connect(path)
+                rows = connection.execute(sql, params).fetchall()
+                connection.close()
+                return len(rows)
+
+            with ConnectionPool(path, read_only=True, profile="read_heavy") as pool:
+                def execute():
+                    return sum(1 for _ in jsonsql.execute(request, pool))
+
+                for method, function in (("fetchall", fetchall), ("execute", execute)):
+                    count, seconds, peak = measure(function)
+                    assert count == size
+                    print(f"{size:>9} {method:>9} {seconds:>8.3f} {peak / 2 ** 20:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
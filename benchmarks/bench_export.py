@@ -0,0 +1,76 @@
+"""Streaming export of a large SQLite result to NDJSON/CSV, plain and gzipped.
+
+Exports ROWS rows (default 10 million) from a local SQLite file and reports
+throughput, then the peak memory traced while exporting the first
+TRACED_ROWS rows again (tracing is too slow for the full run). The peak is
+bounded by the batch size, so it does not grow with the result. Building
+the database takes a while the first time; it is kept in the temp directory.
+
+    python benchmarks/bench_export.py [ROWS]
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from jsonsql import ConnectionPool, JsonSQL  # noqa: E402
+
+BATCH_SIZE = 5000
+TRACED_ROWS = 500_000
+
+
+def build(path: str, rows: int) -> None:
+    if os.path.exists(path):
+        return
+    connection = sqlite3.connect(path + ".tmp")
+    connection.execute("CREATE TABLE events (id INTEGER, kind TEXT, amount REAL)")
+    connection.executemany("INSERT INTO events VALUES (?, ?, ?)",
+                           ((i, f"kind{i % 17}", i * 0.25) for i in range(rows)))
+    connection.commit()
+    connection.close()
+    os.replace(path + ".tmp", path)
+
+
+def export(jsonsql: JsonSQL, request: dict, pool: ConnectionPool, format: str,
+           compress: bool) -> int:
+    size = 0
+    for chunk in jsonsql.export(request, pool, format=format, compress=compress,
+                                batch_size=BATCH_SIZE):
+        size += len(chunk)
+    return size
+
+
+def main() -> None:
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+    path = os.path.join(tempfile.gettempdir(), f"jsonsql_bench_export_{rows}.db")
+    build(path, rows)
+
+    jsonsql = JsonSQL(allowed_queries=["SELECT"], allowed_items=["id", "kind", "amount"],
+                      allowed_tables=["events"], allowed_columns={"id": int})
+    request = {"query": "SELECT", "items": ["id", "kind", "amount"], "from": "events"}
+
+    print(f"{rows} rows, batch size {BATCH_SIZE}")
+    print(f"{'format':>12} {'seconds':>8} {'rows/s':>10} {'MiB out':>8} {'peak MiB':>9}")
+    with ConnectionPool(path, read_only=True, profile="read_heavy") as pool:
+        for format in ("ndjson", "csv"):
+            for compress in (False, True):
+                start = time.perf_counter()
+                size = export(jsonsql, request, pool, format, compress)
+                seconds = time.perf_counter() - start
+
+                tracemalloc.start()
+                export(jsonsql, {**request, "limit": TRACED_ROWS}, pool, format, compress)
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+
+                name = format + ("+gzip" if compress else "")
+                print(f"{name:>12} {seconds:>8.2f} {rows / seconds:>10.0f} "
+                      f"{size / 2 ** 20:>8.1f} {peak / 2 ** 20:>9.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Validation cost of large IN lists, per element.
+
+Members are type-checked in one pass over their set of types, so the time
+per element should stay small and flat, in strict and wildcard mode alike.
+
+    python benchmarks/bench_in_lists.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from jsonsql import JsonSQL  # noqa: E402
+
+SIZES = (1000, 10000, 100000)
+
+CONFIGS = {
+    "strict": {"id": int, "name": str},
+    "wildcard": {"*": object, "id": int, "name": str},
+}
+
+
+def main() -> None:
+    print(f"{'columns':>9} {'values':>6} {'elements':>9} {'ms/parse':>9} {'ns/element':>11}")
+    for config, columns in CONFIGS.items():
+        # No template cache, so every call validates
+        jsonsql = JsonSQL(allowed_columns=columns, template_cache_size=0)
+        for kind, make in (("int", lambda n: list(range(n))),
+                           ("str", lambda n: [f"v{i}" for i in range(n)])):
+            column = "id" if kind == "int" else "name"
+            for size in SIZES:
+                logic = {column: {"IN": make(size)}}
+                assert jsonsql.logic_parse(logic)[0]
+                number = max(1, 1000000 // size)
+                seconds = min(timeit.repeat(
+                    lambda: jsonsql.logic_parse(logic), number=number, repeat=3)) / number
+                print(f"{config:>9} {kind:>6} {size:>9} {seconds * 1e3:>9.2f} "
+                      f"{seconds / size * 1e9:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Early rejection of raw request bodies with ``sql_parse_bytes``.
+
+A request with a large IN list against a forbidden table is rejected from
+its bytes, compared with decoding it with ``json.loads`` and calling
+``sql_parse``. With the table ahead of the list, ``sql_parse_bytes`` stops
+there; with the table last, the list is scanned but not decoded. A valid
+request shows the cost of the scan when nothing is rejected.
+
+    python benchmarks/bench_ingest.py
+"""
+
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from jsonsql import JsonSQL  # noqa: E402
+
+jsonsql = JsonSQL(
+    allowed_queries=["SELECT"],
+    allowed_items=["*"],
+    allowed_tables=["users"],
+    allowed_connections=["WHERE"],
+    allowed_columns={"id": int},
+)
+
+
+def request_body(size: int, table: str, table_first: bool) -> bytes:
+    where = {"id": {"IN": list(range(size))}}
+    request = {"query": "SELECT", "items": ["*"], "from": table, "where": where}
+    if not table_first:
+        request["from"] = request.pop("from")
+    return json.dumps(request).encode()
+
+
+def best(call, number: int) -> float:
+    """Best of several runs, in milliseconds per call."""
+    return min(timeit.repeat(call, number=number, repeat=5)) / number * 1e3
+
+
+def main() -> None:
+    print(f"{'case':<36} {'IN size':>8} {'loads+parse ms':>15} {'bytes ms':>10}")
+    for size in (1000, 100_000, 1_000_000):
+        number = max(1, 100_000 // size)
+        for name, table, table_first in (("forbidden table, before the list", "admins", True),
+                                         ("forbidden table, after the list", "admins", False),
+                                         ("allowed table", "users", True)):
+            data = request_body(size, table, table_first)
+            assert jsonsql.sql_parse_bytes(data)[:2] == jsonsql.sql_parse(json.loads(data))[:2]
+            decoded = best(lambda: jsonsql.sql_parse(json.loads(data)), number)
+            scanned = best(lambda: jsonsql.sql_parse_bytes(memoryview(data)), number)
+            print(f"{name:<36} {size:>8} {decoded:>15.3f} {scanned:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Memory held per request: raw JSON dict vs the compiled IR ``Select``.
+
+Both are built from JSON text, as they would be when decoded from a request
+body, and measured with tracemalloc while a batch of them is kept alive.
+
+    python benchmarks/bench_ir_memory.py
+"""
+
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from jsonsql import JsonSQL  # noqa: E402
+
+COUNT = 10000
+
+REQUESTS = {
+    "legacy": {
+        "query": "SELECT",
+        "items": ["*"],
+        "table": "users",
+        "connection": "WHERE",
+        "logic": {"AND": [{"id": {">": 10}}, {"name": {"=": "alice"}}]},
+    },
+    "extended": {
+        "query": "SELECT",
+        "items": ["u.name", "r.role_name"],
+        "from": {"table": "users", "alias": "u"},
+        "joins": [{"type": "INNER JOIN", "table": "roles", "alias": "r",
+                   "on": "u.role_id = r.id"}],
+        "where": {"OR": [{"id": {"IN": [1, 2, 3, 4]}},
+                         {"age": {"BETWEEN": [18, 30]}}]},
+        "order_by": [{"column": "u.name", "direction": "ASC"}],
+        "limit": 10,
+    },
+}
+
+
+def measure(build) -> float:
+    """Average bytes retained per object returned by ``build``."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [build(i) for i in range(COUNT)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return (after - before) / COUNT
+
+
+def main() -> None:
+    jsonsql = JsonSQL(
+        allowed_queries=["SELECT"],
+        allowed_items=["*", "u.name", "r.role_name"],
+        allowed_tables=["users", "roles"],
+        allowed_connections=["WHERE"],
+        allowed_columns={"id": int, "name": str, "age": int},
+    )
+    print(f"{'request':>10} {'dict B':>8} {'IR B':>8} {'ratio':>6}")
+    for name, request in REQUESTS.items():
+        # Vary a literal so that equal strings are not shared between copies
+        text = json.dumps(request).replace("10", "{}")
+        assert jsonsql.sql_compile(json.loads(text.replace("{}", "1")))[0]
+        raw = measure(lambda i: json.loads(text.replace("{}", str(i))))
+        ir = measure(lambda i: jsonsql.sql_compile(
+            json.loads(text.replace("{}", str(i))))[1])
+        print(f"{name:>10} {raw:>8.0f} {ir:>8.0f} {ir / raw:>6.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Latency of one page at increasing depth: LIMIT/OFFSET vs keyset ``after``.
+
+OFFSET makes SQLite step over every earlier row, so its latency grows with
+the depth of the page; a keyset page seeks straight to its first row through
+the index and should cost the same at any depth. (SQLite only seeks on the
+whole row value if its last column is not the rowid, hence ``seq`` below.)
+
+    python benchmarks/bench_keyset.py
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from jsonsql import ConnectionPool, JsonSQL  # noqa: E402
+
+ROWS = 1_000_000
+PAGE = 50
+DEPTHS = (0, 10_000, 100_000, 500_000, 900_000)
+
+
+def build(path: str) -> None:
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE events (id INTEGER PRIMARY KEY, kind TEXT, seq INTEGER)")
+    connection.executemany("INSERT INTO events VALUES (?, ?, ?)",
+                           ((i, f"kind{i % 17}", i) for i in range(ROWS)))
+    connection.execute("CREATE INDEX events_kind_seq ON events (kind, seq)")
+    connection.commit()
+    connection.close()
+
+
+def main() -> None:
+    jsonsql = JsonSQL(allowed_queries=["SELECT"], allowed_items=["*"],
+                      allowed_tables=["events"], allowed_columns={"id": int, "kind": str, "seq": int})
+    orders = {
+        "id": (["id"], lambda row: {"id": row[0]}),
+        "kind,seq": (["kind", "seq"], lambda row: {"kind": row[1], "seq": row[2]}),
+    }
+
+    print(f"{'order':>8} {'depth':>8} {'offset ms':>10} {'after ms':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "events.db")
+        build(path)
+        with ConnectionPool(path, read_only=True) as pool:
+            for name, (order_by, key) in orders.items():
+                base = {"query": "SELECT", "items": ["*"], "from": "events",
+                        "order_by": order_by, "limit": PAGE}
+                for depth in DEPTHS:
+                    by_offset = {**base, "offset": depth}
+                    # The row just before the page, as the previous page would end
+                    previous = list(jsonsql.execute({**base, "offset": depth - 1, "limit": 1}, pool))
+                    by_key = {**base, "after": key(previous[0])} if depth else base
+                    assert (list(jsonsql.execute(by_offset, pool))
+                            == list(jsonsql.execute(by_key, pool)))
+
+                    timings = []
+                    for page in (by_offset, by_key):
+                        seconds = min(timeit.repeat(
+                            lambda: list(jsonsql.execute(page, pool)), number=5, repeat=3)) / 5
+                        timings.append(seconds * 1e3)
+                    print(f"{name:>8} {depth:>8} {timings[0]:>10.3f} {timings[1]:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""logic_parse cost for deeply nested AND/OR trees.
+
+logic_parse walks the tree with an explicit stack, so depth is not limited by
+the recursion limit and the cost per leaf stays constant as depth grows.
+
+    python benchmarks/bench_logic_depth.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from jsonsql import JsonSQL  # noqa: E402
+
+DEPTHS = (10, 100, 1000)
+
+
+def make_tree(depth: int) -> dict:
+    """Alternating AND/OR chain with one leaf per level plus a final pair."""
+    node = {"AND": [{"id": {"=": depth}}, {"name": {"IN": ["a", "b", "c"]}}]}
+    for level in range(depth - 1):
+        operator = "OR" if level % 2 else "AND"
+        node = {operator: [{"id": {">": level}}, node]}
+    return node
+
+
+def main() -> None:
+    jsonsql = JsonSQL(allowed_columns={"id": int, "name": str},
+                      template_cache_size=0)
+    print(f"{'depth':>6} {'leaves':>7} {'us/parse':>10} {'us/leaf':>8}")
+    for depth in DEPTHS:
+        tree = make_tree(depth)
+        assert jsonsql.logic_parse(tree)[0]
+        leaves = depth + 1
+        number = max(1, 20000 // leaves)
+        seconds = min(timeit.repeat(
+            lambda: jsonsql.logic_parse(tree), number=number, repeat=3))
+        per_parse = seconds / number * 1e6
+        print(f"{depth:>6} {leaves:>7} {per_parse:>10.1f} {per_parse / leaves:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Recording overhead of ``JsonSQL(metrics=Metrics())`` per request.
+
+Times cached and uncached ``sql_parse`` calls with and without a metrics
+registry, and ``Metrics.observe`` on its own. The end-to-end differences
+are printed for reference; the per-call cost of recording is then measured
+around a stub that returns at once, so the validation noise does not hide
+it, and checked against the budget of 1us per request; the script fails
+if it is over. The time of one dict increment is printed alongside, to
+tell a slow machine from a slow recorder.
+
+    python benchmarks/bench_metrics.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from jsonsql import JsonSQL, Metrics  # noqa: E402
+from jsonsql.metrics import bucket_stats  # noqa: E402
+
+REQUEST = {
+    "query": "SELECT",
+    "items": ["id", "name"],
+    "from": "users",
+    "where": {"OR": [{"id": {"IN": [1, 2, 3]}}, {"name": {"=": "x"}}]},
+}
+REJECTED = {**REQUEST, "from": "admins"}
+STATS = bucket_stats(2, (3,))
+
+BUDGET = 1.0
+
+
+def make_jsonsql(cache: int, metrics: bool) -> JsonSQL:
+    return JsonSQL(
+        allowed_queries=["SELECT"],
+        allowed_items=["id", "name"],
+        allowed_tables=["users"],
+        allowed_connections=["WHERE"],
+        allowed_columns={"id": int, "name": str},
+        template_cache_size=cache,
+        metrics=Metrics() if metrics else None,
+    )
+
+
+def best(call, number: int) -> float:
+    """Best of several runs, in microseconds per call."""
+    return min(timeit.repeat(call, number=number, repeat=7)) / number * 1e6
+
+
+def interleaved(calls, number: int, rounds: int = 20) -> list:
+    """Best time of each call, timed in turns so that drift hits them alike."""
+    times = [float("inf")] * len(calls)
+    for _ in range(rounds):
+        for i, call in enumerate(calls):
+            times[i] = min(times[i], timeit.timeit(call, number=number) / number * 1e6)
+    return times
+
+
+def main(number: int = 2000) -> None:
+    print(f"{'case':<22} {'off us':>8} {'on us':>8} {'overhead us':>12}")
+    for name, cache, request in (("valid, cached", 1024, REQUEST),
+                                 ("valid, uncached", 0, REQUEST),
+                                 ("rejected", 1024, REJECTED)):
+        off, on = make_jsonsql(cache, False), make_jsonsql(cache, True)
+        times = interleaved([lambda: off.sql_parse(request), lambda: on.sql_parse(request)],
+                            number)
+        print(f"{name:<22} {times[0]:>8.2f} {times[1]:>8.2f} {times[1] - times[0]:>12.2f}")
+
+    metrics = Metrics()
+    result = (True, "", ())
+    observe = best(lambda: metrics.observe("sql_parse", REQUEST, result, 1e-5, STATS),
+                   number * 10)
+    counts = {}
+    increment = best(lambda: counts.__setitem__("x", counts.get("x", 0) + 1), number * 10)
+    print(f"Metrics.observe: {observe:.2f}us "
+          f"(one dict increment on this machine: {increment * 1000:.0f}ns)")
+
+    # Everything sql_parse does for metrics: the clock, the stats hand-off
+    # and observe
+    jsonsql = make_jsonsql(0, True)
+
+    def stub(json_input, with_values, stats_out=None):
+        stats_out.append(STATS)
+        return result
+
+    bare, recorded = interleaved(
+        [lambda: stub(REQUEST, False, []),
+         lambda: jsonsql._measured("sql_parse", stub, REQUEST, False)], number * 10)
+    overhead = recorded - bare
+    print(f"recording overhead: {overhead:.2f}us per request (budget {BUDGET:.2f}us)")
+    assert overhead < BUDGET, f"recording takes {overhead:.2f}us, over {BUDGET:.2f}us"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Validation cost of sql_parse as the policy grows.
+
+With the precomputed PolicyIndex every lookup is a set/dict probe, so the
+time per request should stay flat from 10 to 10k policy entries. The
+"per-table" column gives every table its own column list, which each
+request's columns are also resolved against.
+
+    python benchmarks/bench_policy.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from jsonsql import JsonSQL  # noqa: E402
+
+SIZES = (10, 100, 1000, 10000)
+
+
+def make_jsonsql(size: int, per_table: bool = False) -> JsonSQL:
+    tables = [f"table_{i}" for i in range(size)]
+    columns = {f"col_{i}": int for i in range(size)}
+    if per_table:
+        tables = [{table: [f"col_{(i - j) % size}" for j in range(10)]}
+                  for i, table in enumerate(tables)]
+    return JsonSQL(
+        allowed_queries=["SELECT"],
+        allowed_items=list(columns),
+        allowed_tables=tables,
+        allowed_connections=["WHERE"],
+        allowed_columns=columns,
+        not_allowed_tables=[f"secret_{i}" for i in range(size)],
+        not_allowed_columns=[f"hidden_{i}" for i in range(size)],
+        # Time validation itself, not template cache hits
+        template_cache_size=0,
+    )
+
+
+def make_request(size: int) -> dict:
+    # Reference the last entries so a linear scan would have to walk the
+    # whole policy.
+    last = size - 1
+    return {
+        "query": "SELECT",
+        "items": [f"col_{last}", f"col_{last - 1}"],
+        "table": f"table_{last}",
+        "connection": "WHERE",
+        "logic": {f"col_{last}": {"=": last}},
+    }
+
+
+def main(number: int = 20000) -> None:
+    print(f"{'policy size':>12} {'us/request':>12} {'per-table':>12}")
+    for size in SIZES:
+        request = make_request(size)
+        times = []
+        for per_table in (False, True):
+            jsonsql = make_jsonsql(size, per_table)
+            assert jsonsql.sql_parse(request)[0], jsonsql.sql_parse(request)
+            times.append(min(timeit.repeat(
+                lambda: jsonsql.sql_parse(request), number=number, repeat=3)))
+        print(f"{size:>12} {times[0] / number * 1e6:>12.2f} {times[1] / number * 1e6:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
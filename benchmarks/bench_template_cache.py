@@ -0,0 +1,119 @@
+"""Template cache hits against misses and validation.
+
+For a legacy request, an extended request with joins and a ``logic_parse``
+tree, times a cache hit, a miss (validation and rendering, with the cache
+disabled) and validation alone (``sql_compile``/``logic_compile``). A hit
+has to beat both, since it stands in for them.
+
+With ``--baseline``, the ``sql_parse``/``logic_parse`` of another source
+tree (for example a release from before the cache) is timed as well, and a
+hit has to beat it too. The legacy case is only reported: releases before
+the cache render a single-condition legacy request in about the time a
+function call and a dict copy take, which no lookup can undercut.
+
+    python benchmarks/bench_template_cache.py
+    git archive <rev> src/jsonsql | tar -x -C /tmp/old
+    python benchmarks/bench_template_cache.py --baseline /tmp/old/src/jsonsql
+
+Exits with status 1 if a hit is slower than something it replaces.
+"""
+
+import argparse
+import importlib.util
+import os
+import sys
+import timeit
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from jsonsql import JsonSQL  # noqa: E402
+
+POLICY: Dict[str, Any] = dict(
+    allowed_queries=["SELECT"],
+    allowed_items=["*", "u.name", "r.role"],
+    allowed_tables=["users", "roles"],
+    allowed_connections=["WHERE"],
+    allowed_columns={"id": int, "name": str, "age": int, "u.id": int, "u.name": str,
+                     "r.id": int, "r.role": str},
+)
+
+LEGACY = {
+    "query": "SELECT",
+    "items": ["*"],
+    "table": "users",
+    "connection": "WHERE",
+    "logic": {"id": {"=": 1}},
+}
+EXTENDED = {
+    "query": "SELECT",
+    "items": ["u.name", "r.role"],
+    "from": {"table": "users", "alias": "u"},
+    "joins": [{"type": "LEFT JOIN", "table": "roles", "alias": "r", "on": "u.id = r.id"}],
+    "where": {"OR": [{"u.id": {"IN": [1, 2, 3]}},
+                     {"AND": [{"u.id": {">": 5}}, {"r.role": {"=": "x"}}]}]},
+    "order_by": ["u.name"],
+    "limit": 10,
+}
+LOGIC = {"AND": [{"id": {">": 1}}, {"OR": [{"name": {"=": "a"}}, {"age": {"<": 3}}]}]}
+
+
+def load_baseline(path: str) -> Any:
+    """Import the ``jsonsql`` package at ``path`` under another name."""
+    spec = importlib.util.spec_from_file_location(
+        "baseline_jsonsql", os.path.join(path, "__init__.py"),
+        submodule_search_locations=[path])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def interleaved(calls: List[Callable[[], Any]], number: int, rounds: int = 20) -> List[float]:
+    """Best time of each call in microseconds, timed in turns so that drift hits them alike."""
+    times = [float("inf")] * len(calls)
+    for _ in range(rounds):
+        for i, call in enumerate(calls):
+            times[i] = min(times[i], timeit.timeit(call, number=number) / number * 1e6)
+    return times
+
+
+def main(baseline: Optional[str] = None, number: int = 1000) -> int:
+    cached = JsonSQL(**POLICY)
+    uncached = JsonSQL(**POLICY, template_cache_size=0)
+    old = load_baseline(baseline).JsonSQL(**POLICY) if baseline else None
+
+    failures = []
+    print(f"{'case':<10} {'hit us':>8} {'miss us':>8} {'validate us':>12} {'baseline us':>12}")
+    for name, method, compile_method, request, against_baseline in (
+            ("legacy", "sql_parse", "sql_compile", LEGACY, False),
+            ("extended", "sql_parse", "sql_compile", EXTENDED, True),
+            ("logic", "logic_parse", "logic_compile", LOGIC, True)):
+        assert getattr(cached, method)(request)[0], name
+        calls = {
+            "hit": lambda: getattr(cached, method)(request),
+            "miss": lambda: getattr(uncached, method)(request),
+            "validation": lambda: getattr(uncached, compile_method)(request),
+        }
+        if old is not None:
+            calls["baseline"] = lambda: getattr(old, method)(request)
+        times = dict(zip(calls, interleaved(list(calls.values()), number)))
+        baseline_time = f"{times['baseline']:>12.2f}" if "baseline" in times else f"{'-':>12}"
+        print(f"{name:<10} {times['hit']:>8.2f} {times['miss']:>8.2f} "
+              f"{times['validation']:>12.2f} {baseline_time}")
+        checked = ("miss", "validation", "baseline") if against_baseline else ("miss", "validation")
+        failures += [f"{name}: hit {times['hit']:.2f}us is not faster than "
+                     f"{other} {times[other]:.2f}us"
+                     for other in checked if other in times and times["hit"] >= times[other]]
+
+    for failure in failures:
+        print(failure)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--baseline", help="path of another jsonsql package to compare with")
+    parser.add_argument("--number", type=int, default=1000, help="calls per timing")
+    args = parser.parse_args()
+    sys.exit(main(args.baseline, args.number))
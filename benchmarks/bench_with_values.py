@@ -0,0 +1,47 @@
+"""Cost of inlining literals (``with_values=True``) as the IN list grows.
+
+Renderer.inline splits the SQL at its placeholders once and joins the pieces
+in a single pass, so the time per parameter should stay flat. The previous
+``str.replace('?', ..., 1)`` loop rescanned the string for every parameter and
+is timed alongside for comparison.
+
+    python benchmarks/bench_with_values.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from jsonsql import JsonSQL  # noqa: E402
+
+SIZES = (100, 1000, 5000, 20000)
+
+
+def replace_loop(sql: str, params: tuple) -> str:
+    for param in params:
+        sql = sql.replace('?', str(param), 1)
+    return sql
+
+
+def main() -> None:
+    jsonsql = JsonSQL(allowed_columns={"id": int})
+    print(f"{'params':>8} {'inline us':>10} {'ns/param':>9} {'replace us':>11} {'ns/param':>9}")
+    for size in SIZES:
+        logic = {"id": {"IN": list(range(size))}}
+        _, sql, params = jsonsql.logic_parse(logic)
+        inline = jsonsql.renderer.inline
+        assert inline(sql, params) == replace_loop(sql, params)
+
+        number = max(1, 200000 // size)
+        fast = min(timeit.repeat(lambda: inline(sql, params), number=number, repeat=3)) / number
+        number = max(1, number // 10)
+        slow = min(timeit.repeat(lambda: replace_loop(sql, params),
+                                 number=number, repeat=3)) / number
+        print(f"{size:>8} {fast * 1e6:>10.1f} {fast / size * 1e9:>9.1f} "
+              f"{slow * 1e6:>11.1f} {slow / size * 1e9:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""Micro-benchmark suite for the parser's hot paths, with regression checks.
+
+Runs parameterized scenarios over ``logic_parse`` and ``sql_parse`` (with and
+without ``with_values``):
+
+- policy size: 10 to 10k entries, explicit and wildcard policies
+- nesting depth: 1 to 1000
+- IN-list length: 1 to 100k
+- join count: 0 to 16
+- with_values on and off, with and without the template cache
+
+For each scenario it reports ops/sec, p50/p99 latency of single calls and
+the peak memory allocated by one call (tracemalloc). Results can be saved as
+a JSON baseline; later runs are compared against it and the script exits
+with status 1 if a scenario's p50 latency or peak allocation regressed by
+more than the threshold. Baselines depend on the machine, so record them
+where they are checked.
+
+    python benchmarks/suite.py                    # run, compare if a baseline exists
+    python benchmarks/suite.py --save             # run and store the baseline
+    python benchmarks/suite.py --filter joins --threshold 0.5
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from jsonsql import JsonSQL  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+Scenario = Tuple[str, Callable[[], Any]]
+
+
+def _policy(size: int, wildcard: bool, cache: bool = False) -> JsonSQL:
+    columns = {f"col_{i}": int for i in range(size)}
+    tables = [f"table_{i}" for i in range(size)]
+    return JsonSQL(
+        allowed_queries=["SELECT"],
+        allowed_items=["*"] if wildcard else list(columns),
+        allowed_tables=["*"] if wildcard else tables,
+        allowed_connections=["WHERE"],
+        allowed_columns={"*": object, **columns} if wildcard else columns,
+        allowed_joins=["*"],
+        not_allowed_tables=[f"secret_{i}" for i in range(size)],
+        not_allowed_columns=[f"hidden_{i}" for i in range(size)],
+        template_cache_size=1024 if cache else 0,
+    )
+
+
+def _request(size: int) -> dict:
+    last = size - 1
+    return {
+        "query": "SELECT",
+        "items": ["col_0", f"col_{last}"],
+        "from": f"table_{last}",
+        "where": {"col_0": {">": 1}, f"col_{last}": {"IN": [1, 2, 3]}},
+        "order_by": ["col_0"],
+        "limit": 10,
+    }
+
+
+def _tree(depth: int) -> dict:
+    """Alternating AND/OR chain with one leaf per level."""
+    node = {"col_0": {"=": depth}}
+    for level in range(depth - 1):
+        node = {"OR" if level % 2 else "AND": [{"col_1": {">": level}}, node]}
+    return node
+
+
+def _joins(count: int) -> dict:
+    return {
+        "query": "SELECT",
+        "items": ["t0.col_0"],
+        "from": {"table": "table_0", "alias": "t0"},
+        "joins": [{"type": "LEFT JOIN", "table": f"table_{i}", "alias": f"t{i}",
+                   "on": f"t{i - 1}.col_0 = t{i}.col_1 AND t{i}.col_2 > 5"}
+                  for i in range(1, count + 1)],
+        "where": {"col_0": {"=": 1}},
+    }
+
+
+def scenarios() -> Iterator[Scenario]:
+    """Yield ``(name, call)`` for every scenario; ``call`` must succeed."""
+    for kind in ("explicit", "wildcard"):
+        for size in (10, 100, 1000, 10000):
+            jsonsql, request = _policy(size, kind == "wildcard"), _request(size)
+            yield f"policy/{kind}/{size}", lambda j=jsonsql, r=request: j.sql_parse(r)
+
+    jsonsql = _policy(10, False)
+    for depth in (1, 10, 100, 1000):
+        tree = _tree(depth)
+        yield f"depth/{depth}", lambda t=tree: jsonsql.logic_parse(t)
+
+    for length in (1, 100, 10000, 100000):
+        logic = {"col_0": {"IN": list(range(length))}}
+        yield f"in_list/{length}", lambda l=logic: jsonsql.logic_parse(l)
+
+    joined = _policy(32, False)
+    joined.ALLOWED_ITEMS = ["t0.col_0"]
+    for count in (0, 1, 4, 16):
+        request = _joins(count)
+        yield f"joins/{count}", lambda r=request: joined.sql_parse(r)
+
+    request = {"query": "SELECT", "items": ["col_0"], "from": "table_0",
+               "where": {"OR": [{"col_0": {"=": i}, "col_1": {"IN": ["a", f"b'{i}", None]}}
+                                for i in range(10)]}}
+    for cache in (False, True):
+        cached = _policy(10, False, cache)
+        cached.ALLOWED_COLUMNS = {**cached.ALLOWED_COLUMNS, "col_1": (str, type(None))}
+        for with_values in (False, True):
+            name = f"with_values/{'on' if with_values else 'off'}/{'cached' if cache else 'uncached'}"
+            yield name, lambda j=cached, w=with_values: j.sql_parse(request, with_values=w)
+
+
+def measure(call: Callable[[], Any], budget: float) -> Dict[str, float]:
+    """Time single calls for about ``budget`` seconds and trace one call."""
+    result = call()
+    if not result[0]:
+        raise AssertionError(f"scenario failed: {result[1]}")
+
+    samples: List[int] = []
+    deadline = time.perf_counter() + budget
+    clock = time.perf_counter_ns
+    while len(samples) < 5 or (time.perf_counter() < deadline and len(samples) < 100000):
+        start = clock()
+        call()
+        samples.append(clock() - start)
+
+    tracemalloc.start()
+    call()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    samples.sort()
+    return {
+        "ops_per_sec": len(samples) / (sum(samples) / 1e9),
+        "p50_us": samples[len(samples) // 2] / 1e3,
+        "p99_us": samples[min(len(samples) - 1, len(samples) * 99 // 100)] / 1e3,
+        "peak_bytes": peak,
+        "samples": len(samples),
+    }
+
+
+def regressions(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+                threshold: float) -> List[str]:
+    """Describe every scenario whose p50 or peak allocation grew past ``threshold``."""
+    found = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for metric in ("p50_us", "peak_bytes"):
+            # Small absolute differences are noise, not regressions
+            floor = 1.0 if metric == "p50_us" else 1024
+            if result[metric] > base[metric] * (1 + threshold) + floor:
+                found.append(f"{name}: {metric} {base[metric]:.1f} -> {result[metric]:.1f} "
+                             f"(+{(result[metric] / base[metric] - 1) * 100:.0f}%)")
+    return found
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE,
+                        help="baseline JSON file (default: %(default)s)")
+    parser.add_argument("--save", action="store_true",
+                        help="store the results as the baseline instead of comparing")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed relative regression (default: %(default)s)")
+    parser.add_argument("--filter", default="", help="only run scenarios containing this")
+    parser.add_argument("--budget", type=float, default=0.3,
+                        help="seconds of timing per scenario (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    results = {}
+    print(f"{'scenario':<34} {'ops/sec':>11} {'p50 us':>10} {'p99 us':>10} {'peak KiB':>9}")
+    for name, call in scenarios():
+        if args.filter not in name:
+            continue
+        result = measure(call, args.budget)
+        results[name] = result
+        print(f"{name:<34} {result['ops_per_sec']:>11.0f} {result['p50_us']:>10.1f} "
+              f"{result['p99_us']:>10.1f} {result['peak_bytes'] / 1024:>9.1f}")
+
+    if args.save:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as file:
+                baseline = json.load(file)["scenarios"]
+        baseline.update(results)
+        with open(args.baseline, "w") as file:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(),
+                       "scenarios": baseline}, file, indent=2, sort_keys=True)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save to record one")
+        return 0
+    with open(args.baseline) as file:
+        baseline = json.load(file)["scenarios"]
+    found = regressions(results, baseline, args.threshold)
+    for line in found:
+        print(f"REGRESSION {line}")
+    if found:
+        return 1
+    print(f"No regression past {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1 +1,8 @@
-from .jsonsql import JsonSQL
\ No newline at end of file
+from .budget import Budget
+from .cache import ResultCache
+from .capture import RequestCapture
+from .instrument import Instrumentation, PhaseCollector
+from .jsonsql import JsonSQL
+from .metrics import Metrics
+from .pool import ConnectionPool, PoolProfile
+from .schema import Schema
@@ -0,0 +1,138 @@
+"""Complexity budgets for requests (see ``JsonSQL(budget=...)``).
+
+A ``Budget`` bounds the size of what ``sql_parse`` and ``logic_parse``
+accept. Each limit is checked while the request is validated, before the
+part it bounds is walked, so an oversized request is rejected as soon as it
+goes over and the rest of it is never looked at. The rejection message
+starts with "Budget exceeded" and tells which limit was hit, where, and how
+far validation had got:
+
+    Budget exceeded: max_leaves=100 in where (101 conditions, depth 3; passed: items, tables)
+"""
+
+from typing import Dict, List, Literal, Optional
+
+LIMITS = ("max_depth", "max_leaves", "max_in_list", "max_joins", "max_items",
+          "max_order_by")
+
+
+class Budget:
+    """Limits on the size of a request; None means unbounded.
+
+    Args:
+        max_depth (int, optional): Nesting depth of each logic tree: one for
+            a single condition plus one per AND/OR group (including the
+            implicit AND of a node with several columns).
+        max_leaves (int, optional): Comparisons in all the logic trees of a
+            request together (WHERE and HAVING); a column with several
+            comparators counts each of them.
+        max_in_list (int, optional): Values of each IN list.
+        max_joins (int, optional): Entries of ``joins``.
+        max_items (int, optional): Entries of ``items``.
+        max_order_by (int, optional): Entries of ``order_by``.
+
+    Budgets are read-only; assign a new one to ``JsonSQL.budget`` to change
+    the limits, so that cached templates are dropped.
+
+    Raises:
+        ValueError: If a limit is not a positive int or None.
+    """
+
+    __slots__ = LIMITS
+
+    def __init__(
+        self,
+        max_depth: Optional[int] = None,
+        max_leaves: Optional[int] = None,
+        max_in_list: Optional[int] = None,
+        max_joins: Optional[int] = None,
+        max_items: Optional[int] = None,
+        max_order_by: Optional[int] = None
+    ):
+        values = (max_depth, max_leaves, max_in_list, max_joins, max_items, max_order_by)
+        for name, value in zip(LIMITS, values):
+            if value is not None and (type(value) is not int or value < 1):
+                raise ValueError(f"{name} must be a positive int or None, got {value!r}")
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name: str, value: object) -> None:
+        raise AttributeError("Budget is read-only")
+
+    def __reduce__(self) -> tuple:
+        return Budget, tuple(getattr(self, name) for name in LIMITS)
+
+    def __repr__(self) -> str:
+        limits = ", ".join(f"{name}={getattr(self, name)}" for name in LIMITS
+                           if getattr(self, name) is not None)
+        return f"Budget({limits})"
+
+    def to_dict(self) -> Dict[str, Optional[int]]:
+        return {name: getattr(self, name) for name in LIMITS}
+
+
+class BudgetTracker:
+    """Progress of one request against a ``Budget``.
+
+    Validation reports the section it enters (``enter``) and what it is
+    about to walk (``check``, ``leaves``, ``depth``); the first limit that
+    is exceeded gives the rejection. Without a budget nothing is rejected,
+    and the tracker only gathers the logic depth and IN-list sizes that
+    ``metrics`` record.
+    """
+
+    __slots__ = ("budget", "section", "passed", "conditions", "deepest", "sizes")
+
+    def __init__(self, budget: Optional[Budget]):
+        self.budget = budget
+        self.section: Optional[str] = None
+        self.passed: List[str] = []
+        self.conditions = 0
+        self.deepest = 0
+        # Lengths of the validated IN lists
+        self.sizes: List[int] = []
+
+    def enter(
+        self, section: str, limit: Optional[str] = None, size: int = 0
+    ) -> Optional[tuple[Literal[False], str]]:
+        """Start validating ``section``, the previous one having passed.
+
+        Returns:
+            The rejection if ``size`` entries are over ``limit``, else None.
+        """
+        if self.budget is None:
+            return None
+        if self.section is not None and self.section not in self.passed:
+            self.passed.append(self.section)
+        self.section = section
+        return None if limit is None else self.check(limit, size)
+
+    def check(self, limit: str, size: int) -> Optional[tuple[Literal[False], str]]:
+        """Rejection if ``size`` is over ``limit``, else None."""
+        if self.budget is None:
+            return None
+        maximum = getattr(self.budget, limit)
+        if maximum is not None and size > maximum:
+            return False, self.message(limit, maximum)
+        return None
+
+    def leaves(self, count: int) -> Optional[tuple[Literal[False], str]]:
+        """Count ``count`` more comparisons; rejection if over ``max_leaves``."""
+        self.conditions += count
+        if self.budget is None:
+            return None
+        return self.check("max_leaves", self.conditions)
+
+    def depth(self, depth: int) -> Optional[tuple[Literal[False], str]]:
+        """Record a logic group at ``depth``; rejection if over ``max_depth``."""
+        if depth > self.deepest:
+            self.deepest = depth
+        if self.budget is None:
+            return None
+        return self.check("max_depth", depth)
+
+    def message(self, limit: str, maximum: int) -> str:
+        progress = []
+        if self.conditions or self.deepest:
+            progress.append(f"{self.conditions} conditions, depth {self.deepest}")
+        progress.append("passed: " + (", ".join(self.passed) or "nothing"))
+        return f"Budget exceeded: {limit}={maximum} in {self.section} ({'; '.join(progress)})"
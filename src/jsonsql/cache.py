@@ -0,0 +1,285 @@
+import marshal
+import pickle
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+
+class Uncacheable(Exception):
+    """Raised while fingerprinting a request whose shape cannot be cached."""
+
+
+# marshal formats from version 3 on share repeated objects depending on their
+# reference counts, so equal values would not always give equal bytes
+_MARSHAL_VERSION = 2
+
+
+def fingerprint(value: Any) -> bytes:
+    """Return an exact fingerprint of a decoded JSON value.
+
+    The value is serialized with ``marshal``, in C: types are tagged (``1``,
+    ``1.0``, ``True`` and ``"1"`` differ), key order is kept, since it
+    decides the order of the rendered SQL, and the bytes decode back to the
+    value, so two values only share a fingerprint if they are equal and of
+    the same types.
+
+    Raises:
+        Uncacheable: If the value holds something marshal does not write,
+            such as instances of other classes or subclasses of dict and list.
+    """
+    try:
+        return marshal.dumps(value, _MARSHAL_VERSION)
+    except ValueError:
+        raise Uncacheable(type(value).__name__) from None
+
+
+def _tags(tables: Iterable[str]) -> Tuple[str, ...]:
+    """The invalidation tags of ``tables``, without duplicates.
+
+    A table is tagged by its unquoted, lowercased name without the schema,
+    so that ``main.Users``, ``"users"`` and ``users`` share one tag. Tables
+    of the same name in two schemas do too, which only drops some entries
+    more often than needed.
+    """
+    return tuple(dict.fromkeys(
+        table.rpartition(".")[2].strip('"`[]').lower() for table in tables))
+
+
+class TemplateCache:
+    """Thread-safe bounded LRU mapping of request shapes to SQL templates.
+
+    Args:
+        capacity (int): Maximum number of templates kept. 0 disables caching.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        if not isinstance(capacity, int) or capacity < 0:
+            raise ValueError(f"Invalid cache capacity: {capacity}")
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached template for ``key`` or None, counting the lookup."""
+        entries = self._entries
+        with self._lock:
+            value = entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            entries.move_to_end(key)
+            self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Store ``value`` under ``key``, evicting the least recently used entry."""
+        if self.capacity == 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop every entry. Counters are kept."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss/eviction counters along with size and capacity."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+            "capacity": self.capacity,
+        }
+
+
+class ResultCache:
+    """Thread-safe cache of query results, invalidated per table.
+
+    Entries are keyed by database and ``(sql, params)``, and tagged with the
+    tables the request reads, so that a write to a table drops exactly the
+    entries that depend on it. Table names are compared without schema,
+    quotes or case (see ``_tags``). Rows are stored pickled (optionally
+    zlib-compressed), which makes their size exact for the byte budget.
+
+    Args:
+        capacity (int): Maximum number of entries. 0 disables caching.
+        max_bytes (int): Budget for the stored payloads; least recently used
+            entries are evicted to stay under it.
+        ttl (Optional[float]): Seconds an entry stays valid; None keeps it
+            until it is evicted or invalidated.
+        compress (bool): zlib-compress payloads.
+        max_rows (int): Results with more rows are not cached, which also
+            bounds the rows held while a result is collected.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 1024,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl: Optional[float] = None,
+        compress: bool = False,
+        max_rows: int = 100_000
+    ):
+        for name, value in (("capacity", capacity), ("max_bytes", max_bytes),
+                            ("max_rows", max_rows)):
+            if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+                raise ValueError(f"Invalid cache {name}: {value}")
+        if ttl is not None and (not isinstance(ttl, (int, float)) or ttl <= 0):
+            raise ValueError(f"Invalid cache ttl: {ttl}")
+        self.capacity = capacity
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.compress = compress
+        self.max_rows = max_rows
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.bytes = 0
+        # key -> (payload, tables, expires)
+        self._entries: "OrderedDict[Hashable, Tuple[bytes, Tuple[str, ...], Optional[float]]]" = \
+            OrderedDict()
+        self._tags: Dict[str, Set[Hashable]] = {}
+        # Bumped by every invalidation, so that a result read before a write
+        # but stored after it is discarded
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def key(database: Any, sql: str, params: Any) -> Optional[Hashable]:
+        """Return the cache key of a statement, or None if it cannot be cached."""
+        if isinstance(params, dict):
+            params = tuple(sorted(params.items()))
+        key = (database, sql, params)
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def get(self, key: Hashable) -> Optional[Tuple[Any, List[tuple]]]:
+        """Return ``(description, rows)`` cached under ``key`` or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] is not None and entry[2] <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        payload = entry[0]
+        if self.compress:
+            payload = zlib.decompress(payload)
+        return pickle.loads(payload)
+
+    def generation(self, tables: Iterable[str]) -> Tuple[int, ...]:
+        """Snapshot the invalidation counters of ``tables`` (see ``put``)."""
+        tables = _tags(tables)
+        with self._lock:
+            return tuple(self._generations.get(table, 0) for table in tables)
+
+    def put(self, key: Hashable, description: Any, rows: List[tuple],
+            tables: Tuple[str, ...], generation: Tuple[int, ...]) -> bool:
+        """Store a result read from ``tables``.
+
+        ``generation`` is the ``generation(tables)`` taken before the query
+        ran; if one of the tables has been invalidated since, the result may
+        be stale and is not stored.
+
+        Returns:
+            True if the result was stored.
+        """
+        if self.capacity == 0 or len(rows) > self.max_rows:
+            return False
+        payload = pickle.dumps((description, rows), protocol=pickle.HIGHEST_PROTOCOL)
+        if self.compress:
+            payload = zlib.compress(payload)
+        if len(payload) > self.max_bytes:
+            return False
+        expires = None if self.ttl is None else time.monotonic() + self.ttl
+        tables = _tags(tables)
+
+        with self._lock:
+            if tuple(self._generations.get(table, 0) for table in tables) != generation:
+                return False
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (payload, tables, expires)
+            self.bytes += len(payload)
+            for table in tables:
+                self._tags.setdefault(table, set()).add(key)
+            while len(self._entries) > self.capacity or self.bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+        return True
+
+    def invalidate(self, *tables: str) -> int:
+        """Drop every entry that reads one of ``tables``.
+
+        Call it after writing to a table other than through ``JsonSQL``,
+        which invalidates its own writes.
+
+        Returns:
+            The number of entries dropped.
+        """
+        dropped = 0
+        with self._lock:
+            for table in _tags(tables):
+                self._generations[table] = self._generations.get(table, 0) + 1
+                for key in list(self._tags.get(table, ())):
+                    self._remove(key)
+                    dropped += 1
+            self.invalidations += dropped
+        return dropped
+
+    def _remove(self, key: Hashable) -> None:
+        payload, tables, _ = self._entries.pop(key)
+        self.bytes -= len(payload)
+        for table in tables:
+            keys = self._tags.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[table]
+
+    def clear(self) -> None:
+        """Drop every entry. Counters are kept."""
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss/eviction counters along with size and budgets."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "size": len(self._entries),
+            "capacity": self.capacity,
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+        }
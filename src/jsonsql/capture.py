@@ -0,0 +1,150 @@
+"""Sampled capture of incoming requests (see ``JsonSQL(capture=...)``).
+
+The log is JSONL with one compact request per line, the input format of
+``python -m jsonsql`` and of the load generator ``python -m jsonsql.replay``.
+Paths ending in ``.gz`` are gzip-compressed.
+"""
+
+import gzip
+import json
+import random
+import threading
+from typing import IO, Any, Dict, Iterator, List, Optional, Union
+
+
+def _open(path: str, mode: str) -> IO:
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "b")
+    return open(path, mode + "b")
+
+
+def _plain(value: Any) -> Any:
+    """JSON form of the list-like operands ``JsonSQL`` accepts besides lists."""
+    if isinstance(value, (range, tuple)):
+        return list(value)
+    tolist = getattr(value, "tolist", None)  # array.array, NumPy arrays
+    if tolist is not None:
+        return tolist()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class RequestCapture:
+    """Thread-safe sampler that appends requests to a JSONL log.
+
+    Args:
+        target (Union[str, IO[bytes]]): Path of the log, opened for appending,
+            or a binary stream to write to.
+        sample_rate (float): Fraction of requests recorded, in (0, 1].
+        max_requests (Optional[int]): Stop recording after this many.
+        seed (Optional[int]): Seed of the sampler, for reproducible samples.
+        buffer_size (int): Bytes of serialized requests held before they are
+            written out together. 0 writes each request as it is recorded.
+
+    Requests are serialized outside the lock, and only appended to a buffer
+    under it, so that recording does not make concurrent requests wait on
+    each other or on the file. The buffer is written when it is full, and
+    by ``flush`` and ``close``.
+
+    Recording never fails the request: requests that cannot be written as
+    JSON are counted in ``skipped`` instead.
+    """
+
+    def __init__(
+        self,
+        target: Union[str, IO[bytes]],
+        sample_rate: float = 1.0,
+        max_requests: Optional[int] = None,
+        seed: Optional[int] = None,
+        buffer_size: int = 64 * 1024
+    ):
+        if isinstance(sample_rate, bool) or not isinstance(sample_rate, (int, float)) \
+                or not 0 < sample_rate <= 1:
+            raise ValueError(f"sample_rate must be in (0, 1], got {sample_rate!r}")
+        if max_requests is not None and (not isinstance(max_requests, int)
+                                         or isinstance(max_requests, bool) or max_requests < 0):
+            raise ValueError(f"max_requests must be a non-negative int, got {max_requests!r}")
+        if not isinstance(buffer_size, int) or isinstance(buffer_size, bool) or buffer_size < 0:
+            raise ValueError(f"buffer_size must be a non-negative int, got {buffer_size!r}")
+        self.sample_rate = sample_rate
+        self.max_requests = max_requests
+        self.seen = 0
+        self.recorded = 0
+        self.skipped = 0
+        self.buffer_size = buffer_size
+        self._buffer: List[bytes] = []
+        self._buffered = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._owned = isinstance(target, str)
+        self._stream = _open(target, "a") if self._owned else target
+
+    def record(self, json_input: Any) -> bool:
+        """Sample one request; return whether it was recorded."""
+        with self._lock:
+            self.seen += 1
+            if self._stream is None or (self.max_requests is not None
+                                        and self.recorded >= self.max_requests):
+                return False
+            if self.sample_rate < 1 and self._random.random() >= self.sample_rate:
+                return False
+            # Hold the slot while serializing, so max_requests is not overrun
+            self.recorded += 1
+        try:
+            line = json.dumps(json_input, separators=(",", ":"), default=_plain,
+                              allow_nan=False).encode("utf-8") + b"\n"
+        except (TypeError, ValueError):
+            line = None
+        with self._lock:
+            if line is None or self._stream is None:
+                self.recorded -= 1
+                if line is None:
+                    self.skipped += 1
+                return False
+            self._buffer.append(line)
+            self._buffered += len(line)
+            if self._buffered >= self.buffer_size:
+                self._write()
+        return True
+
+    def _write(self) -> None:
+        """Write the buffered requests to the stream; called under the lock."""
+        if self._buffer:
+            self._stream.write(b"".join(self._buffer))
+            self._buffer.clear()
+            self._buffered = 0
+
+    def flush(self) -> None:
+        """Write the buffered requests and flush the stream."""
+        with self._lock:
+            if self._stream is not None:
+                self._write()
+                self._stream.flush()
+
+    def close(self) -> None:
+        """Flush the log and stop recording; a path given as target is closed."""
+        with self._lock:
+            if self._stream is None:
+                return
+            self._write()
+            if self._owned:
+                self._stream.close()
+            else:
+                self._stream.flush()
+            self._stream = None
+
+    def __enter__(self) -> "RequestCapture":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def stats(self) -> Dict[str, int]:
+        return {"seen": self.seen, "recorded": self.recorded, "skipped": self.skipped}
+
+
+def read_log(path: str) -> Iterator[bytes]:
+    """Yield the non-blank lines of a request log, decompressing ``.gz`` files."""
+    with _open(path, "r") as file:
+        for line in file:
+            if line.strip():
+                yield line
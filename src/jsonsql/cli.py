@@ -0,0 +1,208 @@
+"""Offline compiler for JSONL request logs.
+
+    python -m jsonsql requests.jsonl --config policy.json -o compiled.ndjson
+
+Each input line is one ``sql_parse`` request. Each output line is either
+``{"valid": true, "sql": ..., "params": [...]}`` (an object for named
+paramstyles) or
+``{"valid": false, "error": ...}``, in input order. The work is sharded over a
+process pool in which every worker builds the policy once; the input is
+streamed, with at most a few chunks per worker in flight.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from .budget import Budget
+from .jsonsql import JsonSQL
+from .metrics import rejection_reason
+from .schema import TYPE_NAMES
+
+_jsonsql: Optional[JsonSQL] = None
+_with_values = False
+
+
+def load_config(path: str) -> Dict[str, Any]:
+    """Load JsonSQL constructor arguments from a JSON file.
+
+    ``allowed_columns`` maps column names to a type name (see ``TYPE_NAMES``)
+    or a list of type names, as do the ``{table: {column: type}}`` entries
+    of ``allowed_tables``. ``budget`` is an object of ``Budget`` arguments.
+
+    Raises:
+        ValueError: If a column type name or a budget limit is invalid.
+    """
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+
+    if "allowed_columns" in config:
+        config["allowed_columns"] = _column_types(config["allowed_columns"])
+    tables = config.get("allowed_tables")
+    if isinstance(tables, list):
+        config["allowed_tables"] = [
+            {name: _column_types(columns) for name, columns in table.items()}
+            if isinstance(table, dict) and isinstance(next(iter(table.values()), None), dict)
+            else table
+            for table in tables]
+    if config.get("budget") is not None:
+        config["budget"] = Budget(**config["budget"])
+    return config
+
+
+def _column_types(type_names: Dict[str, Any]) -> Dict[str, Any]:
+    """Resolve ``{column: type name or [type names]}`` to Python types."""
+    columns = {}
+    for column, type_name in type_names.items():
+        names = type_name if isinstance(type_name, list) else [type_name]
+        try:
+            types = tuple(TYPE_NAMES[name] for name in names)
+        except KeyError as e:
+            raise ValueError(f"Unknown column type for {column}: {e.args[0]}") from None
+        columns[column] = types[0] if len(types) == 1 else types
+    return columns
+
+
+def _init_worker(config: Dict[str, Any], with_values: bool) -> None:
+    global _jsonsql, _with_values
+    _jsonsql = JsonSQL(**config)
+    _with_values = with_values
+
+
+def _compile_chunk(lines: List[bytes]) -> Tuple[bytes, Counter]:
+    """Compile a chunk of JSONL lines into NDJSON output and rejection counts."""
+    output = []
+    reasons: Counter = Counter()
+    for line in lines:
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            result = (False, f"Invalid JSON: {e}", ())
+        else:
+            result = _jsonsql.sql_parse(request, with_values=_with_values)
+
+        if result[0]:
+            params = result[2]
+            record = {"valid": True, "sql": result[1],
+                      "params": params if isinstance(params, dict) else list(params)}
+        else:
+            record = {"valid": False, "error": result[1]}
+            reasons[rejection_reason(result[1])] += 1
+        output.append(json.dumps(record, default=str))
+    output.append("")
+    return "\n".join(output).encode("utf-8"), reasons
+
+
+def _read_chunks(stream: BinaryIO, chunk_size: int) -> Iterator[List[bytes]]:
+    lines = (line for line in stream if line.strip())
+    while True:
+        chunk = list(islice(lines, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def compile_stream(
+    source: BinaryIO,
+    sink: BinaryIO,
+    config: Dict[str, Any],
+    workers: int = None,
+    chunk_size: int = 1000,
+    with_values: bool = False
+) -> Dict[str, Any]:
+    """Compile every request in ``source`` and write NDJSON to ``sink``.
+
+    Returns:
+        dict: Summary with ``requests``, ``valid``, ``rejected``, ``seconds``,
+        ``requests_per_second`` and a ``reasons`` Counter.
+    """
+    workers = workers or os.cpu_count() or 1
+    max_pending = workers * 4
+    totals: Counter = Counter()
+    requests = 0
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(
+        workers, initializer=_init_worker, initargs=(config, with_values)
+    ) as pool:
+        pending = deque()
+
+        def drain_one():
+            output, reasons = pending.popleft().result()
+            sink.write(output)
+            totals.update(reasons)
+
+        for chunk in _read_chunks(source, chunk_size):
+            requests += len(chunk)
+            pending.append(pool.submit(_compile_chunk, chunk))
+            if len(pending) >= max_pending:
+                drain_one()
+        while pending:
+            drain_one()
+
+    seconds = time.perf_counter() - start
+    rejected = sum(totals.values())
+    return {
+        "requests": requests,
+        "valid": requests - rejected,
+        "rejected": rejected,
+        "seconds": seconds,
+        "requests_per_second": requests / seconds if seconds else 0.0,
+        "reasons": totals,
+    }
+
+
+def format_summary(summary: Dict[str, Any], top: int = 10) -> str:
+    lines = [
+        f"requests: {summary['requests']}  valid: {summary['valid']}  "
+        f"rejected: {summary['rejected']}",
+        f"elapsed: {summary['seconds']:.2f}s  "
+        f"throughput: {summary['requests_per_second']:.0f} requests/s",
+    ]
+    for reason, count in summary["reasons"].most_common(top):
+        lines.append(f"{count:>10}  {reason}")
+    return "\n".join(lines)
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m jsonsql",
+        description="Validate and compile a JSONL log of JsonSQL requests.")
+    parser.add_argument("input", nargs="?", default="-",
+                        help="JSONL file of requests, '-' for stdin (default)")
+    parser.add_argument("-c", "--config", required=True,
+                        help="JSON file of JsonSQL constructor arguments")
+    parser.add_argument("-o", "--output", default="-",
+                        help="NDJSON output file, '-' for stdout (default)")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="worker processes (default: all cores)")
+    parser.add_argument("--chunk-size", type=int, default=1000,
+                        help="requests per work unit (default: 1000)")
+    parser.add_argument("--with-values", action="store_true",
+                        help="inline parameter values into the SQL")
+    parser.add_argument("--top", type=int, default=10,
+                        help="rejection reasons to list in the summary")
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config)
+    source = sys.stdin.buffer if args.input == "-" else open(args.input, "rb")
+    sink = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    try:
+        summary = compile_stream(source, sink, config, args.workers,
+                                 args.chunk_size, args.with_values)
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+        if sink is not sys.stdout.buffer:
+            sink.close()
+        else:
+            sink.flush()
+
+    print(format_summary(summary, args.top), file=sys.stderr)
+    return 0
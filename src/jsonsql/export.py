@@ -0,0 +1,102 @@
+"""Streaming NDJSON/CSV export of result rows (see ``JsonSQL.export``).
+
+Rows are encoded one fetch batch at a time into byte chunks, so memory is
+bounded by the batch size rather than by the size of the result. Chunks can
+be gzip-compressed incrementally.
+"""
+
+import base64
+import csv
+import io
+import json
+import re
+import zlib
+from itertools import islice
+from typing import Any, Iterable, Iterator, Optional, Sequence, Tuple
+
+EXPORT_FORMATS = ("ndjson", "csv")
+
+# "COUNT(u.id) as user_count" -> "user_count"
+_ALIAS = re.compile(r"\s+AS\s+([^\s]+)\s*$", re.IGNORECASE)
+
+
+def column_names(items: Sequence[str]) -> Optional[Tuple[str, ...]]:
+    """Return the result column names of validated ``items``.
+
+    An item's name is its ``AS`` alias if it has one, otherwise the item as
+    written (``"u.name"``, ``"COUNT(*)"``).
+
+    Returns:
+        The names, or None if an item is a wildcard (``*``, ``u.*``) whose
+        columns are only known once the query runs.
+    """
+    names = []
+    for item in items:
+        if item == "*" or item.endswith(".*"):
+            return None
+        alias = _ALIAS.search(item)
+        names.append(alias.group(1) if alias else item.strip())
+    return tuple(names)
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return base64.b64encode(value).decode("ascii")
+    return str(value)
+
+
+_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"),
+                            default=_json_default)
+
+
+def ndjson_chunks(rows: Iterable[tuple], columns: Sequence[str],
+                  batch_size: int = 1000) -> Iterator[bytes]:
+    """Encode rows as NDJSON, one object per line keyed by ``columns``.
+
+    ``columns`` is read when the first batch has been fetched, so it may be
+    filled in by the query itself (see ``Plan.execute``'s ``describe``).
+    Blobs are base64-encoded; other values JSON cannot represent are written
+    as strings.
+    """
+    rows = iter(rows)
+    encode = _ENCODER.encode
+    batch = list(islice(rows, batch_size))
+    while batch:
+        keys = tuple(columns)
+        lines = [encode(dict(zip(keys, row))) for row in batch]
+        lines.append("")
+        yield "\n".join(lines).encode("utf-8")
+        batch = list(islice(rows, batch_size))
+
+
+def csv_chunks(rows: Iterable[tuple], columns: Sequence[str], batch_size: int = 1000,
+               header: bool = True) -> Iterator[bytes]:
+    """Encode rows as CSV (RFC 4180), with a header line of ``columns``.
+
+    ``columns`` is read as for ``ndjson_chunks``; the header is written even
+    if there are no rows.
+    """
+    rows = iter(rows)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    batch = list(islice(rows, batch_size))
+    if header:
+        writer.writerow(columns)
+    while batch:
+        writer.writerows(batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+        batch = list(islice(rows, batch_size))
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Compress a stream of chunks into one gzip stream, incrementally."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
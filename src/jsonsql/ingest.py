@@ -0,0 +1,130 @@
+"""Incremental reader for the top level of a JSON request body.
+
+``iter_members`` walks the members of a top-level object directly on the
+raw bytes and yields each key with the byte span of its value, without
+decoding the value. Values are skipped by jumping between structural
+characters with compiled regexes, so skipping a huge IN list costs a scan
+of its bytes but creates no Python objects. ``JsonSQL.sql_parse_bytes``
+uses it to reject a request on its ``query``/``from``/``table``/``joins``
+before the rest of the body is decoded.
+
+Input may be ``bytes``, ``bytearray`` or a ``memoryview`` of bytes; it is
+never copied as a whole.
+"""
+
+import json
+import re
+from typing import Any, Iterator, Tuple, Union
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+_WHITESPACE = re.compile(rb"[ \t\n\r]*")
+# Next character that opens or closes a container or starts a string
+_STRUCTURE = re.compile(rb'[\[\]{}"]')
+# Rest of a string after its opening quote, up to and including the closing one
+_STRING_REST = re.compile(rb'[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+_SCALAR = re.compile(rb"[^,:\[\]{}\s\"]+")
+
+_QUOTE, _COLON, _COMMA = ord('"'), ord(":"), ord(",")
+_CLOSERS = {ord("["): ord("]"), ord("{"): ord("}")}
+
+
+def _skip_whitespace(data: Buffer, pos: int) -> int:
+    return _WHITESPACE.match(data, pos).end()
+
+
+def _string_end(data: Buffer, pos: int) -> int:
+    """End of the string whose opening quote is at ``pos``."""
+    match = _STRING_REST.match(data, pos + 1)
+    if match is None:
+        raise ValueError(f"Unterminated string starting at byte {pos}")
+    return match.end()
+
+
+def skip_value(data: Buffer, pos: int) -> int:
+    """Return the end of the JSON value starting at ``pos``.
+
+    Only the nesting of containers and the extent of strings are checked;
+    the value is fully validated when it is decoded.
+
+    Raises:
+        ValueError: If the value is truncated or its brackets do not match.
+    """
+    if pos >= len(data):
+        raise ValueError("Expecting value at end of input")
+    first = data[pos]
+    if first == _QUOTE:
+        return _string_end(data, pos)
+    if first not in _CLOSERS:
+        match = _SCALAR.match(data, pos)
+        if match is None:
+            raise ValueError(f"Expecting value at byte {pos}")
+        return match.end()
+
+    expected = [_CLOSERS[first]]
+    search = _STRUCTURE.search
+    pos += 1
+    while True:
+        match = search(data, pos)
+        if match is None:
+            raise ValueError("Unterminated container at end of input")
+        pos = match.start()
+        char = data[pos]
+        if char == _QUOTE:
+            pos = _string_end(data, pos)
+            continue
+        pos += 1
+        if char in _CLOSERS:
+            expected.append(_CLOSERS[char])
+        elif char != expected.pop():
+            raise ValueError(f"Mismatched bracket at byte {pos - 1}")
+        elif not expected:
+            return pos
+
+
+def load_value(data: Buffer, start: int, end: int) -> Any:
+    """Decode the value at ``data[start:end]``."""
+    return json.loads(bytes(data[start:end]))
+
+
+def iter_members(data: Buffer) -> Iterator[Tuple[str, int, int]]:
+    """Yield ``(key, start, end)`` for each member of the top-level object.
+
+    Members are yielded as they are reached, so the caller can stop reading
+    at any point. The whole input is checked to hold nothing but the object
+    only once the last member has been yielded.
+
+    Raises:
+        ValueError: If the input is not a JSON object.
+    """
+    if isinstance(data, memoryview) and data.format != "B":
+        data = data.cast("B")
+    pos = _skip_whitespace(data, 0)
+    if pos >= len(data) or data[pos] != ord("{"):
+        raise ValueError("Expecting a JSON object")
+    pos = _skip_whitespace(data, pos + 1)
+    if pos < len(data) and data[pos] == ord("}"):
+        pos += 1
+    else:
+        while True:
+            if pos >= len(data) or data[pos] != _QUOTE:
+                raise ValueError(f"Expecting property name at byte {pos}")
+            end = _string_end(data, pos)
+            key = load_value(data, pos, end)
+            pos = _skip_whitespace(data, end)
+            if pos >= len(data) or data[pos] != _COLON:
+                raise ValueError(f"Expecting ':' at byte {pos}")
+            start = _skip_whitespace(data, pos + 1)
+            end = skip_value(data, start)
+            yield key, start, end
+
+            pos = _skip_whitespace(data, end)
+            if pos < len(data) and data[pos] == _COMMA:
+                pos = _skip_whitespace(data, pos + 1)
+                continue
+            if pos < len(data) and data[pos] == ord("}"):
+                pos += 1
+                break
+            raise ValueError(f"Expecting ',' or '}}' at byte {pos}")
+    if _skip_whitespace(data, pos) != len(data):
+        raise ValueError(f"Extra data at byte {pos}")
@@ -0,0 +1,237 @@
+"""Per-phase timing of requests (see ``JsonSQL(instrumentation=...)``).
+
+Every ``sql_parse`` (also inside ``sql_parse_many``) and ``logic_parse`` call
+becomes a ``Span`` whose wall time is split into consecutive phases, in the
+order they run:
+
+- ``template``: request-shape fingerprint and template cache lookup
+- ``items``: query type and SELECT items
+- ``tables``: FROM table
+- ``joins``: JOIN types, tables and ON conditions
+- ``where``: the WHERE/``logic`` tree (``logic`` for ``logic_parse``)
+- ``clauses``: GROUP BY, HAVING, ORDER BY, ``after`` and LIMIT
+- ``render``: SQL text and parameters
+- ``bind`` or ``with_values``: final parameters or inlined literals
+
+A template cache hit only has ``template`` and ``bind``/``with_values``, and
+a rejected request stops at the phase that rejected it. Phases that do not
+apply to a request (no joins, no WHERE) are not reported; their time goes
+to the next phase.
+
+An ``Instrumentation`` receives span start, phase and span end events; the
+base class ignores them, and ``PhaseCollector`` aggregates them into
+histograms. With no instrumentation set, the only cost is one attribute
+check per call.
+"""
+
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+PHASES = ("template", "items", "tables", "joins", "where", "logic", "clauses",
+          "render", "bind", "with_values")
+
+# Request keys that are reported as present in the span attributes
+_CLAUSES = ("where", "logic", "group_by", "having", "order_by", "after", "limit", "offset")
+
+
+class LatencyHistogram:
+    """Latency counts in 1-2-5 buckets from 0.1us to 10s, plus an overflow bucket."""
+
+    BOUNDS_US: Tuple[float, ...] = (0.1, 0.2, 0.5) + tuple(
+        m * 10 ** e for e in range(7) for m in (1, 2, 5)) + (10 ** 7,)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS_US) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float) -> None:
+        micros = seconds * 1e6
+        index = 0
+        bounds = self.BOUNDS_US
+        while index < len(bounds) and micros > bounds[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total += micros
+        if micros > self.max:
+            self.max = micros
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, fraction: float) -> float:
+        """Upper bound in microseconds of the bucket holding the ``fraction`` quantile."""
+        if not self.count:
+            return 0.0
+        rank = max(1, round(fraction * self.count))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                break
+        if index < len(self.BOUNDS_US):
+            return float(min(self.BOUNDS_US[index], self.max))
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean_us": self.total / self.count if self.count else 0.0,
+            "p50_us": self.percentile(0.5),
+            "p90_us": self.percentile(0.9),
+            "p99_us": self.percentile(0.99),
+            "max_us": self.max,
+            "buckets": {f"<={bound}us" if bound else "inf": count for bound, count
+                        in zip(self.BOUNDS_US + (None,), self.counts) if count},
+        }
+
+    def format(self, width: int = 40) -> List[str]:
+        peak = max(self.counts) or 1
+        lines = []
+        for bound, count in zip(self.BOUNDS_US + (None,), self.counts):
+            if not count:
+                continue
+            label = f"> {self.BOUNDS_US[-1]}us" if bound is None else f"<= {bound}us"
+            lines.append(f"{label:>12} {count:>10}  {'#' * max(1, count * width // peak)}")
+        return lines
+
+
+def request_shape(name: str, json_input: Any) -> Dict[str, Any]:
+    """Span attributes describing a request's shape, without any of its values."""
+    if not isinstance(json_input, dict):
+        return {"type": type(json_input).__name__}
+    if name == "logic_parse":
+        return {"columns": len(json_input)}
+    items, joins = json_input.get("items"), json_input.get("joins")
+    query = json_input.get("query")
+    return {
+        "query": query if isinstance(query, str) else None,
+        "items": len(items) if isinstance(items, list) else None,
+        "joins": len(joins) if isinstance(joins, list) else 0,
+        "format": "extended" if "from" in json_input or "joins" in json_input else "legacy",
+        "clauses": tuple(clause for clause in _CLAUSES if clause in json_input),
+    }
+
+
+class Span:
+    """One instrumented call, timed phase by phase.
+
+    Attributes:
+        name (str): The method, "sql_parse" or "logic_parse".
+        attributes (dict): ``request_shape`` of the request, plus ``cached``
+            (template cache hit) and, once ended, ``valid``.
+        phases (list): ``(phase, seconds)`` in the order they ran.
+        duration (float): Seconds from start to end, None while running.
+    """
+
+    __slots__ = ("name", "attributes", "phases", "start", "duration", "_last",
+                 "_instrumentation")
+
+    def __init__(self, instrumentation: "Instrumentation", name: str,
+                 attributes: Dict[str, Any]):
+        self.name = name
+        self.attributes = attributes
+        self.phases: List[Tuple[str, float]] = []
+        self.duration: Optional[float] = None
+        self._instrumentation = instrumentation
+        self.start = self._last = time.perf_counter()
+
+    def phase(self, name: str) -> None:
+        """End the current phase as ``name`` and start the next one."""
+        now = time.perf_counter()
+        seconds = now - self._last
+        self._last = now
+        self.phases.append((name, seconds))
+        self._instrumentation.phase(self, name, seconds)
+
+    def end(self, result: Optional[tuple]) -> None:
+        self.duration = time.perf_counter() - self.start
+        self.attributes["valid"] = bool(result and result[0])
+        self._instrumentation.span_end(self)
+
+
+class Instrumentation:
+    """Receiver of span events; every hook is a no-op here.
+
+    Subclass it to forward spans to a tracer or profiler. Hooks run on the
+    calling thread, inside the timed call, so they should be cheap and
+    thread-safe.
+    """
+
+    def start(self, name: str, json_input: Any) -> Span:
+        span = Span(self, name, request_shape(name, json_input))
+        self.span_start(span)
+        return span
+
+    def span_start(self, span: Span) -> None:
+        """Called when a call starts, before its first phase."""
+
+    def phase(self, span: Span, name: str, seconds: float) -> None:
+        """Called when a phase ends."""
+
+    def span_end(self, span: Span) -> None:
+        """Called when a call returns, with ``duration`` and ``valid`` set."""
+
+
+class PhaseCollector(Instrumentation):
+    """Reference ``Instrumentation`` that aggregates phase durations in memory.
+
+    Keeps one ``LatencyHistogram`` per method and phase (plus a ``total``
+    per method) and counts valid, invalid and template-cache-hit calls.
+    """
+
+    def __init__(self):
+        self._histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self._counts: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def span_end(self, span: Span) -> None:
+        histograms = self._histograms
+        with self._lock:
+            for name, seconds in span.phases + [("total", span.duration)]:
+                histogram = histograms.get((span.name, name))
+                if histogram is None:
+                    histogram = histograms[(span.name, name)] = LatencyHistogram()
+                histogram.add(seconds)
+            self._counts[(span.name, "valid" if span.attributes["valid"] else "invalid")] += 1
+            if span.attributes.get("cached"):
+                self._counts[(span.name, "cached")] += 1
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per method: call counts and each phase's ``LatencyHistogram.to_dict``."""
+        with self._lock:
+            stats: Dict[str, Dict[str, Any]] = {}
+            for (method, phase), histogram in self._histograms.items():
+                entry = stats.setdefault(method, {
+                    key: self._counts[(method, key)] for key in ("valid", "invalid", "cached")})
+                entry.setdefault("phases", {})[phase] = histogram.to_dict()
+            return stats
+
+    def format(self) -> str:
+        """Table of every phase's count, mean, p50, p99 and share of the total time."""
+        lines = [f"{'method':<12} {'phase':<12} {'count':>9} {'mean us':>9} "
+                 f"{'p50 us':>8} {'p99 us':>8} {'share':>6}"]
+        for method, entry in self.stats().items():
+            phases = entry["phases"]
+            total = phases["total"]["mean_us"] * phases["total"]["count"] or 1.0
+            order = sorted(phases, key=lambda phase: (
+                phase == "total", PHASES.index(phase) if phase in PHASES else len(PHASES)))
+            for phase in order:
+                data = phases[phase]
+                share = data["mean_us"] * data["count"] / total
+                lines.append(f"{method:<12} {phase:<12} {data['count']:>9} "
+                             f"{data['mean_us']:>9.2f} {data['p50_us']:>8.1f} "
+                             f"{data['p99_us']:>8.1f} {share:>6.0%}")
+        return "\n".join(lines)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counts.clear()
@@ -0,0 +1,250 @@
+"""Validated intermediate representation between JSON requests and SQL text.
+
+Nodes are produced by ``JsonSQL.sql_compile``/``JsonSQL.logic_compile`` only
+after validation, so anything holding a node can render it again (see
+``render.Renderer``) without re-checking the policy. Nodes are immutable,
+use ``__slots__`` and compare and hash by value; the hash is computed on first
+use, for the whole subtree without recursion, and kept in a slot, so nodes
+that are never hashed (most of them, on the ``sql_parse`` path) cost nothing
+and even very deep predicate trees hash in O(1) after the first time.
+"""
+
+from typing import Any, Optional, Tuple
+
+
+class Node:
+    """Base class of all IR nodes."""
+
+    __slots__ = ("_hash",)
+    _fields: Tuple[str, ...] = ()
+
+    def __init__(self, *values: Any):
+        for name, value in zip(self._fields, values):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __repr__(self) -> str:
+        values = ", ".join(f"{name}={getattr(self, name)!r}" for name in self._fields)
+        return f"{type(self).__name__}({values})"
+
+    def __hash__(self) -> int:
+        try:
+            node_hash = self._hash
+        except AttributeError:
+            node_hash = self._hash_tree()
+        if node_hash is None:
+            raise TypeError(f"unhashable {type(self).__name__}: contains unhashable values")
+        return node_hash
+
+    def _hash_tree(self) -> Optional[int]:
+        """Hash the nodes of the subtree that are not hashed yet, children first.
+
+        Returns:
+            The hash of this node, or None if it holds an unhashable literal.
+        """
+        unhashed = []
+        pending = [self]
+        while pending:
+            value = pending.pop()
+            if isinstance(value, Node):
+                if not hasattr(value, "_hash"):
+                    unhashed.append(value)
+                    pending.extend(getattr(value, name) for name in value._fields)
+            elif isinstance(value, tuple):
+                pending.extend(value)
+        # Parents come before their children, so every child is hashed
+        # (in O(1)) by the time its parent is
+        for node in reversed(unhashed):
+            try:
+                node_hash = hash((type(node),) + tuple(
+                    getattr(node, name) for name in node._fields))
+            except TypeError:
+                # Literal values (e.g. a list compared with "=") may be unhashable
+                node_hash = None
+            object.__setattr__(node, "_hash", node_hash)
+        return self._hash
+
+    def __eq__(self, other: Any) -> bool:
+        # Iterative, so deep predicate trees do not hit the recursion limit
+        pending = [(self, other)]
+        while pending:
+            a, b = pending.pop()
+            if a is b:
+                continue
+            if isinstance(a, Node):
+                if type(a) is not type(b):
+                    return False
+                a_hash, b_hash = getattr(a, "_hash", None), getattr(b, "_hash", None)
+                if a_hash is not None and b_hash is not None and a_hash != b_hash:
+                    return False
+                pending.extend((getattr(a, name), getattr(b, name)) for name in a._fields)
+            elif isinstance(a, tuple):
+                if not isinstance(b, tuple) or len(a) != len(b):
+                    return False
+                pending.extend(zip(a, b))
+            elif type(a) is not type(b) or a != b:
+                return False
+        return True
+
+    def __ne__(self, other: Any) -> bool:
+        return not self == other
+
+
+class Value(Node):
+    """A literal bound as a parameter. A tuple binds one parameter per item."""
+
+    __slots__ = ("value",)
+    _fields = ("value",)
+
+    def __init__(self, value: Any):
+        super().__init__(value)
+
+
+class ColumnRef(Node):
+    """A column rendered as an identifier on the right side of a comparison."""
+
+    __slots__ = ("name",)
+    _fields = ("name",)
+
+    def __init__(self, name: str):
+        super().__init__(name)
+
+
+class Aggregate(Node):
+    """``function(argument)``, e.g. ``MIN(price)``."""
+
+    __slots__ = ("function", "argument")
+    _fields = ("function", "argument")
+
+    def __init__(self, function: str, argument: str):
+        super().__init__(function, argument)
+
+
+class Compare(Node):
+    """``column <operator> operand`` with operand a Value, ColumnRef or Aggregate."""
+
+    __slots__ = ("column", "operator", "operand")
+    _fields = ("column", "operator", "operand")
+
+    def __init__(self, column: str, operator: str, operand: Node):
+        super().__init__(column, operator, operand)
+
+
+class InList(Node):
+    """``column IN (values...)``."""
+
+    __slots__ = ("column", "values")
+    _fields = ("column", "values")
+
+    def __init__(self, column: str, values: tuple):
+        super().__init__(column, tuple(values))
+
+
+class Between(Node):
+    """``column BETWEEN low AND high``."""
+
+    __slots__ = ("column", "low", "high")
+    _fields = ("column", "low", "high")
+
+    def __init__(self, column: str, low: Any, high: Any):
+        super().__init__(column, low, high)
+
+
+class Seek(Node):
+    """Keyset pagination: rows after ``values`` in the order of ``columns``.
+
+    ``directions`` holds "ASC"/"DESC" per column, as in the ORDER BY.
+    """
+
+    __slots__ = ("columns", "directions", "values")
+    _fields = ("columns", "directions", "values")
+
+    def __init__(self, columns: tuple, directions: tuple, values: tuple):
+        super().__init__(tuple(columns), tuple(directions), tuple(values))
+
+
+class BoolOp(Node):
+    """AND/OR over two or more predicates.
+
+    ``implicit`` marks the AND formed by several columns or comparators in one
+    JSON object; it is parenthesized only inside an OR, whereas explicit
+    groups are always parenthesized.
+    """
+
+    __slots__ = ("operator", "operands", "implicit")
+    _fields = ("operator", "operands", "implicit")
+
+    def __init__(self, operator: str, operands: tuple, implicit: bool = False):
+        super().__init__(operator, tuple(operands), implicit)
+
+
+class TableRef(Node):
+    """A table with an optional alias."""
+
+    __slots__ = ("name", "alias")
+    _fields = ("name", "alias")
+
+    def __init__(self, name: str, alias: Optional[str] = None):
+        super().__init__(name, alias)
+
+
+class Join(Node):
+    """``<join_type> table [ON condition]``."""
+
+    __slots__ = ("join_type", "table", "on")
+    _fields = ("join_type", "table", "on")
+
+    def __init__(self, join_type: str, table: TableRef, on: Optional[str] = None):
+        super().__init__(join_type, table, on)
+
+
+class OrderItem(Node):
+    """An ORDER BY term; ``direction`` is None for raw terms."""
+
+    __slots__ = ("column", "direction")
+    _fields = ("column", "direction")
+
+    def __init__(self, column: str, direction: Optional[str] = None):
+        super().__init__(column, direction)
+
+
+class Limit(Node):
+    """``LIMIT count [OFFSET offset]``."""
+
+    __slots__ = ("count", "offset")
+    _fields = ("count", "offset")
+
+    def __init__(self, count: int, offset: Optional[int] = None):
+        super().__init__(count, offset)
+
+
+class Select(Node):
+    """A whole validated request.
+
+    ``connection`` is the keyword introducing ``where`` ("WHERE" for the
+    extended format, the request's ``connection`` for the legacy one).
+    """
+
+    __slots__ = ("query", "items", "table", "joins", "connection", "where",
+                 "group_by", "having", "order_by", "limit")
+    _fields = ("query", "items", "table", "joins", "connection", "where",
+               "group_by", "having", "order_by", "limit")
+
+    def __init__(
+        self,
+        query: str,
+        items: tuple,
+        table: TableRef,
+        joins: tuple = (),
+        connection: str = "WHERE",
+        where: Optional[Node] = None,
+        group_by: Optional[tuple] = None,
+        having: Optional[Node] = None,
+        order_by: tuple = (),
+        limit: Optional[Limit] = None
+    ):
+        super().__init__(query, tuple(items), table, tuple(joins), connection,
+                         where, None if group_by is None else tuple(group_by),
+                         having, tuple(order_by), limit)
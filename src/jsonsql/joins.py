@@ -0,0 +1,102 @@
+"""Parser for JOIN ON conditions.
+
+An ON condition is accepted only if it is made of comparisons joined by
+AND/OR, optionally grouped with parentheses::
+
+    u.id = ur.user_fk AND (u.status = 'active' OR u.level >= 3)
+
+Each comparison has a qualified column (``alias.column``) on at least one
+side and a qualified column, a number or a single-quoted string on the
+other. Anything else (function calls, subqueries, comments, statement
+separators, ...) is rejected by construction instead of by a list of known
+bad patterns. Parsing is one left-to-right scan, and results are cached per
+condition string.
+"""
+
+import re
+from functools import lru_cache
+from typing import Optional, Tuple
+
+_TOKEN = re.compile(r"""
+    \s*(?:
+        (?P<column>[A-Za-z_][A-Za-z0-9_]*(?:\.[A-Za-z_][A-Za-z0-9_]*)+)
+      | (?P<word>[A-Za-z_][A-Za-z0-9_]*)
+      | (?P<number>-?\d+(?:\.\d+)?)
+      | (?P<string>'(?:[^']|'')*')
+      | (?P<operator><>|!=|<=|>=|=|<|>)
+      | (?P<open>\()
+      | (?P<close>\))
+    )""", re.VERBOSE)
+
+_CONNECTIVES = frozenset({"AND", "OR"})
+
+# Parser states: what the next token may be
+_OPERAND, _OPERATOR, _VALUE, _AFTER_TERM = range(4)
+
+
+@lru_cache(maxsize=4096)
+def parse_join_condition(condition: str) -> Optional[Tuple[Tuple[str, str], ...]]:
+    """Parse an ON condition into the columns it references.
+
+    Args:
+        condition (str): The ON condition.
+
+    Returns:
+        The ``(qualifier, column)`` pairs in order of appearance, e.g.
+        ``(("u", "id"), ("ur", "user_fk"))``, or None if the condition is
+        not a valid ON condition.
+    """
+    columns = []
+    state = _OPERAND
+    depth = 0
+    term_columns = 0
+    position = 0
+
+    while True:
+        match = _TOKEN.match(condition, position)
+        if match is None or match.end() == position:
+            # Only trailing whitespace may be left
+            if condition[position:].strip():
+                return None
+            break
+        position = match.end()
+        kind = match.lastgroup
+        token = match.group(kind)
+
+        if state == _OPERAND:
+            if kind == "open":
+                depth += 1
+                continue
+            if kind not in ("column", "number", "string"):
+                return None
+            term_columns = 0
+            state = _OPERATOR
+        elif state == _OPERATOR:
+            if kind != "operator":
+                return None
+            state = _VALUE
+            continue
+        elif state == _VALUE:
+            if kind not in ("column", "number", "string"):
+                return None
+            state = _AFTER_TERM
+        else:
+            if kind == "close" and depth:
+                depth -= 1
+            elif kind == "word" and token.upper() in _CONNECTIVES:
+                state = _OPERAND
+            else:
+                return None
+            continue
+
+        if kind == "column":
+            qualifier, _, column = token.rpartition(".")
+            columns.append((qualifier, column))
+            term_columns += 1
+        if state == _AFTER_TERM and not term_columns:
+            # A comparison of two literals, e.g. "1 = 1"
+            return None
+
+    if state != _AFTER_TERM or depth:
+        return None
+    return tuple(columns)
@@ -1,5 +1,105 @@
+import array
+import hashlib
+import json
 import re
-from typing import Any, Dict, List, Literal, Union
+import time
+from functools import partial
+from itertools import islice
+from types import MappingProxyType
+from typing import (Any, Callable, Dict, Hashable, Iterable, Iterator, List,
+                    Literal, Mapping, Optional, Sequence, Set, Tuple, Union)
+
+from .budget import Budget, BudgetTracker
+from .cache import ResultCache, TemplateCache, Uncacheable, fingerprint
+from .capture import RequestCapture
+from .instrument import Instrumentation, Span
+from .ir import (Aggregate, Between, BoolOp, ColumnRef, Compare, InList, Join,
+                 Limit, Node, OrderItem, Seek, Select, TableRef, Value)
+from .policy import ColumnScope, PolicyIndex
+from .schema import Schema, read_sqlite_schema
+from .export import (EXPORT_FORMATS, column_names, csv_chunks, gzip_chunks,
+                     ndjson_chunks)
+from .ingest import Buffer, iter_members, load_value
+from .joins import parse_join_condition
+from .metrics import LogicStats, Metrics, bucket_stats
+from .paging import decode_token, encode_token
+from .plan import Plan, check_batch_size
+from .pool import ConnectionPool
+from .render import (DIALECTS, IN_LIST_PADDING,  # noqa: F401 (re-exported)
+                     IN_LIST_STRATEGIES, PARAMSTYLES, Renderer)
+
+# Attributes the precomputed PolicyIndex is derived from; they are stored
+# frozen (see _frozen), and assigning any of them invalidates the index so
+# it is rebuilt on next use.
+_POLICY_ATTRIBUTES = frozenset({
+    "ALLOWED_QUERIES", "ALLOWED_ITEMS", "ALLOWED_TABLES", "ALLOWED_CONNECTIONS",
+    "ALLOWED_COLUMNS", "ALLOWED_JOINS", "NOT_ALLOWED_QUERIES",
+    "NOT_ALLOWED_ITEMS", "NOT_ALLOWED_TABLES", "NOT_ALLOWED_CONNECTIONS",
+    "NOT_ALLOWED_COLUMNS", "NOT_ALLOWED_JOINS", "LOGICAL", "COMPARISON",
+    "SPECIAL_COMPARISON", "AGGREGATES",
+})
+
+# Rendering options; assigning any of them invalidates cached SQL templates.
+_RENDER_ATTRIBUTES = frozenset({"in_list_padding", "dialect", "paramstyle",
+                                "quote_identifiers", "in_list_strategy",
+                                "in_list_threshold"})
+
+# Python type of the items of an array.array, per typecode
+_ARRAY_ITEM_TYPES = {
+    **dict.fromkeys("bBhHiIlLqQ", int), **dict.fromkeys("fd", float), "u": str, "w": str,
+}
+
+# Marks an exhausted group in the logic_parse traversal stack
+_DONE = object()
+
+# "COUNT(*)", "MAX(u.age)": an aggregate SELECT item and its argument
+_AGGREGATE_ITEM = re.compile(r"([A-Za-z_]+)\((.*)\)\Z")
+
+# A plain column name, optionally qualified ("u.age")
+_COLUMN_NAME = re.compile(r"[A-Za-z_][A-Za-z0-9_$]*(?:\.[A-Za-z_][A-Za-z0-9_$]*)*\Z")
+
+
+class _LogicCase(tuple):
+    """``(key, value)`` item of a logic node pending in a traversal stack."""
+
+
+# Literal types that are always bound as a parameter of a comparison
+_SCALARS = frozenset({str, int, float, bool, type(None)})
+
+# Operators whose operand is a list of parameters
+_LIST_OPERATORS = frozenset({"IN", "BETWEEN"})
+
+# Request sections whose literals are parameters
+_PARAM_SECTIONS = ("where", "logic", "having", "after")
+
+
+def statement_id(sql: str) -> str:
+    """Return a stable 16 hex digit ID for an SQL text.
+
+    The ID only depends on the text, so it is the same across processes and
+    releases and can be used as a prepared-statement key.
+    """
+    return hashlib.blake2b(sql.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _frozen(value: Any) -> Any:
+    """``value`` with its lists, sets and dicts made read-only, recursively."""
+    if isinstance(value, Mapping):
+        return MappingProxyType({key: _frozen(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_frozen(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(value)
+    return value
+
+
+def _table_names(table: TableRef) -> Set[str]:
+    """Names a JOIN ON condition may qualify ``table``'s columns with."""
+    if table.alias:
+        return {table.alias}
+    name = str(table.name)
+    # "wst.users" can be referred to as "wst.users" or "users"
+    return {name, name.rpartition(".")[2]}
 
 
 class JsonSQL:
@@ -16,7 +116,19 @@ class JsonSQL:
         not_allowed_tables: List[str] = None,
         not_allowed_connections: List[str] = None,
         not_allowed_columns: List[str] = None,
-        not_allowed_joins: List[str] = None
+        not_allowed_joins: List[str] = None,
+        template_cache_size: int = 1024,
+        in_list_padding: str = None,
+        dialect: str = "generic",
+        paramstyle: str = None,
+        quote_identifiers: bool = False,
+        in_list_strategy: str = None,
+        in_list_threshold: int = 999,
+        result_cache: Optional[ResultCache] = None,
+        capture: Optional[RequestCapture] = None,
+        instrumentation: Optional[Instrumentation] = None,
+        metrics: Optional[Metrics] = None,
+        budget: Optional[Budget] = None
     ):
         """Initializes JsonSQL instance with allowed/not_allowed queries, items,
         tables, connections, columns, and joins.
@@ -27,7 +139,10 @@ class JsonSQL:
             allowed_items (List[str], optional): Allowed SQL SELECT fields.
                 Use ["*"] to allow all. Defaults to [] (strict mode).
             allowed_tables (List[str], optional): Allowed SQL FROM tables.
-                Use ["*"] to allow all. Defaults to [] (strict mode).
+                Use ["*"] to allow all. A table may be given as
+                ``{name: [columns]}`` to restrict its columns, or as
+                ``{name: {column: type}}`` to also type them per table.
+                Defaults to [] (strict mode).
             allowed_connections (List[str], optional): Allowed SQL WHERE conditions.
                 Use ["*"] to allow all. Defaults to [] (strict mode).
             allowed_columns (Dict[str, type], optional): Allowed columns per table.
@@ -46,7 +161,78 @@ class JsonSQL:
                 Takes precedence over allowed_columns. Defaults to [].
             not_allowed_joins (List[str], optional): Explicitly forbidden JOIN types.
                 Takes precedence over allowed_joins. Defaults to [].
+            template_cache_size (int, optional): Number of SQL templates kept
+                by the request-shape cache (see ``template_cache``). 0
+                disables it. Defaults to 1024.
+            in_list_padding (str, optional): Pad IN lists to the next power of
+                two so only a bounded set of SQL texts exists. "repeat" pads
+                with the last value, "null" with NULL. Defaults to None (no
+                padding).
+            dialect (str, optional): SQL dialect to render for, one of
+                ``DIALECTS`` ("generic", "sqlite", "postgresql", "mysql",
+                "mssql", "oracle"). It decides the LIMIT/OFFSET syntax, the
+                identifier quotes and the default paramstyle. Defaults to
+                "generic".
+            paramstyle (str, optional): Placeholder style, one of the DB-API
+                styles "qmark", "numeric", "named", "format", "pyformat", or
+                "dollar" ($1, as used by asyncpg). "named" and "pyformat"
+                return the params as a dict. Defaults to the dialect's
+                ("qmark" for "generic").
+            quote_identifiers (bool, optional): Quote table, column and alias
+                names for the dialect. Defaults to False.
+            in_list_strategy (str, optional): How IN lists longer than
+                ``in_list_threshold`` are rendered: "json" (the whole list
+                as one parameter), "temp_table", "chunked" or "auto" (by
+                list size). The last three need several statements and only
+                apply to ``sql_plan``; ``sql_parse`` and ``logic_parse`` use
+                "json" for them. See ``render.Renderer``. Defaults to None
+                (one placeholder per value).
+            in_list_threshold (int, optional): Longest IN list rendered with
+                placeholders when a strategy is set. Defaults to 999.
+            result_cache (ResultCache, optional): Cache for the results of
+                ``execute``, ``page`` and ``export``, invalidated by the
+                writes they run. Defaults to None (no caching).
+            capture (RequestCapture, optional): Sampler that logs the
+                requests given to ``sql_parse``, ``sql_parse_many``,
+                ``execute``, ``page`` and ``export``, for replay with
+                ``python -m jsonsql.replay``. Defaults to None.
+            instrumentation (Instrumentation, optional): Receives a span per
+                ``sql_parse``/``logic_parse`` call with the time spent in each
+                phase (see ``instrument``). Defaults to None (not timed).
+            metrics (Metrics, optional): Registry that counts
+                ``sql_parse``/``logic_parse`` requests, rejections, latency,
+                logic depth and IN-list sizes (see ``metrics``). Defaults to
+                None.
+            budget (Budget, optional): Limits on logic depth and size, IN
+                lists, joins, items and ORDER BY entries, checked while a
+                request is validated (see ``budget``). Defaults to None
+                (unbounded).
+
+        The policy is compiled into an immutable ``PolicyIndex`` (see
+        ``policy``) that all validators use. The ``ALLOWED_*``/``NOT_ALLOWED_*``
+        attributes hold read-only copies of the arguments (tuples, frozensets
+        and ``MappingProxyType``), so they cannot drift from the index by
+        being changed in place; reassigning one rebuilds the index.
         """
+        self._policy = None
+        self.template_cache = TemplateCache(template_cache_size)
+        self.result_cache = result_cache
+        self.capture = capture
+        self.instrumentation = instrumentation
+        self.metrics = metrics
+        self.budget = budget
+        # The database schema the policy was read from (see ``from_sqlite``)
+        self.schema: Optional[Schema] = None
+
+        self.in_list_padding = in_list_padding
+        self.dialect = dialect
+        self.paramstyle = paramstyle
+        self.quote_identifiers = quote_identifiers
+        self.in_list_strategy = in_list_strategy
+        self.in_list_threshold = in_list_threshold
+        # Built eagerly so that invalid rendering options fail here
+        self._renderer = self._build_renderer()
+
         # Initialize allowed lists with default empty lists for strict mode
         self.ALLOWED_QUERIES = allowed_queries if allowed_queries is not None else []
         self.ALLOWED_ITEMS = allowed_items if allowed_items is not None else []
@@ -71,12 +257,10 @@ class JsonSQL:
         allowed_tables = allowed_tables if allowed_tables is not None else []
         table_dict = {}
         for table in allowed_tables:
-            if isinstance(table, dict) and isinstance(table[list(table)[0]], list):
+            if isinstance(table, dict) and isinstance(table[list(table)[0]], (list, dict)):
                 table_dict[list(table)[0]] = table[list(table)[0]]
-            elif isinstance(table, dict) and not isinstance(
-                table[list(table)[0]], list
-            ):
-                raise TypeError(f"Table {table} items must be a list")
+            elif isinstance(table, dict):
+                raise TypeError(f"Table {table} items must be a list or dict")
             elif isinstance(table, str):
                 table_dict[table] = [None]
             else:
@@ -89,58 +273,96 @@ class JsonSQL:
         self.SPECIAL_COMPARISON = ("BETWEEN", "IN")
         self.AGGREGATES = ("MIN", "MAX", "SUM", "AVG", "COUNT")
 
-    def _is_entity_allowed(
-        self,
-        entity: str,
-        allowed_list: List[str],
-        not_allowed_list: List[str]
-    ) -> bool:
-        """Check if an entity is allowed based on whitelist and blacklist rules.
-
-        Validation logic:
-        1. If entity is in not_allowed_list → DENY (blacklist takes precedence)
-        2. If allowed_list is empty → DENY (strict mode)
-        3. If allowed_list contains "*" → ALLOW (wildcard mode)
-        4. If entity is in allowed_list → ALLOW
-        5. Otherwise → DENY
+        self._policy = PolicyIndex.from_jsonsql(self)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name in _POLICY_ATTRIBUTES:
+            value = _frozen(value)
+        super().__setattr__(name, value)
+        if name in _POLICY_ATTRIBUTES:
+            super().__setattr__("_policy", None)
+        elif name in _RENDER_ATTRIBUTES:
+            super().__setattr__("_renderer", None)
+        if name in _POLICY_ATTRIBUTES or name in _RENDER_ATTRIBUTES or name in (
+                "metrics", "budget"):
+            # Cached templates were built against the old settings, or lack
+            # the logic stats that metrics need
+            template_cache = self.__dict__.get("template_cache")
+            if template_cache is not None:
+                template_cache.clear()
+
+    @classmethod
+    def from_sqlite(
+        cls,
+        connection: Any,
+        include: Optional[Iterable[str]] = None,
+        exclude: Optional[Iterable[str]] = None,
+        schema: Optional[Schema] = None,
+        **options: Any
+    ) -> "JsonSQL":
+        """Build a JsonSQL whose policy is read from a SQLite database.
+
+        Every table and view is allowed with its own ``{column: type}`` map
+        (see ``schema.Schema.policy``), so requests may only use the columns
+        a table has, typed by its declared types, whatever alias they give
+        it. The schema, with each table's primary key, is kept in
+        ``jsonsql.schema``.
 
         Args:
-            entity (str): The entity to validate (e.g., table name, query type).
-            allowed_list (List[str]): List of allowed entities or ["*"] for wildcard.
-            not_allowed_list (List[str]): List of explicitly forbidden entities.
-
-        Returns:
-            bool: True if entity is allowed, False otherwise.
+            connection: A sqlite3 connection, or the path of a database file.
+            include (Iterable[str], optional): Names or ``fnmatch`` patterns
+                of the tables to allow. Defaults to None (all of them).
+            exclude (Iterable[str], optional): Names or patterns of tables
+                not to allow. Defaults to None.
+            schema (Schema, optional): The ``jsonsql.schema`` of an earlier
+                call, pickled or stored with ``to_dict``. It is reused
+                without reading the tables again if the database schema
+                has not changed since.
+            **options: Other constructor arguments. They take precedence
+                over the policy read, e.g. ``allowed_items`` or
+                ``not_allowed_columns``.
         """
-        # Check blacklist first (takes precedence)
-        if entity in not_allowed_list:
-            return False
-
-        # Strict mode: empty allowed list means nothing is allowed
-        if not allowed_list:
-            return False
-
-        # Wildcard mode: "*" allows everything (except blacklisted)
-        if "*" in allowed_list:
-            return True
-
-        # Explicit whitelist check
-        return entity in allowed_list
+        schema = read_sqlite_schema(connection, include, exclude, cached=schema)
+        jsonsql = cls(**{**schema.policy(), **options})
+        jsonsql.schema = schema
+        return jsonsql
+
+    @property
+    def policy(self) -> PolicyIndex:
+        """The frozen lookup index compiled from the current policy."""
+        policy = self._policy
+        if policy is None:
+            policy = PolicyIndex.from_jsonsql(self)
+            super().__setattr__("_policy", policy)
+        return policy
+
+    @property
+    def renderer(self) -> Renderer:
+        """The ``Renderer`` built from the current rendering options."""
+        renderer = self._renderer
+        if renderer is None:
+            renderer = self._build_renderer()
+            super().__setattr__("_renderer", renderer)
+        return renderer
+
+    def _build_renderer(self) -> Renderer:
+        return Renderer(self.in_list_padding, self.dialect, self.paramstyle,
+                        self.quote_identifiers, self.in_list_strategy,
+                        self.in_list_threshold)
 
     def _is_table_allowed(self, table: str) -> bool:
         """Check if a table is allowed, handling both simple and enhanced table format."""
-        # Check blacklist first
-        if table in self.NOT_ALLOWED_TABLES:
-            return False
+        policy = self.policy
+        if not policy.queries.allowed:
+            # Original dev branch logic: explicit tables only, no wildcard
+            rule = policy.tables
+            try:
+                return table not in rule.denied and table in rule.allowed
+            except TypeError:
+                return False
 
-        # Handle wildcard tables from our enhancement
-        if hasattr(self, 'NOT_ALLOWED_TABLES') and len(self.ALLOWED_QUERIES) > 0:
-            # We're using our enhanced system
-            allowed_table_names = [k for k in self.ALLOWED_TABLES.keys()]
-            return self._is_entity_allowed(table, allowed_table_names, self.NOT_ALLOWED_TABLES)
-        else:
-            # Original dev branch logic
-            return table in self.ALLOWED_TABLES
+        # We're using our enhanced system
+        return policy.tables.allows(table)
 
     def _is_column_allowed(self, column: str) -> bool:
         """Check if a column is allowed based on column-specific rules.
@@ -151,34 +373,7 @@ class JsonSQL:
         Returns:
             bool: True if column is allowed, False otherwise.
         """
-        # Check blacklist first
-        if column in self.NOT_ALLOWED_COLUMNS:
-            return False
-
-        # Strict mode: empty allowed columns means nothing is allowed
-        if not self.ALLOWED_COLUMNS:
-            return False
-
-        # Wildcard mode: "*" key allows all columns
-        if "*" in self.ALLOWED_COLUMNS:
-            return True
-
-        # Explicit column check
-        return column in self.ALLOWED_COLUMNS
-
-    def make_aggregate(self, aggregate: dict, param: bool = False) -> tuple[str, any]:
-        """Enhanced aggregate function from dev branch."""
-        # Extract the aggregate function name and its argument
-        aggregate_function = list(aggregate)[0]
-        aggregate_argument = aggregate[aggregate_function]
-
-        # Construct the SQL aggregate function string
-        aggregate_string = (
-            f"{aggregate_function}({aggregate_argument if not param else '?'})"
-        )
-
-        # Return the aggregate string and its argument
-        return aggregate_string, aggregate_argument
+        return self.policy.columns.allows(column)
 
     def is_another_column(self, value: str) -> bool:
         """Check if a value represents another column name.
@@ -194,19 +389,19 @@ class JsonSQL:
             bool: True if value is an allowed column name, False otherwise.
         """
         try:
+            columns = self.policy.columns
+
             # If we don't have wildcard columns, use the original logic
-            if "*" not in self.ALLOWED_COLUMNS:
-                return self._is_column_allowed(value)
+            if not columns.wildcard:
+                return columns.allows(value)
 
             # With wildcard columns, only treat as column if explicitly listed
             # or if it's not blacklisted and looks like a column name
-            if value in self.NOT_ALLOWED_COLUMNS:
+            if value in columns.denied:
                 return False
 
             # If we have explicit columns defined alongside wildcard, check those first
-            explicit_columns = {k: v for k,
-                                v in self.ALLOWED_COLUMNS.items() if k != "*"}
-            if explicit_columns and value in explicit_columns:
+            if value in self.policy.explicit_columns:
                 return True
 
             # For wildcard mode, we're more conservative - only treat as column
@@ -232,277 +427,687 @@ class JsonSQL:
 
         operation = list(aggregate)[0]
         value = aggregate[operation]
-        if operation not in self.AGGREGATES:
+        if not isinstance(operation, str) or operation not in self.policy.aggregates:
             return False
 
         return self.is_another_column(value)
 
-    def is_valid_value(self, value: any, valuetype: any) -> bool:
-        # Check if the value is an aggregate
-        if isinstance(value, dict):
-            return self.is_valid_aggregate(value)
+    @staticmethod
+    def _list_values(value: Any, valuetype: Any) -> Optional[Sequence]:
+        """Type-check the operand of IN/BETWEEN in one pass.
 
-        # Check if the value is another column
-        if not isinstance(value, list) and self.is_another_column(value):
-            return True
+        Accepts lists and tuples, plus ``range``, ``array.array`` and 1-d
+        NumPy arrays, whose item type is known without looking at the items.
+        Members are always bound as parameters, so unlike single values
+        they are never taken for column references.
 
-        # Check if the value is of the expected type
-        return isinstance(value, valuetype)
+        Returns:
+            The values to bind (the operand itself, or a list of Python
+            scalars for NumPy arrays), or None if the operand is invalid.
+        """
+        value_type = type(value)
+        if value_type is list or value_type is tuple:
+            values = value
+            item_types = None
+        elif value_type is range:
+            values = value
+            item_types = (int,)
+        elif value_type is array.array:
+            values = value
+            item_types = (_ARRAY_ITEM_TYPES.get(value.typecode, object),)
+        elif value_type.__name__ == "ndarray" and value_type.__module__ == "numpy":
+            if value.ndim != 1:
+                return None
+            # Python scalars, as DB-API drivers do not accept NumPy ones
+            values = value.tolist()
+            item_types = None
+        else:
+            return None
 
-    def is_special_comparison(
-        self, comparator: str, value: any, valuetype: any
-    ) -> bool:
-        """Checks if a comparator and value match the special comparison operators.
+        if valuetype is object or not values:
+            return values
+        if item_types is None:
+            item_types = set(map(type, values))
+        for item_type in item_types:
+            if not issubclass(item_type, valuetype):
+                return None
+        return values
 
-        Special comparison operators include BETWEEN and IN. This checks if the
-        comparator is one of those, and if the value matches the expected format.
+    @staticmethod
+    def get_sql_comparator(comparator: str) -> str:
+        """
+        Returns the SQL comparator, replacing '!=' with '<>' if necessary.
 
         Args:
-            comparator (str): The comparison operator.
-            value: The comparison value.
-            valuetype: The expected type of the comparison value.
+            comparator (str): The original SQL comparator.
 
         Returns:
-            bool: True if it is a valid special comparison, False otherwise.
+            str: The adjusted SQL comparator.
         """
-        def all_values_allowed(value, valuetype):
-            """Checks if all values in a list are of the specified type.
+        return comparator if comparator != "!=" else "<>"
 
-            Args:
-                value (list): The list of values to check.
-                valuetype: The expected type of each value.
+    def _value_shape(
+        self, value: Any, params: List[Any], inline_columns: bool,
+        operator: Optional[str], tokens: List[Any]
+    ) -> None:
+        """Fingerprint a comparison value into ``tokens``, collecting its literal parameters.
 
-            Returns:
-                bool: True if all values match the expected type, False otherwise.
-            """
-            valid = True
+        Column references (when ``inline_columns``) and aggregates are part of
+        the rendered SQL, so their values go into the fingerprint. Literals
+        only contribute their type, which is all their validation depends on.
+        """
+        if isinstance(value, dict):
+            tokens.append(fingerprint(value))
+            return
+
+        if isinstance(value, list):
+            if operator in ("IN", "BETWEEN"):
+                # Members are always parameters; their validity only depends
+                # on their types and the SQL only on their number
+                params.extend(self.renderer.pad_in_list(value) if operator == "IN" else value)
+                tokens += (list, len(value), frozenset(map(type, value)))
+                return
+
+            tokens += (tuple, len(value))
             for entry in value:
-                if not self.is_valid_value(entry, valuetype):
-                    valid = False
-                    break
-            return valid
-
-        if not isinstance(value, list) or not all_values_allowed(value, valuetype):
-            return False
+                if isinstance(entry, (dict, tuple)):
+                    raise Uncacheable(type(entry).__name__)
+                if inline_columns and self.is_another_column(entry):
+                    tokens += ("col", entry)
+                else:
+                    tokens.append(type(entry))
+            params.extend(value)
+            return
 
-        if comparator == "BETWEEN" and len(value) == 2:
-            return True
+        if isinstance(value, tuple) or operator in ("IN", "BETWEEN"):
+            # Rendered element by element; only lists have a fixed shape
+            raise Uncacheable(type(value).__name__)
 
-        elif comparator == "IN" and len(value) > 0:
-            return True
+        if inline_columns and self.is_another_column(value):
+            tokens += ("col", fingerprint(value))
+            return
 
-        return False
+        params.append(value)
+        tokens.append(type(value))
 
-    def is_valid_comparison(self, column: str, comparison: dict) -> bool:
-        """Checks if a comparison operator and value are valid for a column.
+    def _logic_shape(
+        self, logic: Any, params: List[Any], inline_columns: bool, tokens: List[Any],
+        leaves: Optional[List[int]] = None, depth: int = 1
+    ) -> None:
+        """Fingerprint a logic tree into ``tokens``, collecting its literal parameters in order.
 
-        Validates that the comparator is a valid operator, and the value is the
-        expected type for the column or a valid special comparison.
+        Only dict keys, operators, lengths and value types are appended;
+        literal values go to ``params``, and anything that is not a plain
+        dict or list (a subclass included) is appended as its
+        ``cache.fingerprint``. A tree too deep to walk recursively raises
+        RecursionError, and is left to validation uncached.
 
         Args:
-            column (str): The column name.
-            comparison (dict): The comparison operator and value.
-
-        Returns:
-            bool: True if the comparison is valid, False otherwise.
+            leaves: Comparisons counted so far, against ``max_leaves`` of the
+                ``budget``; set on the recursive calls.
+            depth: Nesting depth of ``logic``, against ``max_depth``.
+
+        Raises:
+            Uncacheable: If the tree is over ``max_leaves``, ``max_depth`` or
+                ``max_in_list`` of the ``budget``, so that it is left to
+                validation, which stops at the first excess.
         """
-        comparator = list(comparison)[0]
+        if type(logic) is not dict:
+            tokens.append(fingerprint(logic))
+            return
+        budget = self.budget
+        if budget is not None:
+            if leaves is None:
+                leaves = [0]
+            if budget.max_depth is not None and depth > budget.max_depth + 1:
+                raise Uncacheable("budget")
+
+        tokens.append(len(logic))
+        for key, value in logic.items():
+            kind = type(value)
+            if kind is dict:
+                if budget is not None:
+                    leaves[0] += len(value)
+                    if budget.max_leaves is not None and leaves[0] > budget.max_leaves:
+                        raise Uncacheable("budget")
+                    operand = value.get("IN")
+                    if (budget.max_in_list is not None and isinstance(operand, list)
+                            and len(operand) > budget.max_in_list):
+                        raise Uncacheable("budget")
+                tokens += (key, dict, len(value))
+                for operator, operand in value.items():
+                    if (not inline_columns and type(operand) in _SCALARS
+                            and operator not in _LIST_OPERATORS):
+                        params.append(operand)
+                        tokens += (operator, type(operand))
+                    else:
+                        tokens.append(operator)
+                        self._value_shape(operand, params, inline_columns, operator, tokens)
+            elif kind is list:
+                tokens += (key, list, len(value))
+                depth += 1
+                for entry in value:
+                    self._logic_shape(entry, params, inline_columns, tokens, leaves, depth)
+            else:
+                tokens += (key, fingerprint(value))
+
+    def _template_key(
+        self, kind: str, json_input: Any
+    ) -> Optional[tuple[Hashable, tuple]]:
+        """Return ``(shape_key, params)`` for a request, or None if uncacheable.
+
+        The key covers everything that decides the SQL text and its validity
+        (query, items, tables, joins, operator tree, IN-list lengths and value
+        types) but not the literal values, which are returned as ``params``.
+        It is one flat tuple: the keys, operators, lengths and value types of
+        the sections holding literals, and a ``cache.fingerprint`` of the rest.
+        """
+        if self.template_cache.capacity == 0:
+            return None
 
-        if (
-            comparator not in self.COMPARISON
-            and comparator not in self.SPECIAL_COMPARISON
-        ):
-            return False
+        try:
+            params: List[Any] = []
+            tokens: List[Any] = [kind]
+            if kind == "logic":
+                self._logic_shape(json_input, params, True, tokens)
+            else:
+                # Sections holding literals are walked; all the others are
+                # part of the SQL as they are, and are fingerprinted at once
+                sections = {}
+                rest = json_input if type(json_input) is dict else dict(json_input)
+                for name in _PARAM_SECTIONS:
+                    if name not in json_input:
+                        continue
+                    if rest is json_input:
+                        rest = dict(json_input)
+                    value = rest[name]
+                    rest[name] = None
+                    tokens.append(name)
+                    if name == "after":
+                        # Keys and types decide the SQL; tokens are opaque
+                        if not isinstance(value, dict):
+                            raise Uncacheable(type(value).__name__)
+                        sections[name] = list(value.values())
+                        tokens.append(len(value))
+                        for key, entry in value.items():
+                            tokens += (key, type(entry))
+                    else:
+                        sections[name] = []
+                        self._logic_shape(value, sections[name], False, tokens)
+                tokens.append(fingerprint(rest))
+
+                # Same order in which sql_parse emits the parameters
+                if "from" not in json_input and "joins" not in json_input:
+                    params = sections.get("logic", params)
+                elif len(sections) == 1:
+                    params, = sections.values()
+                else:
+                    order = ("where" if "where" in json_input else "logic", "after", "having")
+                    for name in order:
+                        params.extend(sections.get(name, ()))
+            key = tuple(tokens)
+            hash(key)
+        except (Uncacheable, AttributeError, TypeError, RecursionError):
+            return None
 
-        value = comparison[comparator]
-        column_type = self.ALLOWED_COLUMNS.get(
-            column, self.ALLOWED_COLUMNS.get("*", object))
-        if (self.is_valid_value(value, column_type) or
-                self.is_special_comparison(comparator, value, column_type)):
-            return True
-        return False
+        return key, tuple(params)
 
     @staticmethod
-    def get_sql_comparator(comparator: str) -> str:
+    def _same_params(expected: tuple, actual: tuple) -> bool:
+        """True if both sequences hold the very same parameter objects."""
+        return len(expected) == len(actual) and all(
+            a is b for a, b in zip(expected, actual))
+
+    def logic_parse(
+        self, json_input: dict
+    ) -> tuple[Literal[False], str] | tuple[Literal[True], str, tuple]:
+        """Validate a logic tree and render it as a parameterized condition.
+
+        Requests with the same shape (see ``_template_key``) are answered
+        from ``template_cache`` without being validated or rendered again.
         """
-        Returns the SQL comparator, replacing '!=' with '<>' if necessary.
+        if self.instrumentation is not None:
+            return self._wrapped("logic_parse", self._logic_parse)(json_input)
+        if self.metrics is not None:
+            return self._measured("logic_parse", self._logic_parse, json_input)
+        return self._logic_parse(json_input)
+
+    def _logic_parse(
+        self, json_input: dict, span: Optional[Span] = None,
+        stats_out: Optional[List[LogicStats]] = None
+    ) -> tuple[Literal[False], str] | tuple[Literal[True], str, tuple]:
+        template = self._template_key("logic", json_input)
+        if template is not None:
+            cached = self.template_cache.get(template[0])
+            if span is not None:
+                span.attributes["cached"] = cached is not None
+                span.phase("template")
+            if cached is not None:
+                sql, stats = cached
+                if stats_out is not None and stats is not None:
+                    stats_out.append(stats)
+                params = self.renderer.bind(template[1])
+                if span is not None:
+                    span.phase("bind")
+                return True, sql, params
+        elif span is not None:
+            span.phase("template")
+
+        tracker = self._budget_tracker("logic", stats_out is not None)
+        compiled = self._compile_logic(json_input, column_refs=True, tracker=tracker)
+        if span is not None:
+            span.phase("logic")
+        if not compiled[0]:
+            return compiled
+        sql, params = self.renderer.render_positional(compiled[1])
+        stats = None
+        if stats_out is not None:
+            stats = bucket_stats(tracker.deepest, tracker.sizes)
+            stats_out.append(stats)
+        if template is not None and self._same_params(template[1], params):
+            self.template_cache.put(template[0], (sql, stats))
+        if span is not None:
+            span.phase("render")
+        params = self.renderer.bind(params)
+        if span is not None:
+            span.phase("bind")
+        return True, sql, params
+
+    def _wrapped(self, name: str, function: Callable[..., tuple]) -> Callable[..., tuple]:
+        """``function`` run in a span of ``instrumentation`` and counted by ``metrics``."""
+        if self.instrumentation is not None:
+            function = partial(self._traced, name, function)
+        if self.metrics is not None:
+            function = partial(self._measured, name, function)
+        return function
+
+    def _measured(self, name: str, function: Callable[..., tuple], json_input: Any,
+                  *args: Any) -> tuple:
+        """Run ``function(json_input, *args)`` and record it in ``metrics``."""
+        start = time.perf_counter()
+        stats: List[LogicStats] = []
+        result = function(json_input, *args, stats_out=stats)
+        self.metrics.observe(name, json_input, result, time.perf_counter() - start,
+                             stats[0] if stats else None)
+        return result
+
+    def _traced(self, name: str, function: Callable[..., tuple], json_input: Any,
+                *args: Any, **kwargs: Any) -> tuple:
+        """Run ``function(json_input, *args, span=...)`` in a span of ``instrumentation``."""
+        span = self.instrumentation.start(name, json_input)
+        result = None
+        try:
+            result = function(json_input, *args, span=span, **kwargs)
+        finally:
+            span.end(result)
+        return result
+
+    def _check_column(
+        self, column: str, key: str, scope: Optional[ColumnScope]
+    ) -> tuple[Literal[False], str] | tuple[Literal[True], Any]:
+        """Check that a logic column is allowed, and find its value type.
+
+        A column that ``scope`` resolves to a table given with column types
+        is typed by that table, and needs no ``allowed_columns`` entry.
 
         Args:
-            comparator (str): The original SQL comparator.
+            column (str): The column.
+            key (str): The logic key to report on rejection; differs from
+                ``column`` for the argument of an aggregate key.
+            scope (ColumnScope, optional): The request's tables.
 
         Returns:
-            str: The adjusted SQL comparator.
+            (True, value type) or (False, error_message).
         """
-        return comparator if comparator != "!=" else "<>"
+        policy = self.policy
+        resolved = column_type = None
+        if scope is not None:
+            resolved = scope.resolve(column)
+            if resolved is None:
+                return False, f"Column not allowed: {key}"
+            column_type = policy.table_column_type(resolved)
+        if column_type is None:
+            if not policy.columns.allows(column):
+                return False, f"Invalid Input - {key}"
+            return True, policy.column_type(column)
+        if column in policy.columns.denied or resolved[1] in policy.columns.denied:
+            return False, f"Invalid Input - {key}"
+        return True, column_type
+
+    def _aggregate_key(
+        self, key: str, scope: Optional[ColumnScope]
+    ) -> Optional[tuple[Literal[False], str] | tuple[Literal[True], str, Any]]:
+        """Validate an aggregate logic key, such as ``COUNT(*)`` in HAVING.
+
+        The argument, optionally after DISTINCT, is checked like a logic
+        column; ``COUNT(*)`` reads no column. COUNT compares with ints, AVG
+        with numbers, and SUM, MIN and MAX with values of the argument's
+        type.
 
-    def is_value_in_allowed_categories(self, value: str) -> bool:
+        Returns:
+            None if ``key`` is not a call of an allowed aggregate on a
+            column, else (True, key to render, value type) or
+            (False, error_message).
         """
-        Checks if the given value is in the allowed categories.
+        match = _AGGREGATE_ITEM.match(key)
+        if match is None:
+            return None
+        function = match.group(1).upper()
+        if function not in self.policy.aggregates:
+            return None
+        argument = match.group(2).strip()
+        if argument == "*" and function == "COUNT":
+            return True, "COUNT(*)", int
+        distinct = argument[:9].upper() == "DISTINCT "
+        if distinct:
+            argument = argument[9:].strip()
+        if not _COLUMN_NAME.match(argument):
+            return None
+        checked = self._check_column(argument, key, scope)
+        if not checked[0]:
+            return checked
+        if function == "COUNT":
+            value_type = int
+        elif function == "AVG":
+            value_type = (int, float)
+        else:
+            value_type = checked[1]
+        if distinct:
+            return True, f"{function}(DISTINCT {argument})", value_type
+        return True, f"{function}({argument})", value_type
 
-        Args:
-            value (str): The value to check.
+    def _compile_case(
+        self, column: Any, condition: Any, column_refs: bool,
+        tracker: Optional[BudgetTracker] = None, scope: Optional[ColumnScope] = None
+    ) -> tuple[Literal[False], str] | tuple[Literal[True], Node]:
+        """Validate one ``{column: {comparator: value, ...}}`` case into IR.
+
+        Validity is decided while the node is built, so every comparison is
+        inspected once. Several comparators on one column become an implicit
+        AND.
 
         Returns:
-            bool: True if the value is in the allowed categories, False otherwise.
+            (True, node) or (False, error_message).
         """
-        # Enhanced logic that supports our wildcard system
-        is_valid_column = self._is_column_allowed(value)
-        is_logical_operator = value in self.LOGICAL
-        is_comparison_operator = (value in self.SPECIAL_COMPARISON or
-                                  value in self.COMPARISON)
-
-        return is_valid_column or is_logical_operator or is_comparison_operator
+        policy = self.policy
+        if not isinstance(column, str):
+            return False, f"Invalid Input - {column}"
+        aggregate = self._aggregate_key(column, scope) if "(" in column else None
+        if aggregate is not None:
+            if not aggregate[0]:
+                return aggregate
+            _, column, column_type = aggregate
+        else:
+            checked = self._check_column(column, column, scope)
+            if not checked[0]:
+                return checked
+            column_type = checked[1]
+
+        if not isinstance(condition, dict) or not condition:
+            return False, f"Bad {column}, non {column_type}"
+        if tracker is not None and tracker.budget is not None:
+            over = tracker.leaves(len(condition))
+            if over:
+                return over
+
+        nodes = []
+        for comparator, operand in condition.items():
+            if not isinstance(comparator, str) or comparator not in policy.operators:
+                return False, f"Non Valid comparitor - {comparator}"
+
+            if comparator in policy.special_comparison:
+                if (comparator == "IN" and tracker is not None and tracker.budget is not None
+                        and hasattr(operand, "__len__")):
+                    over = tracker.check("max_in_list", len(operand))
+                    if over:
+                        return over
+                values = self._list_values(operand, column_type)
+                if (values is None or not len(values)
+                        or comparator == "BETWEEN" and len(values) != 2):
+                    return False, f"Bad {column}, non {column_type}"
 
-    def logic_parse(
-        self, json_input: dict
-    ) -> tuple[Literal[False], str] | tuple[Literal[True], str, tuple]:
-        if len(json_input) == 0:
-            return False, "Nothing To Compute"
-
-        value: str = list(json_input.keys())[0]
-
-        # Check if the value is in the allowed categories
-        if not self.is_value_in_allowed_categories(value):
-            return False, f"Invalid Input - {value}"
-
-        elif value in self.LOGICAL and not isinstance(json_input[value], list):
-            return False, f"Bad {value}, non list"
-
-        elif value in self.ALLOWED_COLUMNS and not self.is_valid_comparison(
-            value, json_input[value]
-        ):
-            if isinstance(json_input[value], dict):
-                value0 = list(json_input[value])[0]
-                if (
-                    value0 not in self.COMPARISON
-                    and value0 not in self.SPECIAL_COMPARISON
-                ):
-                    return False, f"Non Valid comparitor - {value0}"
-            # Get the expected type for the column
-            expected_type = self.ALLOWED_COLUMNS.get(
-                value, self.ALLOWED_COLUMNS.get("*", object))
-            return False, f"Bad {value}, non {expected_type}"
-
-        if self.is_valid_comparison(value, json_input[value]):
-            comparator = list(json_input[value])[0]
-
-            adjusted_comparator = self.get_sql_comparator(comparator)
-
-            if (
-                comparator in self.COMPARISON
-                and not self.is_another_column(json_input[value][comparator])
-                and not isinstance(json_input[value][comparator], dict)
-            ):
-                return (
-                    True,
-                    f"{value} {adjusted_comparator} ?",
-                    json_input[value][comparator]
-                    if isinstance(json_input[value][comparator], tuple)
-                    else (json_input[value][comparator],),
-                )
-
-            elif comparator in self.COMPARISON and self.is_another_column(
-                json_input[value][comparator]
-            ):
-                return (
-                    True,
-                    f"{value} {adjusted_comparator} {json_input[value][comparator]}",
-                    (),
-                )
-
-            elif list(json_input[value][comparator])[0] in self.AGGREGATES:
-                # Extract the aggregate function name and its argument
-                aggregate_function = list(json_input[value][comparator])[0]
-                aggregate_argument = json_input[value][comparator][aggregate_function]
-
-                return (
-                    True,
-                    f"{value} {adjusted_comparator} {aggregate_function}({aggregate_argument})",
-                    (),
-                )
-
-            elif comparator in self.SPECIAL_COMPARISON:
                 if comparator == "BETWEEN":
-                    return (
-                        True,
-                        f"{value} BETWEEN ? AND ?",
-                        tuple(json_input[value][comparator]),
-                    )
-
-                elif comparator == "IN":
-                    # Determine the number of placeholders needed
-                    num_placeholders = len(json_input[value][comparator])
-
-                    # Generate the placeholders string
-                    placeholders = (
-                        "?"
-                        if num_placeholders == 1
-                        else ",".join(["?" for _ in range(num_placeholders)])
-                    )
-
-                    return (
-                        True,
-                        f"{value} IN ({placeholders})",
-                        tuple(json_input[value][comparator]),
-                    )
-
-            return False, f"Comparitor Error - {comparator}"
-
-        elif value in self.LOGICAL and isinstance(json_input[value], list):
-            if len(json_input[value]) < 2:
-                return False, "Invalid boolean length, must be >= 2"
-
-            data = []
-            safe = (True, "")
-            for case in json_input[value]:
-                evaluation = self.logic_parse(case)
-                if not evaluation[0]:
-                    safe = evaluation
-                    break
+                    nodes.append(Between(column, values[0], values[1]))
+                else:
+                    nodes.append(InList(column, values))
+                    if tracker is not None:
+                        tracker.sizes.append(len(values))
+                continue
+
+            sql_comparator = self.get_sql_comparator(comparator)
+            if isinstance(operand, dict):
+                if not self.is_valid_aggregate(operand):
+                    return False, f"Bad {column}, non {column_type}"
+                function = next(iter(operand))
+                if scope is not None and not scope.allows(operand[function]):
+                    return False, f"Column not allowed: {operand[function]}"
+                operand_node = Aggregate(function, operand[function])
+
+            elif column_refs and self.is_another_column(operand):
+                operand_node = ColumnRef(operand)
+
+            elif isinstance(operand, column_type):
+                operand_node = Value(operand)
+
+            else:
+                return False, f"Bad {column}, non {column_type}"
+
+            nodes.append(Compare(column, sql_comparator, operand_node))
 
-                data.append(evaluation[1:])
+        if len(nodes) == 1:
+            return True, nodes[0]
+        return True, BoolOp("AND", nodes, implicit=True)
 
-            if not safe[0]:
-                return safe
+    def _compile_logic(
+        self, logic: Any, column_refs: bool, tracker: Optional[BudgetTracker] = None,
+        scope: Optional[ColumnScope] = None
+    ) -> tuple[Literal[False], str] | tuple[Literal[True], Node]:
+        """Validate a logic tree into an IR predicate in a single pass.
+
+        This is the one predicate engine behind ``logic_parse`` and the
+        ``logic``/``where``/``having`` clauses of ``sql_parse``. Cases are
+        visited depth first with an explicit stack of open groups, so nesting
+        depth is not bounded by the recursion limit. A node with several
+        columns is an implicit AND.
+
+        Args:
+            logic: The logic tree.
+            column_refs (bool): Treat string values that name an allowed
+                column as column references (``logic_parse`` semantics)
+                instead of always binding them as parameters.
+            tracker (BudgetTracker, optional): Counts depth, comparisons and
+                IN-list sizes against the ``budget`` as the tree is walked.
+            scope (ColumnScope, optional): The request's tables, whose column
+                lists every column of the tree must also be in.
 
-            params = []
-            output = []
-            for entry in data:
-                if isinstance(entry[1], tuple):
-                    for sub in entry[1]:
-                        params.append(sub)
+        Returns:
+            (True, node) or (False, error_message) for the first invalid case
+            in document order.
+        """
+        logical = self.policy.logical
+        # Open groups as [operator, iterator over remaining items, operands, implicit]
+        stack: List[list] = []
+        item = logic
+        if tracker is not None:
+            # One for the tree; groups deepen it as they open
+            tracker.depth(1)
+
+        while True:
+            node = None
+            if type(item) is _LogicCase:
+                case = item
+            elif not isinstance(item, dict):
+                if not item:
+                    return False, "Nothing To Compute"
+                return False, f"Invalid Input - {item}"
+            elif len(item) == 1:
+                case = next(iter(item.items()))
+            elif not item:
+                return False, "Nothing To Compute"
+            else:
+                # Implicit AND over several columns
+                case = None
+                stack.append(["AND", map(_LogicCase, item.items()), [], True])
+                if tracker is not None:
+                    over = tracker.depth(len(stack) + 1)
+                    if over:
+                        return over
+
+            if case is not None:
+                key, condition = case
+                if isinstance(key, str) and key in logical:
+                    if not isinstance(condition, list):
+                        return False, f"Bad {key}, non list"
+                    if len(condition) < 2:
+                        return False, "Invalid boolean length, must be >= 2"
+                    stack.append([key.upper(), iter(condition), [], False])
+                    if tracker is not None:
+                        over = tracker.depth(len(stack) + 1)
+                        if over:
+                            return over
                 else:
-                    params.append(entry[1])
-                output.append(entry[0])
+                    compiled = self._compile_case(key, condition, column_refs, tracker, scope)
+                    if not compiled[0]:
+                        return compiled
+                    node = compiled[1]
+
+            # Attach finished nodes to their group and move on to the next
+            # pending item, closing exhausted groups
+            while True:
+                if node is not None:
+                    if not stack:
+                        return True, node
+                    stack[-1][2].append(node)
+                group = stack[-1]
+                item = next(group[1], _DONE)
+                if item is not _DONE:
+                    break
+                stack.pop()
+                node = BoolOp(group[0], group[2], group[3])
 
-            params = tuple(params)
+    def logic_compile(
+        self, json_input: dict
+    ) -> tuple[Literal[False], str] | tuple[Literal[True], Node]:
+        """Validate a logic tree into an IR predicate (see ``ir``).
 
-            data = f"({f' {value.upper()} '.join(output)})"
+        The node can be rendered any number of times with ``render`` without
+        being validated again.
+        """
+        return self._compile_logic(json_input, column_refs=True,
+                                   tracker=self._budget_tracker("logic"))
 
-            return True, data, params if isinstance(params, tuple) else (params,)
+    def _budget_tracker(self, section: str, stats: bool = False) -> Optional[BudgetTracker]:
+        """A tracker of ``budget`` for a new request.
 
-    def _validate_join_condition(self, condition: str) -> bool:
-        """Validate JOIN ON condition for security."""
+        Args:
+            section (str): The section validation starts with.
+            stats (bool): Track the request without a budget too, for the
+                logic stats of ``metrics``.
+
+        Returns:
+            None without a budget, unless ``stats`` is set.
+        """
+        if self.budget is None and not stats:
+            return None
+        tracker = BudgetTracker(self.budget)
+        if self.budget is not None:
+            tracker.enter(section)
+        return tracker
+
+    def render(self, node: Node) -> tuple[str, Union[tuple, Dict[str, Any]]]:
+        """Render an IR node from ``sql_compile``/``logic_compile`` into ``(sql, params)``."""
+        return self.renderer.render(node)
+
+    def _validate_join_condition(self, condition: str, aliases: Optional[Set[str]] = None) -> bool:
+        """Validate a JOIN ON condition (see ``joins.parse_join_condition``).
+
+        Args:
+            condition (str): The ON condition.
+            aliases (Optional[Set[str]]): Aliases (or names of unaliased tables)
+                the condition may refer to; not checked if None.
+
+        Returns:
+            bool: True if the condition parses, only references declared
+            aliases and every column is allowed, either qualified
+            (``u.id``) or bare (``id``).
+        """
         if not condition or not isinstance(condition, str):
             return False
 
-        # Check for suspicious patterns
-        suspicious_patterns = [
-            r';\s*DROP',
-            r';\s*DELETE',
-            r';\s*INSERT',
-            r';\s*UPDATE',
-            r'--',
-            r'/\*',
-            r'xp_',
-            r'sp_'
-        ]
+        columns = parse_join_condition(condition)
+        if columns is None:
+            return False
 
-        condition_upper = condition.upper()
-        for pattern in suspicious_patterns:
-            if re.search(pattern, condition_upper, re.IGNORECASE):
+        rule = self.policy.columns
+        for qualifier, column in columns:
+            if aliases is not None and qualifier not in aliases:
+                return False
+            qualified = f"{qualifier}.{column}"
+            if qualified in rule.denied or column in rule.denied:
                 return False
+            if not (rule.wildcard or qualified in rule.allowed or column in rule.allowed):
+                return False
+
+        return True
+
+    def _check_scope(
+        self, scope: ColumnScope, items: Sequence[str], joins: Sequence[Join] = (),
+        columns: Sequence[str] = ()
+    ) -> Optional[tuple[Literal[False], str]]:
+        """Check SELECT items, ON conditions and plain ``columns`` against ``scope``.
 
+        An aggregate item is checked by its argument; ``COUNT(*)`` reads no
+        column and is always allowed.
+
+        Returns:
+            The rejection for the first column not allowed, or None.
+        """
+        aggregates = self.policy.aggregates
+        for item in items:
+            if item.endswith("*") and self._whole_tables(scope, item):
+                continue
+            column = item
+            match = _AGGREGATE_ITEM.match(item) if "(" in item else None
+            if match is not None and match.group(1).upper() in aggregates:
+                column = match.group(2).strip()
+                if column == "*" and match.group(1).upper() == "COUNT":
+                    continue
+            if not scope.allows(column):
+                return False, f"Column not allowed: {item}"
+        for join in joins:
+            for qualifier, column in parse_join_condition(join.on) if join.on else ():
+                if not scope.allows(f"{qualifier}.{column}"):
+                    return False, f"Column not allowed: {qualifier}.{column}"
+        for column in columns:
+            if not scope.allows(column):
+                return False, f"Column not allowed: {column}"
+        return None
+
+    def _whole_tables(self, scope: ColumnScope, item: str) -> bool:
+        """Whether ``*`` or ``alias.*`` reads tables whose column list is their schema.
+
+        With a schema read by ``from_sqlite``, a restricted table whose
+        allowed columns cover every column it has, none of them in
+        ``not_allowed_columns``, may be read whole.
+        """
+        schema = self.schema
+        if schema is None:
+            return False
+        if item == "*":
+            entries = scope.qualifiers.values()
+        else:
+            entry = scope.qualifiers.get(item[:-2]) if item.endswith(".*") else None
+            if entry is None:
+                return False
+            entries = (entry,)
+        denied = self.policy.columns.denied
+        for table, allowed in entries:
+            if allowed is None:
+                continue
+            known = schema.tables.get(table)
+            if known is None or not allowed.issuperset(known.columns) \
+                    or not denied.isdisjoint(known.columns):
+                return False
         return True
 
     def _parse_table_with_alias(self, table_input: Union[str, Dict]) -> Dict[str, str]:
@@ -517,50 +1122,51 @@ class JsonSQL:
         else:
             raise ValueError(f"Invalid table format: {table_input}")
 
-    def _build_table_clause(self, table_info: Dict[str, str]) -> str:
-        """Build table clause with optional alias."""
-        table_clause = table_info["table"]
-        if table_info["alias"]:
-            table_clause += f" AS {table_info['alias']}"
-        return table_clause
+    def _compile_joins(self, joins: List[Dict], table: Optional[TableRef] = None) -> tuple:
+        """Validate JOIN clauses into IR ``Join`` nodes.
 
-    def _parse_joins(self, joins: List[Dict]) -> tuple[str, List[Any]]:
-        """Parse JOIN clauses and return SQL and parameters."""
+        Args:
+            joins (List[Dict]): The request's ``joins``.
+            table (Optional[TableRef]): The FROM table. If given, ON conditions
+                may only refer to it and to tables joined up to that point.
+
+        Raises:
+            ValueError: If a JOIN type, table or ON condition is not allowed.
+        """
         if not joins:
-            return "", []
+            return ()
 
-        join_clauses = []
-        all_params = []
+        compiled = []
+        policy = self.policy
+        declared = None if table is None else _table_names(table)
 
         for join in joins:
             # Validate JOIN type
             join_type = join.get("type", "INNER JOIN").upper()
-            if not self._is_entity_allowed(join_type, self.ALLOWED_JOINS, self.NOT_ALLOWED_JOINS):
+            if not policy.joins.allows(join_type):
                 raise ValueError(f"JOIN type not allowed: {join_type}")
 
             # Parse target table
             table_info = self._parse_table_with_alias(join)
-            if not self._is_entity_allowed(table_info["table"], self.ALLOWED_TABLES, self.NOT_ALLOWED_TABLES):
+            if not policy.tables.allows(table_info["table"]):
                 raise ValueError(f"Table not allowed: {table_info['table']}")
-
-            # Build JOIN clause
-            table_clause = self._build_table_clause(table_info)
+            joined = TableRef(table_info["table"], table_info["alias"])
+            if declared is not None:
+                declared |= _table_names(joined)
 
             # Handle ON condition
             on_condition = join.get("on", "")
-            if on_condition and not self._validate_join_condition(on_condition):
+            if on_condition and not self._validate_join_condition(on_condition, declared):
                 raise ValueError(f"Invalid JOIN condition: {on_condition}")
 
-            join_clause = f"{join_type} {table_clause}"
-            if on_condition:
-                join_clause += f" ON {on_condition}"
+            compiled.append(Join(join_type, joined, on_condition or None))
 
-            join_clauses.append(join_clause)
+        return tuple(compiled)
 
-        return " ".join(join_clauses), all_params
+    statement_id = staticmethod(statement_id)
 
     def sql_parse(
-        self, json_input: dict, with_values: bool = False
+        self, json_input: dict, with_values: bool = False, with_id: bool = False
     ) -> tuple[Literal[False], str] | tuple[Literal[True], str, tuple]:
         """
         Enhanced SQL parser with full JOIN support.
@@ -568,6 +1174,8 @@ class JsonSQL:
         Args:
             json_input (dict): JSON input containing query structure
             with_values (bool): If True, returns SQL with actual values instead of placeholders
+            with_id (bool): If True, appends the stable ``statement_id`` of the
+                returned SQL (None on failure), for use as a prepared-statement key
 
         Supports both legacy format and new extended format:
 
@@ -601,216 +1209,808 @@ class JsonSQL:
             "offset": 0
         }
 
+        Requests that only differ in literal values share one cached SQL
+        template (see ``template_cache``); a cache hit skips validation and
+        rendering and only extracts the parameters.
+
         Returns:
             tuple[bool, str, tuple]: (success, sql, params) or (False, error_message, ())
+            The params are a dict instead of a tuple for the "named" and
+            "pyformat" paramstyles.
+            tuple[bool, str, tuple, str]: With ``with_id``, (success, sql, params, statement_id)
+            or (False, error_message, (), None)
+        """
+        if self.instrumentation is not None:
+            result = self._wrapped("sql_parse", self._sql_parse_cached)(json_input, with_values)
+        elif self.metrics is not None:
+            result = self._measured("sql_parse", self._sql_parse_cached, json_input, with_values)
+        else:
+            result = self._sql_parse_cached(json_input, with_values)
+        if with_id:
+            return result + (statement_id(result[1]) if result[0] else None,)
+        return result
+
+    def sql_parse_many(
+        self,
+        json_inputs: Iterable[dict],
+        with_values: bool = False,
+        group_size: int = 0
+    ) -> Iterator[tuple]:
+        """Lazily run ``sql_parse`` over an iterable of requests.
+
+        All requests share the template cache, and nothing is read from
+        ``json_inputs`` before the caller asks for the next result, so memory
+        stays constant however long the stream is.
+
+        Args:
+            json_inputs (Iterable[dict]): Requests in the ``sql_parse`` format.
+            with_values (bool): Same as for ``sql_parse``.
+            group_size (int): If > 0, read the requests in chunks of this size
+                and yield one group per distinct result in each chunk, in
+                first-seen order, so each valid group can be handed to
+                ``executemany``. Memory is then bounded by the chunk size.
+
+        Yields:
+            Without grouping, the ``sql_parse`` result of each request in
+            input order. With grouping, ``(True, sql, [params, ...], [index, ...])``
+            per distinct SQL text and ``(False, error_message, [], [index, ...])``
+            per distinct rejection, where ``index`` is the position in
+            ``json_inputs``.
+        """
+        parse = self._wrapped("sql_parse", self._sql_parse_cached)
+        if group_size <= 0:
+            for json_input in json_inputs:
+                yield parse(json_input, with_values)
+            return
+
+        json_inputs = iter(json_inputs)
+        offset = 0
+        while True:
+            chunk = list(islice(json_inputs, group_size))
+            if not chunk:
+                return
+
+            groups: Dict[tuple, tuple] = {}
+            for index, json_input in enumerate(chunk, offset):
+                result = parse(json_input, with_values)
+                group = groups.get(result[:2])
+                if group is None:
+                    group = groups[result[:2]] = (result[0], result[1], [], [])
+                if result[0]:
+                    group[2].append(result[2])
+                group[3].append(index)
+            offset += len(chunk)
+            yield from groups.values()
+
+    def sql_parse_bytes(
+        self, data: Buffer, with_values: bool = False, with_id: bool = False
+    ) -> tuple[Literal[False], str] | tuple[Literal[True], str, tuple]:
+        """``sql_parse`` of a raw JSON request body.
+
+        The top-level members are read incrementally (see ``ingest``): the
+        ``query``, ``from``, ``table`` and ``joins`` values are decoded and
+        checked against the policy as soon as they are reached, and a
+        forbidden one rejects the request without decoding any other value.
+        Only an accepted body is decoded as a whole and passed to
+        ``sql_parse``. A ``table`` is only used by ``sql_parse`` when there is
+        no ``from``, so a forbidden ``table`` is rejected once the whole body
+        has been scanned (still without decoding it).
+
+        The verdict is the one of ``sql_parse(json.loads(data))``, but when a
+        request breaks several rules the message may name a different one.
+        Early rejections are counted in ``metrics`` but not recorded by
+        ``capture``.
+
+        Unlike ``json.loads``, which keeps the last of repeated keys, a
+        repeated top-level key rejects the body with
+        ``"Invalid JSON: Duplicate key: ..."`` (or with the rejection of a
+        forbidden member read before it), even if the last value would be
+        accepted. Members are checked as they are read, so accepting the
+        last value would mean scanning every body to the end before any
+        early rejection. Keys repeated inside nested objects are left to
+        ``json.loads``.
+
+        Args:
+            data (bytes | bytearray | memoryview): UTF-8 JSON object; not copied.
+            with_values (bool): Same as for ``sql_parse``.
+            with_id (bool): Same as for ``sql_parse``.
+
+        Returns:
+            The ``sql_parse`` result; ``(False, "Invalid JSON: ...", ())`` if
+            ``data`` is not a JSON object.
+        """
+        start = time.perf_counter()
+        query = None
+        try:
+            rejection, query = self._prescan(data)
+            if rejection is None:
+                if isinstance(data, memoryview):
+                    data = str(data, "utf-8")
+                json_input = json.loads(data)
+        except ValueError as e:
+            rejection = f"Invalid JSON: {e}"
+        if rejection is None:
+            return self.sql_parse(json_input, with_values, with_id)
+
+        result = False, rejection, ()
+        if self.metrics is not None:
+            self.metrics.observe("sql_parse", {"query": query}, result,
+                                 time.perf_counter() - start)
+        return result + (None,) if with_id else result
+
+    def _prescan(self, data: Buffer) -> Tuple[Optional[str], Any]:
+        """Check the members of a raw request that decide its tables early.
+
+        Returns:
+            (rejection message or None, the decoded ``query`` or None)
+
+        Raises:
+            ValueError: If ``data`` is not a JSON object.
         """
+        policy = self.policy
+        seen: Set[str] = set()
+        query = table = None
+        for key, start, end in iter_members(data):
+            if key in seen:
+                raise ValueError(f"Duplicate key: {key}")
+            seen.add(key)
+            if key == "query":
+                query = load_value(data, start, end)
+                if isinstance(query, str) and not policy.queries.allows(query):
+                    return f"Query not allowed: {query}", query
+            elif key == "from":
+                value = load_value(data, start, end)
+                if isinstance(value, (str, dict)):
+                    name = self._parse_table_with_alias(value)["table"]
+                    if isinstance(name, str) and not policy.tables.allows(name):
+                        return f"Table not allowed: {name}", query
+            elif key == "table":
+                table = load_value(data, start, end)
+            elif key == "joins":
+                joins = load_value(data, start, end)
+                for join in joins if isinstance(joins, list) else ():
+                    if not isinstance(join, dict):
+                        break
+                    join_type = join.get("type", "INNER JOIN")
+                    if not isinstance(join_type, str):
+                        break
+                    if not policy.joins.allows(join_type.upper()):
+                        return (f"Error parsing SQL: JOIN type not allowed: "
+                                f"{join_type.upper()}"), query
+                    name = join.get("table", "")
+                    if isinstance(name, str) and not policy.tables.allows(name):
+                        return f"Error parsing SQL: Table not allowed: {name}", query
+        if "from" not in seen and isinstance(table, str) and not policy.tables.allows(table):
+            return f"Table not allowed: {table}", query
+        return None, query
+
+    def _sql_parse_cached(
+        self, json_input: dict, with_values: bool, span: Optional[Span] = None,
+        stats_out: Optional[List[LogicStats]] = None
+    ) -> tuple[Literal[False], str] | tuple[Literal[True], str, tuple]:
+        """``sql_parse`` backed by the request-shape template cache.
+
+        With ``stats_out``, the ``metrics.bucket_stats`` of the request are
+        appended to it, unless it is rejected.
+        """
+        if self.capture is not None:
+            self.capture.record(json_input)
+        template = self._template_key("sql", json_input)
+        cached = None
+        if template is not None:
+            cached = self.template_cache.get(template[0])
+        if span is not None:
+            span.attributes["cached"] = cached is not None
+            span.phase("template")
+
+        if cached is not None:
+            sql, stats = cached
+            params = template[1]
+        else:
+            result = self._sql_parse(json_input, span, stats_out is not None)
+            if not result[0]:
+                return result
+            _, sql, params, stats = result
+            if template is not None and self._same_params(template[1], params):
+                self.template_cache.put(template[0], (sql, stats))
+        if stats_out is not None and stats is not None:
+            stats_out.append(stats)
+
+        # If with_values is True, substitute parameters with actual values
+        if with_values and params:
+            try:
+                return True, self.renderer.inline(sql, params), ()
+            except Exception as e:
+                return False, f"Error parsing SQL: {str(e)}", ()
+            finally:
+                if span is not None:
+                    span.phase("with_values")
+
+        result = True, sql, params if with_values else self.renderer.bind(params)
+        if span is not None:
+            span.phase("with_values" if with_values else "bind")
+        return result
+
+    def sql_compile(
+        self, json_input: dict
+    ) -> tuple[Literal[False], str] | tuple[Literal[True], Select]:
+        """Validate a request in the ``sql_parse`` format into an IR ``Select``.
 
+        The node holds everything needed to render the statement (see
+        ``render``), so a validated request can be kept and rendered again
+        without touching the policy.
+
+        Returns:
+            (True, Select) or (False, error_message).
+        """
+        return self._sql_compile(json_input)
+
+    def _sql_compile(
+        self, json_input: dict, span: Optional[Span] = None,
+        tracker: Optional[BudgetTracker] = None
+    ) -> tuple[Literal[False], str] | tuple[Literal[True], Select]:
+        """``sql_compile``, checking the budget with ``tracker`` if given."""
         try:
+            policy = self.policy
+
             # Validate required fields
             if "query" not in json_input:
-                return False, "Missing required field: query", ()
+                return False, "Missing required field: query"
             if "items" not in json_input:
-                return False, "Missing required field: items", ()
+                return False, "Missing required field: items"
 
             # Validate query type
             query = json_input["query"]
-            if not self._is_entity_allowed(query, self.ALLOWED_QUERIES, self.NOT_ALLOWED_QUERIES):
-                return False, f"Query not allowed: {query}", ()
+            if not policy.queries.allows(query):
+                return False, f"Query not allowed: {query}"
 
             # Validate items
             items = json_input["items"]
             if not isinstance(items, list):
-                return False, "Items must be a list", ()
+                return False, "Items must be a list"
+            if tracker is None:
+                tracker = self._budget_tracker("items")
+            # Without a budget the tracker only gathers the stats of the
+            # logic trees, so the section limits are not checked
+            limits = tracker if tracker is not None and tracker.budget is not None else None
+            if limits is not None:
+                over = limits.check("max_items", len(items))
+                if over:
+                    return over
 
             for item in items:
                 item_name = item if isinstance(item, str) else str(item)
-                if not self._is_entity_allowed(item_name, self.ALLOWED_ITEMS, self.NOT_ALLOWED_ITEMS):
-                    return False, f"Item not allowed: {item_name}", ()
-
-            # Build SELECT clause
-            select_clause = f"{query} {','.join(items)}"
+                if not policy.items.allows(item_name):
+                    return False, f"Item not allowed: {item_name}"
+            self._check_names(items)
+            if span is not None:
+                span.phase("items")
 
             # Determine if using legacy or extended format
             is_extended = "from" in json_input or "joins" in json_input
-            all_params = []
-
-            if is_extended:
-                # Extended format with JOIN support
-
-                # Parse FROM clause
-                from_clause = ""
-                if "from" in json_input:
-                    from_info = self._parse_table_with_alias(
-                        json_input["from"])
-                    if not self._is_entity_allowed(from_info["table"], self.ALLOWED_TABLES, self.NOT_ALLOWED_TABLES):
-                        return False, f"Table not allowed: {from_info['table']}", ()
-                    from_clause = f"FROM {self._build_table_clause(from_info)}"
-                elif "table" in json_input:
-                    # Fallback to legacy table format
-                    table = json_input["table"]
-                    if not self._is_entity_allowed(table, self.ALLOWED_TABLES, self.NOT_ALLOWED_TABLES):
-                        return False, f"Table not allowed: {table}", ()
-                    from_clause = f"FROM {table}"
-                else:
-                    return False, "Missing FROM clause (use 'from' or 'table')", ()
-
-                # Parse JOINs
-                join_clause = ""
-                if "joins" in json_input:
-                    join_clause, join_params = self._parse_joins(
-                        json_input["joins"])
-                    all_params.extend(join_params)
-
-                # Parse WHERE clause
-                where_clause = ""
-                if "where" in json_input:
-                    where_condition, where_params = self._parse_logic_condition(
-                        json_input["where"])
-                    if where_condition:
-                        where_clause = f"WHERE {where_condition}"
-                        all_params.extend(where_params)
-                elif "connection" in json_input and "logic" in json_input:
-                    # Legacy WHERE support
-                    connection = json_input["connection"]
-                    if not self._is_entity_allowed(connection, self.ALLOWED_CONNECTIONS, self.NOT_ALLOWED_CONNECTIONS):
-                        return False, f"Connection not allowed: {connection}", ()
-                    logic_condition, logic_params = self._parse_logic_condition(
-                        json_input["logic"])
-                    if logic_condition:
-                        where_clause = f"{connection} {logic_condition}"
-                        all_params.extend(logic_params)
-
-                # Parse GROUP BY
-                group_by_clause = ""
-                if "group_by" in json_input:
-                    group_by = json_input["group_by"]
-                    if isinstance(group_by, list):
-                        group_by_clause = f"GROUP BY {','.join(group_by)}"
-
-                # Parse HAVING
-                having_clause = ""
-                if "having" in json_input:
-                    having_condition, having_params = self._parse_logic_condition(
-                        json_input["having"])
-                    if having_condition:
-                        having_clause = f"HAVING {having_condition}"
-                        all_params.extend(having_params)
-
-                # Parse ORDER BY
-                order_by_clause = ""
-                if "order_by" in json_input:
-                    order_by = json_input["order_by"]
-                    if isinstance(order_by, list):
-                        order_items = []
-                        for item in order_by:
-                            if isinstance(item, dict):
-                                column = item.get("column", "")
-                                direction = item.get(
-                                    "direction", "ASC").upper()
-                                if direction not in ["ASC", "DESC"]:
-                                    direction = "ASC"
-                                order_items.append(f"{column} {direction}")
-                            else:
-                                order_items.append(str(item))
-                        if order_items:
-                            order_by_clause = f"ORDER BY {','.join(order_items)}"
-
-                # Parse LIMIT and OFFSET
-                limit_clause = ""
-                if "limit" in json_input:
-                    limit = json_input["limit"]
-                    if isinstance(limit, int) and limit > 0:
-                        limit_clause = f"LIMIT {limit}"
-                        if "offset" in json_input:
-                            offset = json_input["offset"]
-                            if isinstance(offset, int) and offset >= 0:
-                                limit_clause += f" OFFSET {offset}"
-
-                # Assemble final SQL
-                sql_parts = [select_clause, from_clause, join_clause, where_clause,
-                             group_by_clause, having_clause, order_by_clause, limit_clause]
-                sql = " ".join([part for part in sql_parts if part])
 
-            else:
+            if not is_extended:
                 # Legacy format (backward compatibility)
                 if "table" not in json_input:
-                    return False, "Missing required field: table", ()
+                    return False, "Missing required field: table"
+                if limits is not None:
+                    limits.enter("tables")
 
                 table = json_input["table"]
-                if not self._is_entity_allowed(table, self.ALLOWED_TABLES, self.NOT_ALLOWED_TABLES):
-                    return False, f"Table not allowed: {table}", ()
-
-                sql = f"{select_clause} FROM {table}"
+                if not policy.tables.allows(table):
+                    return False, f"Table not allowed: {table}"
+                scope = policy.scope(((table, None),))
+                if scope is not None:
+                    rejected = self._check_scope(scope, items)
+                    if rejected:
+                        return rejected
+                if span is not None:
+                    span.phase("tables")
 
                 # Handle legacy WHERE clause
+                connection, where = "WHERE", None
                 if "connection" in json_input and "logic" in json_input:
                     connection = json_input["connection"]
-                    if not self._is_entity_allowed(connection, self.ALLOWED_CONNECTIONS, self.NOT_ALLOWED_CONNECTIONS):
-                        return False, f"Connection not allowed: {connection}", ()
-
-                    logic_condition, logic_params = self._parse_logic_condition(
-                        json_input["logic"])
-                    if logic_condition:
-                        sql += f" {connection} {logic_condition}"
-                        all_params.extend(logic_params)
-
-            # If with_values is True, substitute parameters with actual values
-            if with_values and all_params:
-                sql_with_values = sql
-                for param in all_params:
-                    # Handle different parameter types
-                    if param is None:
-                        sql_with_values = sql_with_values.replace(
-                            '?', 'NULL', 1)
-                    elif isinstance(param, str):
-                        # Escape single quotes in strings
-                        escaped_param = param.replace("'", "''")
-                        sql_with_values = sql_with_values.replace(
-                            '?', f"'{escaped_param}'", 1)
-                    elif isinstance(param, (int, float)):
-                        sql_with_values = sql_with_values.replace(
-                            '?', str(param), 1)
-                    elif isinstance(param, bool):
-                        sql_with_values = sql_with_values.replace(
-                            '?', 'TRUE' if param else 'FALSE', 1)
+                    if not policy.connections.allows(connection):
+                        return False, f"Connection not allowed: {connection}"
+
+                    if limits is not None:
+                        limits.enter("logic")
+                    logic = self._compile_condition(json_input["logic"], tracker, scope)
+                    if span is not None:
+                        span.phase("where")
+                    if not logic[0]:
+                        return logic
+                    where = logic[1]
+
+                return True, Select(query, items, TableRef(table),
+                                    connection=connection, where=where)
+
+            # Extended format with JOIN support
+
+            # Parse FROM clause
+            if limits is not None:
+                limits.enter("tables")
+            if "from" in json_input:
+                from_info = self._parse_table_with_alias(json_input["from"])
+                if not policy.tables.allows(from_info["table"]):
+                    return False, f"Table not allowed: {from_info['table']}"
+                table = TableRef(from_info["table"], from_info["alias"])
+            elif "table" in json_input:
+                # Fallback to legacy table format
+                if not policy.tables.allows(json_input["table"]):
+                    return False, f"Table not allowed: {json_input['table']}"
+                table = TableRef(json_input["table"])
+            else:
+                return False, "Missing FROM clause (use 'from' or 'table')"
+            if span is not None:
+                span.phase("tables")
+
+            # Parse JOINs
+            joins = ()
+            if "joins" in json_input:
+                if limits is not None and isinstance(json_input["joins"], list):
+                    over = limits.enter("joins", "max_joins", len(json_input["joins"]))
+                    if over:
+                        return over
+                joins = self._compile_joins(json_input["joins"], table)
+                if span is not None:
+                    span.phase("joins")
+
+            # Resolve columns against per-table column lists
+            scope = None
+            if policy.table_columns:
+                scope = policy.scope([(table.name, table.alias)] + [
+                    (join.table.name, join.table.alias) for join in joins])
+            if scope is not None:
+                rejected = self._check_scope(scope, items, joins)
+                if rejected:
+                    return rejected
+
+            # Parse WHERE clause
+            connection, where = "WHERE", None
+            if "where" in json_input:
+                if limits is not None:
+                    limits.enter("where")
+                where = self._compile_condition(json_input["where"], tracker, scope)
+                if span is not None:
+                    span.phase("where")
+                if not where[0]:
+                    return where
+                where = where[1]
+            elif "connection" in json_input and "logic" in json_input:
+                # Legacy WHERE support
+                connection = json_input["connection"]
+                if not policy.connections.allows(connection):
+                    return False, f"Connection not allowed: {connection}"
+                if limits is not None:
+                    limits.enter("logic")
+                where = self._compile_condition(json_input["logic"], tracker, scope)
+                if span is not None:
+                    span.phase("where")
+                if not where[0]:
+                    return where
+                where = where[1]
+
+            # Parse GROUP BY
+            group_by = None
+            if isinstance(json_input.get("group_by"), list):
+                group_by = json_input["group_by"]
+                self._check_names(group_by)
+                if scope is not None:
+                    rejected = self._check_scope(scope, (), columns=group_by)
+                    if rejected:
+                        return rejected
+
+            # Parse HAVING
+            having = None
+            if "having" in json_input:
+                if limits is not None:
+                    limits.enter("having")
+                having = self._compile_condition(json_input["having"], tracker, scope)
+                if not having[0]:
+                    return having
+                having = having[1]
+
+            # Parse ORDER BY
+            order_by = []
+            if isinstance(json_input.get("order_by"), list):
+                if limits is not None:
+                    over = limits.enter("order_by", "max_order_by", len(json_input["order_by"]))
+                    if over:
+                        return over
+                for item in json_input["order_by"]:
+                    if isinstance(item, dict):
+                        direction = item.get("direction", "ASC").upper()
+                        if direction not in ["ASC", "DESC"]:
+                            direction = "ASC"
+                        order_by.append(OrderItem(item.get("column", ""), direction))
                     else:
-                        # For other types, convert to string and quote
-                        escaped_param = str(param).replace("'", "''")
-                        sql_with_values = sql_with_values.replace(
-                            '?', f"'{escaped_param}'", 1)
-                return True, sql_with_values, ()
+                        order_by.append(OrderItem(str(item)))
+                if scope is not None:
+                    rejected = self._check_scope(
+                        scope, (), columns=[item.column for item in order_by])
+                    if rejected:
+                        return rejected
+
+            # Parse AFTER (keyset pagination)
+            if "after" in json_input:
+                if group_by is not None or "offset" in json_input:
+                    return False, "'after' cannot be combined with group_by or offset"
+                seek = self._compile_after(json_input["after"], order_by)
+                if not seek[0]:
+                    return seek
+                where = seek[1] if where is None else BoolOp(
+                    "AND", (where, seek[1]), implicit=True)
+
+            # Parse LIMIT and OFFSET
+            limit = None
+            if isinstance(json_input.get("limit"), int) and json_input["limit"] > 0:
+                offset = json_input.get("offset")
+                if not (isinstance(offset, int) and offset >= 0):
+                    offset = None
+                limit = Limit(json_input["limit"], offset)
+            if span is not None:
+                span.phase("clauses")
+
+            return True, Select(query, items, table, joins, connection, where,
+                                group_by, having, order_by, limit)
+
+        except Exception as e:
+            return False, f"Error parsing SQL: {str(e)}"
 
-            return True, sql, tuple(all_params)
+    def _seek_order(
+        self, order_by: Sequence[OrderItem]
+    ) -> tuple[Literal[False], str] | tuple[Literal[True], tuple]:
+        """Return the ``(column, direction)`` pairs a keyset can follow.
 
+        Every ORDER BY term must be an allowed column; raw terms sort
+        ascending.
+        """
+        if not order_by:
+            return False, "'after' requires order_by"
+        order = []
+        for item in order_by:
+            if not self.policy.columns.allows(item.column):
+                return False, f"'after' requires order_by columns, got: {item.column}"
+            order.append((item.column, item.direction or "ASC"))
+        if len({column for column, _ in order}) != len(order):
+            return False, "'after' requires distinct order_by columns"
+        return True, tuple(order)
+
+    def _compile_after(
+        self, after: Any, order_by: Sequence[OrderItem]
+    ) -> tuple[Literal[False], str] | tuple[Literal[True], Seek]:
+        """Validate ``"after"`` into a ``Seek`` node consistent with ``order_by``.
+
+        ``after`` is either ``{column: value}`` for every ORDER BY column, or
+        a continuation token from ``page``/``continuation_token``.
+        """
+        order = self._seek_order(order_by)
+        if not order[0]:
+            return order
+        order = order[1]
+        columns = [column for column, _ in order]
+
+        if isinstance(after, str):
+            values = decode_token(after, order)
+            if values is None:
+                return False, "Invalid continuation token"
+        elif isinstance(after, dict):
+            if set(after) != set(columns):
+                return False, f"'after' must give a value for each order_by column: {', '.join(columns)}"
+            values = [after[column] for column in columns]
+        else:
+            return False, "'after' must be an object or a continuation token"
+
+        policy = self.policy
+        for column, value in zip(columns, values):
+            column_type = policy.column_type(column)
+            if value is None or isinstance(value, (list, dict)) or not isinstance(value, column_type):
+                return False, f"Bad {column}, non {column_type}"
+
+        return True, Seek(columns, [direction for _, direction in order], values)
+
+    def continuation_token(self, json_input: dict, row: Mapping[str, Any]) -> str:
+        """Return the token for the page after ``row``, the last row of a page.
+
+        Args:
+            json_input (dict): The request the row was read with.
+            row (Mapping[str, Any]): The row by column name (e.g. a dict or a
+                ``sqlite3.Row``); an ORDER BY column ``u.id`` is looked up as
+                ``u.id``, then as ``id``.
+
+        Raises:
+            ValueError: If the request is invalid, cannot be paged or the row
+                lacks an ORDER BY column.
+        """
+        compiled = self.sql_compile(json_input)
+        if not compiled[0]:
+            raise ValueError(compiled[1])
+        order = self._seek_order(compiled[1].order_by)
+        if not order[0]:
+            raise ValueError(order[1])
+        return self._row_token(order[1], row)
+
+    @staticmethod
+    def _row_token(order: tuple, row: Mapping[str, Any]) -> str:
+        values = []
+        for column, _ in order:
+            for key in (column, column.rpartition(".")[2]):
+                try:
+                    values.append(row[key])
+                    break
+                except (KeyError, IndexError):
+                    continue
+            else:
+                raise ValueError(f"Row has no value for order_by column: {column}")
+        return encode_token(order, values)
+
+    def page(
+        self, json_input: dict, pool: ConnectionPool
+    ) -> Tuple[List[tuple], Optional[str]]:
+        """Run one page of a keyset-paginated request.
+
+        The request needs an ``order_by`` of allowed columns that identifies
+        rows uniquely (e.g. ending with a primary key) and a ``limit``, the
+        page size. Pass the returned token back as ``"after"`` to get the next
+        page; since the query seeks straight past the previous page instead of
+        skipping rows, every page costs the same however deep it is.
+
+        Returns:
+            The rows, and the continuation token, or None after the last page.
+
+        Raises:
+            ValueError: If the request is invalid or cannot be paged.
+        """
+        if self.capture is not None:
+            self.capture.record(json_input)
+        compiled = self.sql_compile(json_input)
+        if not compiled[0]:
+            raise ValueError(compiled[1])
+        select = compiled[1]
+        if select.limit is None:
+            raise ValueError("page requires a positive limit")
+        order = self._seek_order(select.order_by)
+        if not order[0]:
+            raise ValueError(order[1])
+        planned = self._plan(select)
+        if not planned[0]:
+            raise ValueError(planned[1])
+
+        names = column_names(select.items)
+        columns = [] if names is None else list(names)
+
+        def describe(description):
+            if not columns:
+                columns.extend(column[0] for column in description)
+
+        rows = list(self._run(select, planned[1], pool, select.limit.count, describe))
+        if len(rows) < select.limit.count:
+            return rows, None
+        return rows, self._row_token(order[1], dict(zip(columns, rows[-1])))
+
+    @staticmethod
+    def _check_names(names: List[Any]) -> None:
+        """Reject non-string SELECT items or GROUP BY columns.
+
+        Raises:
+            TypeError: If any entry is not a string.
+        """
+        for index, name in enumerate(names):
+            if not isinstance(name, str):
+                raise TypeError(f"sequence item {index}: expected str instance, "
+                                f"{type(name).__name__} found")
+
+    def sql_plan(
+        self, json_input: dict
+    ) -> tuple[Literal[False], str] | tuple[Literal[True], Plan]:
+        """Validate a request into an executable ``Plan``.
+
+        Unlike ``sql_parse`` this applies every ``in_list_strategy``, so a
+        request with a very large IN list may become several statements,
+        e.g. creating and filling a temporary table first. Run it with
+        ``Plan.execute(connection)``, which yields the result rows.
+
+        Returns:
+            (True, Plan) or (False, error_message).
+        """
+        compiled = self.sql_compile(json_input)
+        if not compiled[0]:
+            return compiled
+        return self._plan(compiled[1])
+
+    def _plan(self, select: Select) -> tuple[Literal[False], str] | tuple[Literal[True], Plan]:
+        try:
+            return True, self.renderer.render_plan(select)
         except Exception as e:
-            return False, f"Error parsing SQL: {str(e)}", ()
+            return False, f"Error parsing SQL: {str(e)}"
+
+    def execute(
+        self, json_input: dict, pool: ConnectionPool, batch_size: Optional[int] = 1000
+    ) -> Iterator[tuple]:
+        """Validate a request and run it on a pooled sqlite3 connection.
+
+        The request is validated immediately; the query runs on the first
+        ``next()`` of the returned iterator, which fetches rows in batches of
+        ``batch_size`` so memory stays bounded however large the result is.
+        The connection goes back to the pool when the iterator is exhausted
+        or closed.
 
-    def _parse_logic_condition(self, logic: Dict) -> tuple[str, List[Any]]:
-        """Parse WHERE/HAVING logic conditions."""
+        Args:
+            json_input (dict): The request, as for ``sql_plan``.
+            pool (ConnectionPool): Where to run it. The paramstyle must be
+                one sqlite3 understands (qmark, numeric or named).
+            batch_size (Optional[int]): Rows per ``fetchmany``.
+
+        Raises:
+            ValueError: If the request or ``batch_size`` is invalid.
+        """
+        check_batch_size(batch_size)
+        if self.capture is not None:
+            self.capture.record(json_input)
+        compiled = self.sql_compile(json_input)
+        if not compiled[0]:
+            raise ValueError(compiled[1])
+        planned = self._plan(compiled[1])
+        if not planned[0]:
+            raise ValueError(planned[1])
+        return self._run(compiled[1], planned[1], pool, batch_size)
+
+    def _run(
+        self, select: Select, plan: Plan, pool: ConnectionPool, batch_size: Optional[int],
+        describe: Optional[Callable[[Any], None]] = None
+    ) -> Iterator[tuple]:
+        """Run a plan on ``pool`` through ``result_cache``, if there is one.
+
+        A SELECT is answered from the cache or cached once its rows have all
+        been read. Any other query is a write: it drops the cached results
+        of the tables it touches once it has run.
+        """
+        cache = self.result_cache
+        if cache is None:
+            return pool.execute(plan, batch_size, describe)
+        tables = (f"{select.table.name}",) + tuple(
+            f"{join.table.name}" for join in select.joins)
+
+        if f"{select.query}".upper() != "SELECT":
+            return self._run_write(cache, tables, pool.execute(plan, batch_size, describe))
+
+        key = None
+        if plan.single:
+            statement = plan.statements[0]
+            key = cache.key(pool.database, statement.sql, statement.params)
+        if key is None:
+            return pool.execute(plan, batch_size, describe)
+        return self._run_cached(cache, key, tables, plan, pool, batch_size, describe)
+
+    @staticmethod
+    def _run_write(cache: ResultCache, tables: tuple, rows: Iterator[tuple]) -> Iterator[tuple]:
+        try:
+            yield from rows
+        finally:
+            cache.invalidate(*tables)
+
+    @staticmethod
+    def _run_cached(
+        cache: ResultCache, key: Hashable, tables: tuple, plan: Plan, pool: ConnectionPool,
+        batch_size: Optional[int], describe: Optional[Callable[[Any], None]]
+    ) -> Iterator[tuple]:
+        cached = cache.get(key)
+        if cached is not None:
+            if describe is not None:
+                describe(cached[0])
+            yield from cached[1]
+            return
+
+        generation = cache.generation(tables)
+        description = []
+
+        def capture(cursor_description):
+            description.append(cursor_description)
+            if describe is not None:
+                describe(cursor_description)
+
+        # Collect the rows while they are streamed, up to max_rows
+        collected: Optional[List[tuple]] = []
+        for row in pool.execute(plan, batch_size, capture):
+            if collected is not None:
+                collected.append(row)
+                if len(collected) > cache.max_rows:
+                    collected = None
+            yield row
+        if collected is not None:
+            cache.put(key, description[0], collected, tables, generation)
+
+    def export(
+        self,
+        json_input: dict,
+        pool: ConnectionPool,
+        format: str = "ndjson",
+        compress: bool = False,
+        batch_size: int = 1000
+    ) -> Iterator[bytes]:
+        """Run a request like ``execute`` and stream the rows as encoded bytes.
+
+        Each fetch batch becomes one chunk, so memory is bounded by
+        ``batch_size`` however large the result is. Columns are named after
+        the validated ``items`` (their ``AS`` alias if any); for ``*`` the
+        names reported by the database are used.
+
+        Args:
+            json_input (dict): The request, as for ``sql_plan``.
+            pool (ConnectionPool): Where to run it.
+            format (str): "ndjson" (one JSON object per line) or "csv" (with
+                a header line).
+            compress (bool): Gzip the stream incrementally.
+            batch_size (int): Rows per ``fetchmany`` and per chunk.
+
+        Raises:
+            ValueError: If the request or an option is invalid.
+        """
+        if format not in EXPORT_FORMATS:
+            raise ValueError(f"Invalid export format: {format!r} (expected one of {EXPORT_FORMATS})")
+        if batch_size is None:
+            raise ValueError("batch_size must be a positive int, got None")
+        check_batch_size(batch_size)
+        if self.capture is not None:
+            self.capture.record(json_input)
+        compiled = self.sql_compile(json_input)
+        if not compiled[0]:
+            raise ValueError(compiled[1])
+        select = compiled[1]
+        planned = self._plan(select)
+        if not planned[0]:
+            raise ValueError(planned[1])
+
+        names = column_names(select.items)
+        columns = [] if names is None else list(names)
+
+        def describe(description):
+            if not columns:
+                columns.extend(column[0] for column in description)
+
+        rows = self._run(select, planned[1], pool, batch_size, describe)
+        encode = ndjson_chunks if format == "ndjson" else csv_chunks
+        chunks = encode(rows, columns, batch_size)
+        return gzip_chunks(chunks) if compress else chunks
+
+    def _sql_parse(
+        self, json_input: dict, span: Optional[Span] = None, with_stats: bool = False
+    ) -> tuple[Literal[False], str, tuple] | tuple[Literal[True], str, tuple, Any]:
+        """Validate and render a request with positional params, uncached.
+
+        Returns:
+            (True, sql, params, stats) or (False, error_message, ()), where
+            ``stats`` is the ``metrics.bucket_stats`` of the request with
+            ``with_stats``, else None.
+        """
+        tracker = self._budget_tracker("items", True) if with_stats else None
+        compiled = self._sql_compile(json_input, span, tracker)
+        if not compiled[0]:
+            return compiled + ((),)
+        select = compiled[1]
+        try:
+            sql, params = self.renderer.render_positional(select)
+        except Exception as e:
+            return False, f"Error parsing SQL: {str(e)}", ()
+        finally:
+            if span is not None:
+                span.phase("render")
+        stats = None
+        if with_stats:
+            stats = bucket_stats(tracker.deepest, tracker.sizes)
+        return True, sql, params, stats
+
+    def _compile_condition(
+        self, logic: Dict, tracker: Optional[BudgetTracker] = None,
+        scope: Optional[ColumnScope] = None
+    ) -> tuple[Literal[False], str] | tuple[Literal[True], Optional[Node]]:
+        """Compile WHERE/HAVING logic conditions.
+
+        Uses the same predicate engine as ``logic_compile``, except that values
+        are always bound as parameters. An empty condition compiles to None.
+        """
         if not logic:
-            return "", []
-
-        # For now, handle simple conditions
-        # In full implementation, integrate the original logic_parse method
-        conditions = []
-        params = []
-
-        for column, condition in logic.items():
-            if isinstance(condition, dict):
-                for operator, value in condition.items():
-                    if operator in self.COMPARISON:
-                        conditions.append(f"{column} {operator} ?")
-                        params.append(value)
-                    elif operator in self.SPECIAL_COMPARISON:
-                        if operator == "IN" and isinstance(value, list):
-                            placeholders = ",".join(["?" for _ in value])
-                            conditions.append(f"{column} IN ({placeholders})")
-                            params.extend(value)
-                        elif operator == "BETWEEN" and isinstance(value, list) and len(value) == 2:
-                            conditions.append(f"{column} BETWEEN ? AND ?")
-                            params.extend(value)
-                        else:
-                            conditions.append(f"{column} {operator} ?")
-                            params.append(value)
-
-        return " AND ".join(conditions), params
+            return True, None
+        return self._compile_logic(logic, column_refs=False, tracker=tracker, scope=scope)
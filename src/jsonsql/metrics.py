@@ -0,0 +1,304 @@
+"""In-process request metrics with Prometheus text exposition.
+
+``JsonSQL(metrics=Metrics())`` counts every ``sql_parse`` (also inside
+``sql_parse_many``) and ``logic_parse`` call:
+
+- ``jsonsql_requests_total{method, query}``: requests, by query type
+- ``jsonsql_rejections_total{method, reason}``: rejected requests, by
+  ``rejection_reason``
+- ``jsonsql_compile_seconds{method}``: call latency histogram
+- ``jsonsql_logic_depth{method}``: nesting depth of the WHERE/HAVING/logic
+  trees (one for a single comparison, plus one per AND/OR group)
+- ``jsonsql_in_list_size{method}``: length of every IN list
+
+Each thread records into its own shard of plain dicts, so recording takes
+no lock; ``render`` and ``snapshot`` sum the shards. Depth and IN-list sizes
+are gathered while a request is validated, and kept with its cached
+template, so recording is a shard lookup and a few counter increments.
+"""
+
+import re
+import threading
+import weakref
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Known query types; anything else is counted as "other" so that labels stay
+# bounded whatever the requests contain
+QUERY_TYPES = frozenset({"SELECT", "INSERT", "UPDATE", "DELETE"})
+_QUERY_LABELS = {spelling: query for query in QUERY_TYPES
+                 for spelling in (query, query.lower(), query.title())}
+
+# Message prefix -> reason code, first match wins
+_REASONS = (
+    ("Query not allowed", "query"),
+    ("Item not allowed", "item"),
+    ("Items must be a list", "item"),
+    ("Table not allowed", "table"),
+    ("Missing FROM clause", "table"),
+    ("JOIN type not allowed", "join"),
+    ("Invalid JOIN condition", "join"),
+    ("Invalid table format", "join"),
+    ("Connection not allowed", "connection"),
+    ("Invalid Input", "column"),
+    ("Column not allowed", "column"),
+    ("Non Valid comparitor", "comparator"),
+    ("Invalid boolean length", "logic"),
+    ("Nothing To Compute", "logic"),
+    ("Bad ", "value"),
+    ("Missing required field", "missing_field"),
+    ("'after'", "after"),
+    ("Invalid continuation token", "after"),
+    ("Budget exceeded", "budget"),
+    ("Invalid JSON", "json"),
+    # SQLite errors, when a request is executed (see replay)
+    ("no such table", "table"),
+    ("no such column", "column"),
+)
+
+REASONS = tuple(dict.fromkeys(code for _, code in _REASONS)) + ("other",)
+
+# All the prefixes in one pattern; group n matches the nth prefix
+_REASON_PREFIX = re.compile("(?:Error parsing SQL: )?(?:" + "|".join(
+    f"({re.escape(prefix)})" for prefix, _ in _REASONS) + ")")
+
+SECONDS_BUCKETS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4,
+                   1e-3, 2.5e-3, 5e-3, 1e-2, 0.1, 1.0)
+DEPTH_BUCKETS = (1, 2, 3, 4, 6, 8, 16, 32, 64, 128, 256, 1024)
+IN_LIST_BUCKETS = (1, 2, 5, 10, 50, 100, 500, 1000, 5000, 10000, 100000)
+
+_HISTOGRAMS = {
+    "jsonsql_compile_seconds": ("Latency of sql_parse/logic_parse calls.", SECONDS_BUCKETS),
+    "jsonsql_logic_depth": ("Nesting depth of validated logic trees.", DEPTH_BUCKETS),
+    "jsonsql_in_list_size": ("Length of validated IN lists.", IN_LIST_BUCKETS),
+}
+_COUNTERS = {
+    "jsonsql_requests_total": "Requests received, by method and query type.",
+    "jsonsql_rejections_total": "Requests rejected, by method and reason.",
+}
+
+# (depth, depth bucket, ((IN-list size, size bucket), ...)), see bucket_stats
+LogicStats = Tuple[int, int, Tuple[Tuple[int, int], ...]]
+
+
+def rejection_reason(message: str) -> str:
+    """Map a rejection message to one of ``REASONS``."""
+    match = _REASON_PREFIX.match(message)
+    if match is None:
+        return "other"
+    code = _REASONS[match.lastindex - 1][1]
+    if code == "value" and message.endswith(", non list"):
+        return "logic"
+    return code
+
+
+def bucket_stats(depth: int, sizes: Iterable[int]) -> LogicStats:
+    """The logic stats of a request, with their histogram buckets looked up.
+
+    Args:
+        depth (int): Depth of the deepest logic tree, 0 if there is none.
+        sizes (Iterable[int]): Lengths of the IN lists.
+    """
+    return (depth, bisect_left(DEPTH_BUCKETS, depth),
+            tuple([(size, bisect_left(IN_LIST_BUCKETS, size)) for size in sizes])
+            if sizes else ())
+
+
+class _Counts:
+    """One thread's counts for one method."""
+
+    __slots__ = ("requests", "rejections", "latency", "depth", "in_list")
+
+    def __init__(self):
+        self.requests: Dict[Optional[str], int] = {}
+        self.rejections: Dict[str, int] = {}
+        # Histograms: [count per bucket..., count above the last bound, sum]
+        self.latency = [0] * (len(SECONDS_BUCKETS) + 2)
+        self.depth = [0] * (len(DEPTH_BUCKETS) + 2)
+        self.in_list = [0] * (len(IN_LIST_BUCKETS) + 2)
+
+    def add(self, other: "_Counts") -> None:
+        """Add the counts of ``other`` to these."""
+        for mine, theirs in ((self.requests, other.requests),
+                             (self.rejections, other.rejections)):
+            for label, count in list(theirs.items()):
+                mine[label] = mine.get(label, 0) + count
+        for mine, theirs in ((self.latency, other.latency), (self.depth, other.depth),
+                             (self.in_list, other.in_list)):
+            for index, count in enumerate(theirs):
+                mine[index] += count
+
+
+def _labels(names: Tuple[str, ...], values: tuple) -> str:
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() \
+        else str(int(value))
+
+
+class Metrics:
+    """Registry of the request counters and histograms of ``JsonSQL``.
+
+    Thread-safe: every thread writes to its own shard, which is created on
+    the thread's first request. Once the thread has ended, its shard is
+    added to the counts of ended threads and dropped, so short-lived threads
+    do not pile up shards.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        # (thread, shard) of the threads that have recorded
+        self._shards: List[Tuple[weakref.ref, Dict[str, _Counts]]] = []
+        # Counts of the threads that have ended, by method
+        self._retired: Dict[str, _Counts] = {}
+        self._lock = threading.Lock()
+
+    def _counts(self, method: str) -> _Counts:
+        """This thread's counts for ``method``, created on first use."""
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._retire()
+                self._shards.append((weakref.ref(threading.current_thread()), shard))
+        counts = shard.get(method)
+        if counts is None:
+            counts = shard[method] = _Counts()
+        return counts
+
+    def _retire(self) -> None:
+        """Fold the shards of ended threads into ``_retired``; call with the lock held."""
+        live = []
+        for entry in self._shards:
+            thread, shard = entry[0](), entry[1]
+            if thread is not None and thread.is_alive():
+                live.append(entry)
+                continue
+            for method, counts in shard.items():
+                retired = self._retired.get(method)
+                if retired is None:
+                    retired = self._retired[method] = _Counts()
+                retired.add(counts)
+        self._shards = live
+
+    def observe(self, method: str, json_input: Any, result: tuple, seconds: float,
+                stats: Optional[LogicStats] = None) -> None:
+        """Record one call: query type, latency, rejection reason and ``stats``."""
+        try:
+            counts = self._local.shard[method]
+        except (AttributeError, KeyError):
+            counts = self._counts(method)
+
+        query = None
+        if method == "sql_parse":
+            try:
+                query = _QUERY_LABELS.get(json_input.get("query"), "other")
+            except (AttributeError, TypeError):
+                query = "other"
+        requests = counts.requests
+        requests[query] = requests.get(query, 0) + 1
+        if not result[0]:
+            reason = rejection_reason(result[1])
+            counts.rejections[reason] = counts.rejections.get(reason, 0) + 1
+
+        latency = counts.latency
+        latency[bisect_left(SECONDS_BUCKETS, seconds)] += 1
+        latency[-1] += seconds
+        if stats is not None:
+            depth, index, sizes = stats
+            if depth:
+                histogram = counts.depth
+                histogram[index] += 1
+                histogram[-1] += depth
+            if sizes:
+                histogram = counts.in_list
+                for size, index in sizes:
+                    histogram[index] += 1
+                    histogram[-1] += size
+
+    def _merged(self) -> Tuple[Dict[tuple, int], Dict[tuple, list]]:
+        """Sum the shards into ``(metric, method, label)`` counters and ``(metric, method)`` histograms."""
+        counters: Dict[tuple, int] = {}
+        histograms: Dict[tuple, list] = {}
+        with self._lock:
+            self._retire()
+            # Retired counts only change under the lock, so copy them
+            retired = {}
+            for method, counts in self._retired.items():
+                retired[method] = _Counts()
+                retired[method].add(counts)
+            shards = [list(shard.items()) for _, shard in self._shards]
+        shards.append(list(retired.items()))
+        for shard in shards:
+            for method, counts in shard:
+                for name, values in (("jsonsql_requests_total", counts.requests),
+                                     ("jsonsql_rejections_total", counts.rejections)):
+                    for label, count in list(values.items()):
+                        key = (name, method, label)
+                        counters[key] = counters.get(key, 0) + count
+                for name, buckets in (("jsonsql_compile_seconds", counts.latency),
+                                      ("jsonsql_logic_depth", counts.depth),
+                                      ("jsonsql_in_list_size", counts.in_list)):
+                    if not any(buckets[:-1]):
+                        continue
+                    merged = histograms.get((name, method))
+                    histograms[(name, method)] = list(buckets) if merged is None \
+                        else [a + b for a, b in zip(merged, buckets)]
+        return counters, histograms
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current values: counters by label tuple, histograms as count/sum/buckets."""
+        counters, histograms = self._merged()
+        snapshot: Dict[str, Any] = {name: {} for name in (*_COUNTERS, *_HISTOGRAMS)}
+        for (name, *labels), count in counters.items():
+            snapshot[name][tuple(labels)] = count
+        for (name, *labels), buckets in histograms.items():
+            bounds = _HISTOGRAMS[name][1]
+            snapshot[name][tuple(labels)] = {
+                "count": sum(buckets[:-1]),
+                "sum": buckets[-1],
+                "buckets": dict(zip(bounds + (float("inf"),), buckets[:-1])),
+            }
+        return snapshot
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        counters, histograms = self._merged()
+        lines = []
+        label_names = {"jsonsql_requests_total": ("method", "query"),
+                       "jsonsql_rejections_total": ("method", "reason")}
+        for name, help_text in _COUNTERS.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for key in sorted((key for key in counters if key[0] == name), key=str):
+                values = tuple("" if value is None else value for value in key[1:])
+                lines.append(f"{name}{{{_labels(label_names[name], values)}}} {counters[key]}")
+        for name, (help_text, bounds) in _HISTOGRAMS.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for key in sorted(key for key in histograms if key[0] == name):
+                buckets = histograms[key]
+                labels = _labels(("method",), key[1:])
+                cumulative = 0
+                for bound, count in zip(bounds + ("+Inf",), buckets[:-1]):
+                    cumulative += count
+                    le = bound if bound == "+Inf" else _number(bound)
+                    lines.append(f'{name}_bucket{{{labels},le="{le}"}} {cumulative}')
+                lines.append(f"{name}_sum{{{labels}}} {_number(buckets[-1])}")
+                lines.append(f"{name}_count{{{labels}}} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        """Zero every metric."""
+        with self._lock:
+            self._retired.clear()
+            for _, shard in self._shards:
+                for counts in shard.values():
+                    counts.__init__()
+
@@ -0,0 +1,58 @@
+"""Continuation tokens for keyset pagination (see ``JsonSQL.page``).
+
+A token carries the sort key values of the last row of a page, plus a
+fingerprint of the ORDER BY they belong to so that a token cannot be replayed
+against a different ordering. It is opaque to clients: they hand it back as
+``"after"`` to get the next page. The values it decodes to are validated like
+any other ``"after"`` values, so a forged token can only select rows the
+request could select anyway.
+"""
+
+import base64
+import binascii
+import hashlib
+import json
+from typing import Any, List, Optional, Sequence, Tuple
+
+Order = Sequence[Tuple[str, str]]
+
+
+def _fingerprint(order: Order) -> str:
+    text = "\x00".join(f"{column} {direction}" for column, direction in order)
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=6).hexdigest()
+
+
+def encode_token(order: Order, values: Sequence[Any]) -> str:
+    """Return the continuation token for the rows after ``values``.
+
+    Args:
+        order: ``(column, direction)`` pairs of the ORDER BY.
+        values: The last row's value for each ORDER BY column.
+
+    Raises:
+        ValueError: If a value cannot be represented in JSON.
+    """
+    try:
+        payload = json.dumps([_fingerprint(order), list(values)],
+                             separators=(",", ":"), allow_nan=False)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Cannot encode continuation token: {e}") from None
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).rstrip(b"=").decode("ascii")
+
+
+def decode_token(token: str, order: Order) -> Optional[List[Any]]:
+    """Return the values of a token from ``encode_token``.
+
+    Returns:
+        The values, or None if the token is malformed or was issued for a
+        different ORDER BY.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        fingerprint, values = json.loads(raw.decode("utf-8"))
+    except (binascii.Error, UnicodeError, ValueError, TypeError):
+        return None
+    if fingerprint != _fingerprint(order) or not isinstance(values, list) \
+            or len(values) != len(order):
+        return None
+    return values
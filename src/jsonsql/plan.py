@@ -0,0 +1,123 @@
+"""Multi-statement execution plans (see ``JsonSQL.sql_plan``).
+
+A plan is what a single request turns into when one statement is not enough,
+e.g. when a very large IN list is loaded into a temporary table first, or
+split over several statements whose results are concatenated.
+"""
+
+from typing import Any, Callable, Iterator, Optional, Tuple
+
+
+class Statement:
+    """One SQL statement with its parameters.
+
+    ``many`` marks a statement to run with ``executemany``; ``params`` is then
+    a sequence of parameter rows.
+    """
+
+    __slots__ = ("sql", "params", "many")
+
+    def __init__(self, sql: str, params: Any = (), many: bool = False):
+        object.__setattr__(self, "sql", sql)
+        object.__setattr__(self, "params", params)
+        object.__setattr__(self, "many", many)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.sql!r}, many={self.many})"
+
+    def __eq__(self, other: Any) -> bool:
+        return (type(other) is Statement and self.sql == other.sql
+                and self.params == other.params and self.many == other.many)
+
+    __hash__ = None
+
+
+class Plan:
+    """Statements that together answer one request.
+
+    Attributes:
+        setup (Tuple[Statement, ...]): Run first, e.g. to create and fill
+            temporary tables.
+        statements (Tuple[Statement, ...]): Queries whose result rows are
+            concatenated, in order.
+        teardown (Tuple[Statement, ...]): Run last, even if a query fails.
+    """
+
+    __slots__ = ("setup", "statements", "teardown")
+
+    def __init__(self, statements: Tuple[Statement, ...], setup: Tuple[Statement, ...] = (),
+                 teardown: Tuple[Statement, ...] = ()):
+        object.__setattr__(self, "setup", tuple(setup))
+        object.__setattr__(self, "statements", tuple(statements))
+        object.__setattr__(self, "teardown", tuple(teardown))
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __repr__(self) -> str:
+        return (f"{type(self).__name__}(setup={len(self.setup)}, "
+                f"statements={len(self.statements)}, teardown={len(self.teardown)})")
+
+    @property
+    def single(self) -> bool:
+        """True if the plan is just one query, as ``sql_parse`` would return it."""
+        return not self.setup and len(self.statements) == 1
+
+    def execute(self, connection: Any, batch_size: Optional[int] = None,
+                describe: Optional[Callable[[Any], None]] = None) -> Iterator[tuple]:
+        """Run the plan on a DB-API connection and yield the result rows.
+
+        Rows are fetched lazily, one statement after the other. The teardown
+        runs when the iterator is exhausted, closed or garbage collected.
+
+        Args:
+            connection: A DB-API connection.
+            batch_size (Optional[int]): Fetch rows with ``fetchmany`` in
+                batches of this size, so at most one batch is held in memory
+                whatever the driver does; None iterates the cursor instead.
+            describe (Optional[Callable]): Called with ``cursor.description``
+                after each query runs, before its first row is yielded.
+        """
+        check_batch_size(batch_size)
+        return self._execute(connection, batch_size, describe)
+
+    def _execute(self, connection: Any, batch_size: Optional[int],
+                 describe: Optional[Callable[[Any], None]]) -> Iterator[tuple]:
+        cursor = connection.cursor()
+        try:
+            for statement in self.setup:
+                _run(cursor, statement)
+            for statement in self.statements:
+                _run(cursor, statement)
+                if describe is not None:
+                    describe(cursor.description)
+                if batch_size is None:
+                    yield from cursor
+                    continue
+                rows = cursor.fetchmany(batch_size)
+                while rows:
+                    yield from rows
+                    rows = cursor.fetchmany(batch_size)
+        finally:
+            try:
+                for statement in self.teardown:
+                    _run(cursor, statement)
+            finally:
+                cursor.close()
+
+
+def check_batch_size(batch_size: Optional[int]) -> None:
+    """Raise ValueError unless ``batch_size`` is None or a positive int."""
+    if batch_size is not None and (
+            not isinstance(batch_size, int) or isinstance(batch_size, bool) or batch_size < 1):
+        raise ValueError(f"batch_size must be a positive int, got {batch_size!r}")
+
+
+def _run(cursor: Any, statement: Statement) -> None:
+    if statement.many:
+        cursor.executemany(statement.sql, statement.params)
+    else:
+        cursor.execute(statement.sql, statement.params)
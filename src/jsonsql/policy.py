@@ -0,0 +1,271 @@
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, Iterable, Mapping, Optional, Tuple
+
+
+_SCOPE_CACHE_SIZE = 4096
+
+
+class EntityRule:
+    """Immutable allow/deny verdict table for one kind of entity.
+
+    Answers the allow/deny rules with set lookups instead of list scans:
+
+    1. Entity in ``denied`` → DENY
+    2. ``allowed`` empty → DENY (strict mode)
+    3. ``"*"`` in ``allowed`` → ALLOW (wildcard mode)
+    4. Entity in ``allowed`` → ALLOW
+    """
+
+    __slots__ = ("allowed", "denied", "wildcard")
+
+    def __init__(self, allowed: Iterable[Any], denied: Iterable[Any]):
+        allowed = frozenset(allowed)
+        object.__setattr__(self, "allowed", allowed)
+        object.__setattr__(self, "denied", frozenset(denied))
+        object.__setattr__(self, "wildcard", "*" in allowed)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __repr__(self) -> str:
+        return (f"{type(self).__name__}(allowed={len(self.allowed)}, "
+                f"denied={len(self.denied)}, wildcard={self.wildcard})")
+
+    def allows(self, entity: Any) -> bool:
+        """Return the verdict for ``entity``; unhashable entities are denied."""
+        try:
+            if entity in self.denied:
+                return False
+            return self.wildcard or entity in self.allowed
+        except TypeError:
+            return False
+
+
+class ColumnScope:
+    """The tables of one request, for checking columns against per-table lists.
+
+    Maps every name a column may be qualified with (the alias, or the table
+    name and its last dotted part) to the table and its allowed columns, so
+    each column resolves with one dict probe. A bare column may come from any
+    of the tables, so it must be allowed by all of them. Scopes are cached and
+    shared between requests (see ``PolicyIndex.scope``), so they are never
+    modified after construction.
+
+    Attributes:
+        qualifiers (dict): Qualifier → ``(table, allowed columns)``; None
+            instead of the columns when the table is unrestricted.
+        bare (frozenset): Columns every restricted table allows.
+        table (Optional[str]): The table of bare columns, if there is only one.
+    """
+
+    __slots__ = ("qualifiers", "bare", "table")
+
+    def __init__(self, tables: Iterable[Tuple[str, Optional[str], Optional[FrozenSet[str]]]]):
+        """
+        Args:
+            tables: ``(name, alias, allowed columns or None)`` per table.
+        """
+        self.qualifiers: Dict[str, Tuple[str, Optional[FrozenSet[str]]]] = {}
+        bare = None
+        names = set()
+        for name, alias, allowed in tables:
+            names.add(name)
+            if allowed is not None:
+                bare = allowed if bare is None else bare & allowed
+            for qualifier in (alias,) if alias else {name, name.rpartition(".")[2]}:
+                known = self.qualifiers.get(qualifier)
+                if known is not None and known[1] is not None:
+                    # The same qualifier for two tables: both lists apply
+                    allowed = known[1] if allowed is None else known[1] & allowed
+                self.qualifiers[qualifier] = (name, allowed)
+        self.bare: FrozenSet[str] = bare if bare is not None else frozenset()
+        self.table = names.pop() if len(names) == 1 else None
+
+    def resolve(self, column: str) -> Optional[Tuple[Optional[str], str]]:
+        """Return ``(table, column)`` for an allowed column, else None.
+
+        The table of a bare column is None when there are several tables.
+        ``alias.*`` is allowed for unrestricted tables only.
+        """
+        try:
+            qualifier, _, name = column.rpartition(".")
+        except AttributeError:
+            return None
+        if not qualifier:
+            return (self.table, name) if name in self.bare else None
+        entry = self.qualifiers.get(qualifier)
+        if entry is None:
+            return None
+        table, allowed = entry
+        if allowed is None:
+            return (table, name) if name else None
+        return (table, name) if name in allowed else None
+
+    def allows(self, column: str) -> bool:
+        return self.resolve(column) is not None
+
+
+class PolicyIndex:
+    """Frozen, precomputed view of a JsonSQL policy.
+
+    Built once from the ``ALLOWED_*``/``NOT_ALLOWED_*`` attributes so that every
+    validator answers in O(1) regardless of how many tables, items or columns
+    the policy holds.
+
+    Attributes:
+        queries, items, tables, connections, joins, columns (EntityRule):
+            Verdict tables per entity kind.
+        column_types (Mapping[str, type]): Column name → expected value type,
+            including the ``"*"`` entry when present.
+        table_columns (Mapping[str, frozenset]): Table → the only columns
+            requests may use from it, for tables of ``allowed_tables`` given
+            with a non-empty column list (without ``"*"``).
+        table_column_types (Mapping[str, Mapping[str, type]]): Table →
+            column → expected value type, for tables of ``allowed_tables``
+            given with a ``{column: type}`` map rather than a list.
+        explicit_columns (frozenset): Column names listed explicitly, i.e.
+            without the ``"*"`` wildcard key.
+        default_column_type (type): Type used for columns not listed
+            explicitly (the ``"*"`` entry, or ``object``).
+        operators (frozenset): Comparison and special comparison operators.
+        logical (frozenset): Logical operators.
+        aggregates (frozenset): Aggregate function names.
+    """
+
+    __slots__ = (
+        "queries", "items", "tables", "connections", "joins", "columns",
+        "column_types", "explicit_columns", "default_column_type", "table_columns",
+        "table_column_types", "comparison", "special_comparison", "operators", "logical",
+        "aggregates", "_scopes",
+    )
+
+    def __init__(
+        self,
+        allowed_queries: Iterable[str],
+        allowed_items: Iterable[str],
+        allowed_tables: Iterable[str],
+        allowed_connections: Iterable[str],
+        allowed_columns: Mapping[str, type],
+        allowed_joins: Iterable[str],
+        not_allowed_queries: Iterable[str],
+        not_allowed_items: Iterable[str],
+        not_allowed_tables: Iterable[str],
+        not_allowed_connections: Iterable[str],
+        not_allowed_columns: Iterable[str],
+        not_allowed_joins: Iterable[str],
+        comparison: Iterable[str] = ("=", ">", "<", ">=", "<=", "<>", "!="),
+        special_comparison: Iterable[str] = ("BETWEEN", "IN"),
+        logical: Iterable[str] = ("AND", "OR"),
+        aggregates: Iterable[str] = ("MIN", "MAX", "SUM", "AVG", "COUNT"),
+    ):
+        column_types: Dict[str, type] = dict(allowed_columns)
+        table_columns = {}
+        table_column_types = {}
+        if isinstance(allowed_tables, Mapping):
+            for table, columns in allowed_tables.items():
+                if isinstance(columns, Mapping) and columns:
+                    table_column_types[table] = MappingProxyType(dict(columns))
+                columns = frozenset(column for column in columns or ()
+                                    if isinstance(column, str))
+                if columns and "*" not in columns:
+                    table_columns[table] = columns
+        fields = {
+            "queries": EntityRule(allowed_queries, not_allowed_queries),
+            "items": EntityRule(allowed_items, not_allowed_items),
+            "tables": EntityRule(allowed_tables, not_allowed_tables),
+            "connections": EntityRule(allowed_connections, not_allowed_connections),
+            "joins": EntityRule(allowed_joins, not_allowed_joins),
+            "columns": EntityRule(column_types, not_allowed_columns),
+            "column_types": MappingProxyType(column_types),
+            "explicit_columns": frozenset(k for k in column_types if k != "*"),
+            "default_column_type": column_types.get("*", object),
+            "table_columns": MappingProxyType(table_columns),
+            "table_column_types": MappingProxyType(table_column_types),
+            "comparison": frozenset(comparison),
+            "special_comparison": frozenset(special_comparison),
+            "logical": frozenset(logical),
+            "aggregates": frozenset(aggregates),
+        }
+        fields["operators"] = fields["comparison"] | fields["special_comparison"]
+        # Scopes by the tables of a request; the only mutable state, and
+        # only ever filled with values derived from the frozen fields
+        fields["_scopes"] = {}
+        for name, value in fields.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    @classmethod
+    def from_jsonsql(cls, jsonsql: Any) -> "PolicyIndex":
+        """Build an index from the policy attributes of a JsonSQL instance."""
+        return cls(
+            allowed_queries=jsonsql.ALLOWED_QUERIES,
+            allowed_items=jsonsql.ALLOWED_ITEMS,
+            allowed_tables=jsonsql.ALLOWED_TABLES,
+            allowed_connections=jsonsql.ALLOWED_CONNECTIONS,
+            allowed_columns=jsonsql.ALLOWED_COLUMNS,
+            allowed_joins=jsonsql.ALLOWED_JOINS,
+            not_allowed_queries=jsonsql.NOT_ALLOWED_QUERIES,
+            not_allowed_items=jsonsql.NOT_ALLOWED_ITEMS,
+            not_allowed_tables=jsonsql.NOT_ALLOWED_TABLES,
+            not_allowed_connections=jsonsql.NOT_ALLOWED_CONNECTIONS,
+            not_allowed_columns=jsonsql.NOT_ALLOWED_COLUMNS,
+            not_allowed_joins=jsonsql.NOT_ALLOWED_JOINS,
+            comparison=jsonsql.COMPARISON,
+            special_comparison=jsonsql.SPECIAL_COMPARISON,
+            logical=jsonsql.LOGICAL,
+            aggregates=jsonsql.AGGREGATES,
+        )
+
+    def scope(
+        self, tables: Iterable[Tuple[str, Optional[str]]]
+    ) -> Optional[ColumnScope]:
+        """The ``ColumnScope`` of a request's ``(table, alias)`` pairs.
+
+        Scopes are cached by their tables, as requests mostly read the same
+        few combinations.
+
+        Returns:
+            None if none of the tables has a column list, so that there is
+            nothing to check.
+        """
+        table_columns = self.table_columns
+        if not table_columns:
+            return None
+        key = tables = tuple(tables)
+        try:
+            return self._scopes[key]
+        except KeyError:
+            pass
+        except TypeError:
+            key = None
+
+        entries = [(name, alias, table_columns.get(name)) for name, alias in tables]
+        scope = None
+        if any(allowed is not None for _, _, allowed in entries):
+            scope = ColumnScope(entries)
+        if key is not None:
+            if len(self._scopes) >= _SCOPE_CACHE_SIZE:
+                self._scopes.clear()
+            self._scopes[key] = scope
+        return scope
+
+    def table_column_type(self, resolved: Optional[Tuple[Optional[str], str]]) -> Any:
+        """The type of a column resolved by a ``ColumnScope``, from its table.
+
+        Returns:
+            None unless the column resolved to one table that was given
+            with column types.
+        """
+        if resolved is None or resolved[0] is None:
+            return None
+        types = self.table_column_types.get(resolved[0])
+        return None if types is None else types.get(resolved[1])
+
+    def column_type(self, column: str) -> type:
+        """Return the expected value type for ``column``."""
+        try:
+            return self.column_types.get(column, self.default_column_type)
+        except TypeError:
+            return self.default_column_type
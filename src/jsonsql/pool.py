@@ -0,0 +1,235 @@
+"""Thread-safe pool of sqlite3 connections (see ``JsonSQL.execute``).
+
+Connections are opened lazily, up to ``size``, configured once when they are
+opened (read-only URI, WAL, ``mmap_size``/``cache_size`` from a profile,
+``cached_statements``) and handed out to one thread at a time.
+"""
+
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Union
+from urllib.parse import quote
+
+from .plan import Plan, check_batch_size
+
+
+class PoolProfile:
+    """Per-connection sqlite3 tuning.
+
+    Attributes:
+        mmap_size (int): ``PRAGMA mmap_size`` in bytes; 0 disables
+            memory-mapped I/O.
+        cache_size (int): ``PRAGMA cache_size``; negative values are KiB,
+            positive values pages.
+        cached_statements (int): Size of the per-connection prepared-statement
+            cache of the sqlite3 module.
+    """
+
+    __slots__ = ("mmap_size", "cache_size", "cached_statements")
+
+    def __init__(self, mmap_size: int = 0, cache_size: int = -2000, cached_statements: int = 128):
+        for name, value in (("mmap_size", mmap_size), ("cache_size", cache_size),
+                            ("cached_statements", cached_statements)):
+            if not isinstance(value, int) or isinstance(value, bool):
+                raise ValueError(f"{name} must be an int, got {value!r}")
+        if mmap_size < 0 or cached_statements < 0:
+            raise ValueError("mmap_size and cached_statements must not be negative")
+        object.__setattr__(self, "mmap_size", mmap_size)
+        object.__setattr__(self, "cache_size", cache_size)
+        object.__setattr__(self, "cached_statements", cached_statements)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __repr__(self) -> str:
+        return (f"{type(self).__name__}(mmap_size={self.mmap_size}, "
+                f"cache_size={self.cache_size}, cached_statements={self.cached_statements})")
+
+
+PROFILES: Dict[str, PoolProfile] = {
+    # sqlite3's own defaults
+    "default": PoolProfile(),
+    # Large scans of a database that fits in memory
+    "read_heavy": PoolProfile(mmap_size=256 * 1024 * 1024, cache_size=-64 * 1024,
+                              cached_statements=512),
+    # Many connections, small working set
+    "low_memory": PoolProfile(mmap_size=0, cache_size=-512, cached_statements=32),
+}
+
+
+class ConnectionPool:
+    """A bounded pool of sqlite3 connections to one database.
+
+    Args:
+        database (str): Path of the database file, or a ``file:`` URI.
+        size (int): Maximum number of open connections.
+        read_only (bool): Open connections with ``mode=ro``, so that nothing
+            can write to the database (temporary tables still work).
+        wal (bool): Switch the database to write-ahead logging, which lets
+            readers run alongside a writer. Ignored for read-only pools,
+            which cannot change the journal mode.
+        profile (Union[str, PoolProfile]): A name from ``PROFILES`` or a
+            ``PoolProfile``.
+        timeout (Optional[float]): Seconds to wait for a free connection
+            before raising TimeoutError; None waits forever.
+
+    Raises:
+        ValueError: If an option is invalid.
+    """
+
+    def __init__(
+        self,
+        database: str,
+        size: int = 4,
+        read_only: bool = False,
+        wal: bool = False,
+        profile: Union[str, PoolProfile] = "default",
+        timeout: Optional[float] = None
+    ):
+        if not isinstance(size, int) or isinstance(size, bool) or size < 1:
+            raise ValueError(f"size must be a positive int, got {size!r}")
+        if isinstance(profile, str):
+            if profile not in PROFILES:
+                raise ValueError(f"Unknown pool profile: {profile!r}")
+            profile = PROFILES[profile]
+        elif not isinstance(profile, PoolProfile):
+            raise ValueError(f"Invalid pool profile: {profile!r}")
+
+        self.database = database
+        self.size = size
+        self.read_only = read_only
+        self.wal = wal and not read_only
+        self.profile = profile
+        self.timeout = timeout
+        self._uri = _uri(database, read_only)
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._closed = False
+
+    def __repr__(self) -> str:
+        return (f"{type(self).__name__}({self.database!r}, size={self.size}, "
+                f"open={self._opened}, read_only={self.read_only})")
+
+    def __enter__(self) -> "ConnectionPool":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def _open(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(
+            self._uri, uri=True, check_same_thread=False,
+            cached_statements=self.profile.cached_statements)
+        try:
+            if self.wal:
+                connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(f"PRAGMA mmap_size={self.profile.mmap_size}")
+            connection.execute(f"PRAGMA cache_size={self.profile.cache_size}")
+        except Exception:
+            connection.close()
+            raise
+        return connection
+
+    def acquire(self) -> sqlite3.Connection:
+        """Take a connection out of the pool, opening one if there is room.
+
+        Raises:
+            RuntimeError: If the pool is closed.
+            TimeoutError: If no connection became free within ``timeout``.
+        """
+        if self._closed:
+            raise RuntimeError("Connection pool is closed")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            room = self._opened < self.size
+            if room:
+                self._opened += 1
+        if room:
+            try:
+                return self._open()
+            except Exception:
+                with self._lock:
+                    self._opened -= 1
+                raise
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(
+                f"No connection available within {self.timeout} seconds") from None
+
+    def release(self, connection: sqlite3.Connection) -> None:
+        """Return a connection taken with ``acquire``.
+
+        A transaction left open, e.g. by a failed plan, is rolled back first.
+        """
+        try:
+            if connection.in_transaction:
+                connection.rollback()
+        except sqlite3.Error:
+            # Unusable, make room for a new one
+            self._discard(connection)
+            return
+        if self._closed:
+            self._discard(connection)
+        else:
+            self._idle.put(connection)
+
+    def _discard(self, connection: sqlite3.Connection) -> None:
+        with self._lock:
+            self._opened -= 1
+        connection.close()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """``with pool.connection() as connection:`` acquire and release."""
+        connection = self.acquire()
+        try:
+            yield connection
+        finally:
+            self.release(connection)
+
+    def execute(self, plan: Plan, batch_size: Optional[int] = 1000,
+                describe: Optional[Callable[[Any], None]] = None) -> Iterator[tuple]:
+        """Run a plan on a pooled connection and yield the result rows lazily.
+
+        The connection is taken on the first ``next()`` and held until the
+        iterator is exhausted or closed. Changes are committed once the plan
+        has run to completion, and rolled back if it fails or the iterator is
+        closed early. See ``Plan.execute`` for the arguments.
+        """
+        check_batch_size(batch_size)
+        return self._execute(plan, batch_size, describe)
+
+    def _execute(self, plan: Plan, batch_size: Optional[int],
+                 describe: Optional[Callable[[Any], None]]) -> Iterator[tuple]:
+        with self.connection() as connection:
+            yield from plan.execute(connection, batch_size, describe)
+            # Completed: keep what it wrote (release rolls back otherwise)
+            if connection.in_transaction:
+                connection.commit()
+
+    def close(self) -> None:
+        """Close idle connections; connections in use are closed on release."""
+        self._closed = True
+        while True:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(connection)
+
+
+def _uri(database: str, read_only: bool) -> str:
+    if database.startswith("file:"):
+        uri = database
+    else:
+        uri = "file:" + quote(database, safe="/:\\")
+    if read_only:
+        uri += ("&" if "?" in uri else "?") + "mode=ro"
+    return uri
@@ -0,0 +1,643 @@
+"""Rendering of validated IR nodes (see ``ir``) into SQL text and parameters."""
+
+import json
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from .ir import (Aggregate, Between, BoolOp, ColumnRef, Compare, InList, Node,
+                 Seek, Select, TableRef, Value)
+from .plan import Plan, Statement
+
+IN_LIST_PADDING = (None, "repeat", "null")
+
+# How IN lists longer than the threshold are rendered (see Renderer)
+IN_LIST_STRATEGIES = (None, "auto", "json", "temp_table", "chunked")
+
+# Temporary table column types for homogeneous IN lists
+_TEMP_TABLE_TYPES = {int: "BIGINT", float: "DOUBLE PRECISION", str: "TEXT"}
+
+# DB-API 2.0 paramstyles, plus "dollar" ($1, $2, ...) as used by asyncpg
+PARAMSTYLES = ("qmark", "numeric", "named", "format", "pyformat", "dollar")
+
+_PLACEHOLDERS: Dict[str, Callable[[int], str]] = {
+    "qmark": lambda index: "?",
+    "numeric": lambda index: f":{index}",
+    "named": lambda index: f":p{index}",
+    "format": lambda index: "%s",
+    "pyformat": lambda index: f"%(p{index})s",
+    "dollar": lambda index: f"${index}",
+}
+
+# Placeholder tokens as emitted per paramstyle. "%%" is matched too so the
+# format styles' escaped percent signs are not mistaken for a "%s", and so
+# are quoted spans (from raw text such as JOIN conditions), which hold no
+# placeholders.
+_QUOTED = r"'[^']*'|\"[^\"]*\"|"
+_TOKENS = {
+    "qmark": re.compile(_QUOTED + r"\?"),
+    "numeric": re.compile(_QUOTED + r":\d+"),
+    "named": re.compile(_QUOTED + r":p\d+"),
+    "format": re.compile(_QUOTED + r"%%|%s"),
+    "pyformat": re.compile(_QUOTED + r"%%|%\(p\d+\)s"),
+    "dollar": re.compile(_QUOTED + r"\$\d+"),
+}
+
+# Literal renderers for the common exact types; subclasses take the slow path
+_LITERALS: Dict[type, Callable[[Any], str]] = {
+    int: int.__repr__,
+    float: float.__repr__,
+    bool: lambda value: "TRUE" if value else "FALSE",
+    str: lambda value: "'" + value.replace("'", "''") + "'",
+    type(None): lambda value: "NULL",
+}
+
+# Names that are safe to quote: plain identifiers, optionally qualified
+# ("u.name") or ending in a star ("u.*"). Anything else, such as "COUNT(*)",
+# is an expression and is emitted as is.
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_$]*(?:\.(?:[A-Za-z_][A-Za-z0-9_$]*|\*))*")
+
+
+class Dialect:
+    """Rendering rules of one SQL dialect.
+
+    Attributes:
+        name (str): Dialect name, the key in ``DIALECTS``.
+        quote (Tuple[str, str]): Opening and closing identifier quote.
+        paramstyle (str): Placeholder style used unless overridden.
+        limit (str): "limit" for ``LIMIT n OFFSET m``, "fetch" for
+            ``OFFSET m ROWS FETCH NEXT n ROWS ONLY``.
+        fetch_needs_order (bool): FETCH needs an OFFSET and both are only
+            valid after ORDER BY, so ``ORDER BY (SELECT NULL)`` is added when
+            there is none.
+        json_in (str, optional): Template testing ``{column}`` against a
+            whole list bound as one parameter ``{mark}``, or None.
+        array_param (bool): Bind that parameter as a Python list (adapted
+            to an array by the driver) instead of a JSON text.
+        temp_table (str, optional): Template creating the temporary table
+            ``{name}`` with a ``value`` column of type ``{type}``, or None.
+        row_values (bool): Row values can be compared with ``<``/``>``,
+            e.g. ``(a,b) > (?,?)``.
+    """
+
+    __slots__ = ("name", "quote", "paramstyle", "limit", "fetch_needs_order",
+                 "json_in", "array_param", "temp_table", "row_values")
+
+    def __init__(
+        self,
+        name: str,
+        quote: Tuple[str, str],
+        paramstyle: str,
+        limit: str = "limit",
+        fetch_needs_order: bool = False,
+        json_in: Optional[str] = None,
+        array_param: bool = False,
+        temp_table: Optional[str] = None,
+        row_values: bool = True
+    ):
+        object.__setattr__(self, "name", name)
+        object.__setattr__(self, "quote", quote)
+        object.__setattr__(self, "paramstyle", paramstyle)
+        object.__setattr__(self, "limit", limit)
+        object.__setattr__(self, "fetch_needs_order", fetch_needs_order)
+        object.__setattr__(self, "json_in", json_in)
+        object.__setattr__(self, "array_param", array_param)
+        object.__setattr__(self, "temp_table", temp_table)
+        object.__setattr__(self, "row_values", row_values)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.name!r})"
+
+
+_JSON_EACH = "{column} IN (SELECT value FROM json_each({mark}))"
+_CREATE_TEMP = "CREATE TEMP TABLE {name} (value {type})"
+
+DIALECTS: Dict[str, Dialect] = {
+    dialect.name: dialect for dialect in (
+        Dialect("generic", ('"', '"'), "qmark",
+                json_in=_JSON_EACH, temp_table=_CREATE_TEMP),
+        Dialect("sqlite", ('"', '"'), "qmark",
+                json_in=_JSON_EACH, temp_table=_CREATE_TEMP),
+        Dialect("postgresql", ('"', '"'), "format",
+                json_in="{column} = ANY({mark})", array_param=True,
+                temp_table=_CREATE_TEMP),
+        Dialect("mysql", ("`", "`"), "format",
+                temp_table="CREATE TEMPORARY TABLE {name} (value {type})"),
+        Dialect("mssql", ("[", "]"), "qmark", "fetch", fetch_needs_order=True,
+                json_in="{column} IN (SELECT value FROM OPENJSON({mark}))",
+                row_values=False),
+        Dialect("oracle", ('"', '"'), "named", "fetch", row_values=False),
+    )
+}
+
+
+class _PlanContext:
+    """Per-call state of ``Renderer.render_plan``."""
+
+    __slots__ = ("chunk", "values", "tables")
+
+    def __init__(self):
+        # IN list rendered with ``values`` instead of its own (chunked plans)
+        self.chunk: Optional[InList] = None
+        self.values: tuple = ()
+        # (name, column type, values) of the temporary tables to create
+        self.tables: List[Tuple[str, str, tuple]] = []
+
+
+class Renderer:
+    """Turns IR nodes into ``(sql, params)`` for one dialect and paramstyle.
+
+    Rendering never validates; it trusts that nodes came from the compiler.
+
+    Args:
+        in_list_padding (str, optional): Pad IN lists to the next power of
+            two, with the last value ("repeat") or NULL ("null").
+        dialect (str, optional): Key in ``DIALECTS``. Defaults to "generic",
+            which renders ``LIMIT``/``OFFSET`` and ``?`` placeholders.
+        paramstyle (str, optional): One of ``PARAMSTYLES``. Defaults to the
+            dialect's. With "named" and "pyformat" the params are a dict
+            (``{"p1": ..., "p2": ...}``), otherwise a tuple.
+        quote_identifiers (bool, optional): Quote table, column and alias
+            names with the dialect's quote characters. Expressions such as
+            ``COUNT(*)`` and JOIN ON conditions are left untouched.
+        in_list_strategy (str, optional): How IN lists longer than
+            ``in_list_threshold`` are rendered instead of one placeholder
+            per value:
+
+            - "json": bind the list as one parameter, e.g.
+              ``IN (SELECT value FROM json_each(?))`` or ``= ANY(%s)``.
+            - "temp_table": load it into a temporary table and select from
+              it (``render_plan`` only).
+            - "chunked": split the statement into several with at most
+              ``in_list_threshold`` values each and concatenate their rows
+              (``render_plan`` only, and only for a list that is ANDed into
+              the WHERE clause of a plain SELECT without GROUP BY, HAVING,
+              ORDER BY, LIMIT or aggregates).
+            - "auto": "temp_table" for lists over 50 times the threshold,
+              "json" for the others; "chunked" where the dialect has
+              neither.
+
+            Strategies that do not apply fall back to "json", then to
+            placeholders. Defaults to None (always placeholders).
+        in_list_threshold (int, optional): Longest IN list rendered with
+            placeholders when a strategy is set. Defaults to 999, SQLite's
+            historical limit of bound variables.
+
+    Raises:
+        ValueError: If an option is not one of its allowed values.
+    """
+
+    __slots__ = ("in_list_padding", "dialect", "paramstyle", "quote_identifiers",
+                 "in_list_strategy", "in_list_threshold", "_placeholder",
+                 "_named", "_escape_percent", "_identifiers", "_fragments")
+
+    def __init__(
+        self,
+        in_list_padding: str = None,
+        dialect: str = "generic",
+        paramstyle: str = None,
+        quote_identifiers: bool = False,
+        in_list_strategy: str = None,
+        in_list_threshold: int = 999
+    ):
+        if in_list_padding not in IN_LIST_PADDING:
+            raise ValueError(f"Invalid in_list_padding: {in_list_padding}")
+        if dialect not in DIALECTS:
+            raise ValueError(f"Unknown dialect: {dialect}")
+        paramstyle = paramstyle or DIALECTS[dialect].paramstyle
+        if paramstyle not in PARAMSTYLES:
+            raise ValueError(f"Unknown paramstyle: {paramstyle}")
+        if in_list_strategy not in IN_LIST_STRATEGIES:
+            raise ValueError(f"Unknown in_list_strategy: {in_list_strategy}")
+        if not isinstance(in_list_threshold, int) or in_list_threshold < 1:
+            raise ValueError(f"Invalid in_list_threshold: {in_list_threshold}")
+
+        self.in_list_padding = in_list_padding
+        self.dialect = DIALECTS[dialect]
+        self.paramstyle = paramstyle
+        self.quote_identifiers = quote_identifiers
+        self.in_list_strategy = in_list_strategy
+        self.in_list_threshold = in_list_threshold
+        self._placeholder = _PLACEHOLDERS[paramstyle]
+        self._named = paramstyle in ("named", "pyformat")
+        # The driver interpolates "%" in the SQL text for these styles
+        self._escape_percent = paramstyle in ("format", "pyformat")
+        self._identifiers: Dict[Any, str] = {}
+        self._fragments = lru_cache(maxsize=1024)(self._split)
+
+    def render(self, node: Node) -> Tuple[str, Union[tuple, Dict[str, Any]]]:
+        """Render a Select or predicate node into ``(sql, params)``."""
+        sql, params = self.render_positional(node)
+        return sql, self.bind(params)
+
+    def render_positional(
+        self, node: Node, context: _PlanContext = None
+    ) -> Tuple[str, tuple]:
+        """Like ``render``, but always return the params as a tuple in order."""
+        params: List[Any] = []
+        if isinstance(node, Select):
+            sql = self._select(node, params, context)
+        else:
+            output: List[str] = []
+            self._predicate(node, output, params, context)
+            sql = "".join(output)
+        return sql, tuple(params)
+
+    def render_plan(self, select: Select) -> Plan:
+        """Render a Select into a ``Plan``, applying every IN-list strategy.
+
+        Without a list over ``in_list_threshold`` the plan is the single
+        statement ``render`` would produce.
+        """
+        context = _PlanContext()
+        context.chunk = self._chunk_target(select)
+        if context.chunk is None:
+            sql, params = self.render_positional(select, context)
+            statements = [Statement(sql, self.bind(params))]
+        else:
+            values = _unique(context.chunk.values)
+            step = self.in_list_threshold
+            statements = []
+            for start in range(0, len(values), step):
+                context.values = values[start:start + step]
+                sql, params = self.render_positional(select, context)
+                statements.append(Statement(sql, self.bind(params)))
+
+        setup, teardown = [], []
+        for name, column_type, values in context.tables:
+            setup.append(Statement(
+                self.dialect.temp_table.format(name=name, type=column_type), self.bind(())))
+            setup.append(Statement(
+                f"INSERT INTO {name} (value) VALUES ({self._placeholder(1)})",
+                [self.bind((value,)) for value in values], many=True))
+            teardown.append(Statement(f"DROP TABLE {name}", self.bind(())))
+        return Plan(statements, setup, teardown)
+
+    def _chunk_target(self, select: Select) -> Optional[InList]:
+        """The largest IN list to split a chunked plan on, if any."""
+        strategy = self.in_list_strategy
+        if strategy == "auto" and (self.dialect.json_in or self.dialect.temp_table):
+            return None
+        if strategy not in ("auto", "chunked") or select.where is None:
+            return None
+        # Chunks only add up to the whole result for a plain row filter
+        if (select.query != "SELECT" or select.group_by is not None
+                or select.having is not None or select.order_by
+                or select.limit is not None
+                or any("(" in f"{item}" for item in select.items)):
+            return None
+
+        candidates = [node for node in _conjuncts(select.where)
+                      if type(node) is InList and len(node.values) > self.in_list_threshold]
+        return max(candidates, key=lambda node: len(node.values), default=None)
+
+    def bind(self, params: tuple) -> Union[tuple, Dict[str, Any]]:
+        """Shape positional params for the paramstyle (a dict for named styles)."""
+        if self._named:
+            return {f"p{index}": value for index, value in enumerate(params, 1)}
+        return params
+
+    def placeholder(self, index: int) -> str:
+        """Placeholder of the ``index``-th (1-based) parameter."""
+        return self._placeholder(index)
+
+    def inline(self, sql: str, params: tuple) -> str:
+        """Substitute the placeholders of ``sql`` with the literals of ``params``.
+
+        The SQL text is split at its placeholders once (and the split is
+        cached per text), then the pieces and literals are joined in a single
+        pass, so the cost is linear in the SQL length plus the number of
+        params.
+
+        Raises:
+            ValueError: If the number of placeholders and params differ.
+        """
+        fragments = self._fragments(sql)
+        if len(fragments) != len(params) + 1:
+            raise ValueError(f"Expected {len(fragments) - 1} parameters, got {len(params)}")
+
+        output = [""] * (2 * len(params) + 1)
+        output[0::2] = fragments
+        output[1::2] = map(self.literal, params)
+        return "".join(output)
+
+    @staticmethod
+    def literal(value: Any) -> str:
+        """Render a Python value as an SQL literal."""
+        render = _LITERALS.get(type(value))
+        if render is not None:
+            return render(value)
+        if value is None:
+            return "NULL"
+        # bool before int: bool is a subclass of int
+        if isinstance(value, bool):
+            return "TRUE" if value else "FALSE"
+        if isinstance(value, (int, float)):
+            return str(value)
+        # Strings and any other type are quoted, with single quotes doubled
+        return "'" + str(value).replace("'", "''") + "'"
+
+    def _split(self, sql: str) -> Tuple[str, ...]:
+        """Split ``sql`` at its placeholders outside quotes, unescaping "%%"."""
+        fragments = []
+        text = []
+        position = 0
+        for token in _TOKENS[self.paramstyle].finditer(sql):
+            text.append(sql[position:token.start()])
+            position = token.end()
+            if token.group()[0] in "'\"":
+                quoted = token.group()
+                text.append(quoted.replace("%%", "%") if self._escape_percent else quoted)
+            elif token.group() == "%%":
+                # No params are bound, so the driver will not unescape it
+                text.append("%")
+            else:
+                fragments.append("".join(text))
+                text = []
+        text.append(sql[position:])
+        fragments.append("".join(text))
+        return tuple(fragments)
+
+    def pad_in_list(self, values: Any) -> tuple:
+        """Pad IN list values to the next power of two per ``in_list_padding``."""
+        values = tuple(values)
+        if self.in_list_padding is None or not values:
+            return values
+
+        size = 1 << (len(values) - 1).bit_length()
+        filler = values[-1] if self.in_list_padding == "repeat" else None
+        return values + (filler,) * (size - len(values))
+
+    def identifier(self, name: Any) -> str:
+        """Render a table, column or alias name for the dialect."""
+        if not self.quote_identifiers and not self._escape_percent:
+            return f"{name}"
+        try:
+            return self._identifiers[name]
+        except KeyError:
+            pass
+        except TypeError:
+            return self._text(name)
+
+        rendered = f"{name}"
+        if self.quote_identifiers and _IDENTIFIER.fullmatch(rendered):
+            opening, closing = self.dialect.quote
+            rendered = ".".join(
+                part if part == "*" else
+                opening + part.replace(closing, closing * 2) + closing
+                for part in rendered.split("."))
+        rendered = self._text(rendered)
+        if len(self._identifiers) < 4096:
+            self._identifiers[name] = rendered
+        return rendered
+
+    def _text(self, text: Any) -> str:
+        """Render raw SQL text, escaping "%" where the driver interpolates it."""
+        text = f"{text}"
+        if self._escape_percent:
+            return text.replace("%", "%%")
+        return text
+
+    def _table(self, table: TableRef) -> str:
+        if table.alias:
+            return f"{self.identifier(table.name)} AS {self.identifier(table.alias)}"
+        return self.identifier(table.name)
+
+    def _select(self, select: Select, params: List[Any], context: _PlanContext) -> str:
+        identifier = self.identifier
+        parts = [f"{self._text(select.query)} "
+                 f"{','.join(identifier(item) for item in select.items)}",
+                 f"FROM {self._table(select.table)}"]
+
+        for join in select.joins:
+            join_clause = f"{join.join_type} {self._table(join.table)}"
+            if join.on:
+                join_clause += f" ON {self._text(join.on)}"
+            parts.append(join_clause)
+
+        if select.where is not None:
+            output = [f"{self._text(select.connection)} "]
+            self._predicate(select.where, output, params, context)
+            parts.append("".join(output))
+
+        if select.group_by is not None:
+            parts.append(f"GROUP BY {','.join(identifier(column) for column in select.group_by)}")
+
+        if select.having is not None:
+            output = ["HAVING "]
+            self._predicate(select.having, output, params, context)
+            parts.append("".join(output))
+
+        if select.order_by:
+            parts.append("ORDER BY " + ",".join(
+                self._text(item.column) if item.direction is None
+                else f"{identifier(item.column)} {item.direction}"
+                for item in select.order_by))
+
+        if select.limit is not None:
+            parts.append(self._limit(select))
+
+        return " ".join(part for part in parts if part)
+
+    def _limit(self, select: Select) -> str:
+        count, offset = select.limit.count, select.limit.offset
+        if self.dialect.limit == "limit":
+            if offset is None:
+                return f"LIMIT {count}"
+            return f"LIMIT {count} OFFSET {offset}"
+
+        if not self.dialect.fetch_needs_order:
+            if offset is None:
+                return f"FETCH FIRST {count} ROWS ONLY"
+            return f"OFFSET {offset} ROWS FETCH NEXT {count} ROWS ONLY"
+
+        # OFFSET is mandatory here, and only valid after ORDER BY
+        prefix = "" if select.order_by else "ORDER BY (SELECT NULL) "
+        return f"{prefix}OFFSET {offset or 0} ROWS FETCH NEXT {count} ROWS ONLY"
+
+    def _predicate(
+        self, node: Node, output: List[str], params: List[Any], context: _PlanContext = None
+    ) -> None:
+        """Render a predicate tree without recursion.
+
+        Explicit AND/OR groups are always parenthesized; implicit ANDs only
+        when nested in an OR.
+        """
+        # Pending work: literal SQL tokens or (node, bare) pairs
+        stack: List[Any] = [(node, True)]
+        while stack:
+            item = stack.pop()
+            if type(item) is str:
+                output.append(item)
+                continue
+
+            node, bare = item
+            if type(node) is not BoolOp:
+                self._leaf(node, output, params, context)
+                continue
+
+            parens = not node.implicit or not bare
+            child_bare = node.operator == "AND"
+            separator = f" {node.operator} "
+            if parens:
+                stack.append(")")
+            operands = node.operands
+            for index in range(len(operands) - 1, -1, -1):
+                stack.append((operands[index], child_bare))
+                if index:
+                    stack.append(separator)
+            if parens:
+                stack.append("(")
+
+    def _large_in_list(
+        self, column: str, values: tuple, output: List[str], params: List[Any],
+        context: _PlanContext
+    ) -> bool:
+        """Render an IN list over the threshold per ``in_list_strategy``.
+
+        Returns:
+            False if no strategy applies and placeholders must be used.
+        """
+        dialect = self.dialect
+        strategy = self.in_list_strategy
+        # Temporary tables need a plan, and are not repeated per chunk
+        temp_table = (dialect.temp_table is not None and context is not None
+                      and context.chunk is None)
+        if strategy == "auto" and temp_table and (
+                len(values) > 50 * self.in_list_threshold or not dialect.json_in):
+            strategy = "temp_table"
+
+        if strategy == "temp_table" and temp_table:
+            kinds = set(map(type, values))
+            column_type = _TEMP_TABLE_TYPES.get(kinds.pop()) if len(kinds) == 1 else None
+            if column_type is not None:
+                name = f"jsonsql_in_{len(context.tables) + 1}"
+                context.tables.append((name, column_type, values))
+                output.append(f"{column} IN (SELECT value FROM {name})")
+                return True
+
+        if dialect.json_in is None:
+            return False
+        try:
+            payload = list(values) if dialect.array_param else json.dumps(values)
+        except (TypeError, ValueError):
+            return False
+        params.append(payload)
+        output.append(dialect.json_in.format(column=column, mark=self._placeholder(len(params))))
+        return True
+
+    def _marks(self, start: int, stop: int) -> str:
+        """Comma separated placeholders of parameters ``start`` to ``stop`` - 1."""
+        if self.paramstyle == "qmark":
+            return ",".join("?" * (stop - start))
+        placeholder = self._placeholder
+        return ",".join(placeholder(index) for index in range(start, stop))
+
+    def _leaf(
+        self, node: Node, output: List[str], params: List[Any], context: _PlanContext
+    ) -> None:
+        node_type = type(node)
+        if node_type is Seek:
+            self._seek(node, output, params)
+            return
+
+        column = self.identifier(node.column)
+        if node_type is Compare:
+            operator = self._text(node.operator)
+            operand = node.operand
+            if type(operand) is Value:
+                if isinstance(operand.value, tuple) and self.paramstyle != "qmark":
+                    start = len(params) + 1
+                    params.extend(operand.value)
+                    marks = self._marks(start, len(params) + 1)
+                elif isinstance(operand.value, tuple):
+                    # Historical qmark rendering: one "?" for all the items
+                    params.extend(operand.value)
+                    marks = "?"
+                else:
+                    params.append(operand.value)
+                    marks = self._placeholder(len(params))
+                output.append(f"{column} {operator} {marks}")
+            elif type(operand) is ColumnRef:
+                output.append(f"{column} {operator} {self.identifier(operand.name)}")
+            elif type(operand) is Aggregate:
+                output.append(f"{column} {operator} "
+                              f"{operand.function}({self.identifier(operand.argument)})")
+            else:
+                raise TypeError(f"Cannot render operand {operand!r}")
+
+        elif node_type is InList:
+            values = node.values
+            if context is not None and node is context.chunk:
+                values = context.values
+            elif self.in_list_strategy is not None and len(values) > self.in_list_threshold:
+                if self._large_in_list(column, values, output, params, context):
+                    return
+            values = self.pad_in_list(values)
+            start = len(params) + 1
+            params.extend(values)
+            output.append(f"{column} IN ({self._marks(start, len(params) + 1)})")
+
+        elif node_type is Between:
+            params.append(node.low)
+            params.append(node.high)
+            output.append(f"{column} BETWEEN {self._placeholder(len(params) - 1)} "
+                          f"AND {self._placeholder(len(params))}")
+
+        else:
+            raise TypeError(f"Cannot render node {node!r}")
+
+    def _seek(self, node: Seek, output: List[str], params: List[Any]) -> None:
+        """Render a keyset condition consistent with its ORDER BY.
+
+        One direction renders as a row-value comparison, ``(a,b) > (?,?)``;
+        mixed directions, or dialects without row-value comparisons, as the
+        equivalent ``(a > ? OR (a = ? AND b > ?))``.
+        """
+        columns = [self.identifier(column) for column in node.columns]
+        operators = ["<" if direction == "DESC" else ">" for direction in node.directions]
+        placeholder = self._placeholder
+        if len(columns) == 1:
+            params.append(node.values[0])
+            output.append(f"{columns[0]} {operators[0]} {placeholder(len(params))}")
+            return
+
+        if self.dialect.row_values and len(set(operators)) == 1:
+            start = len(params) + 1
+            params.extend(node.values)
+            output.append(f"({','.join(columns)}) {operators[0]} "
+                          f"({self._marks(start, len(params) + 1)})")
+            return
+
+        terms = []
+        for index, column in enumerate(columns):
+            parts = []
+            for prior in range(index):
+                params.append(node.values[prior])
+                parts.append(f"{columns[prior]} = {placeholder(len(params))}")
+            params.append(node.values[index])
+            parts.append(f"{column} {operators[index]} {placeholder(len(params))}")
+            terms.append(parts[0] if len(parts) == 1 else f"({' AND '.join(parts)})")
+        output.append(f"({' OR '.join(terms)})")
+
+
+def _conjuncts(node: Node) -> Iterator[Node]:
+    """Yield the predicates that ``node`` ANDs together."""
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if type(node) is BoolOp and node.operator == "AND":
+            stack.extend(reversed(node.operands))
+        else:
+            yield node
+
+
+def _unique(values: tuple) -> tuple:
+    """``values`` without duplicates, in order, so no chunk repeats a row."""
+    try:
+        return tuple(dict.fromkeys(values))
+    except TypeError:
+        return values
@@ -0,0 +1,343 @@
+"""Load generator that replays a captured request log.
+
+    python -m jsonsql.replay captured.jsonl --config policy.json --concurrency 8
+    python -m jsonsql.replay captured.jsonl.gz -c policy.json --execute --rows 100000
+
+Every request of the log (see ``capture.RequestCapture``) is run through
+``sql_parse`` by ``--concurrency`` threads. With ``--execute`` the valid ones
+are also run with ``JsonSQL.execute`` against a synthetic SQLite database
+generated from the policy's column types. The report gives the throughput,
+latency histograms of parsing and execution and the mix of rejection
+reasons; ``--json`` prints it as JSON, to be kept per release.
+
+Threads share the GIL, so parsing throughput does not grow with the
+concurrency; execution releases it while SQLite works.
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Set
+
+from .capture import read_log
+from .cli import load_config
+from .instrument import LatencyHistogram
+from .jsonsql import JsonSQL
+from .metrics import rejection_reason
+from .pool import ConnectionPool
+
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*\Z")
+
+_SQL_TYPES = {int: "INTEGER", float: "REAL", str: "TEXT", bool: "INTEGER", bytes: "BLOB"}
+
+
+def _column_type(valuetype: Any) -> Any:
+    if isinstance(valuetype, tuple):
+        valuetype = next((t for t in valuetype if t is not type(None)), object)
+    return valuetype
+
+
+def _synthetic_value(rng: random.Random, column: str, valuetype: Any, row: int) -> Any:
+    if valuetype is bool:
+        return rng.random() < 0.5
+    if valuetype is int:
+        return row if column == "id" else rng.randrange(1000)
+    if valuetype is float:
+        return round(rng.random() * 1000, 2)
+    if valuetype is str:
+        return f"{column}_{rng.randrange(100)}"
+    if valuetype is bytes:
+        return bytes(rng.getrandbits(8) for _ in range(8))
+    return rng.randrange(1000)
+
+
+def request_tables(request: Any) -> Set[str]:
+    """Names of the tables a request reads from or joins."""
+    tables = set()
+    if not isinstance(request, dict):
+        return tables
+    for table in [request.get("from", request.get("table"))] + [
+            join.get("table") for join in request.get("joins") or () if isinstance(join, dict)]:
+        if isinstance(table, dict):
+            table = table.get("table")
+        if isinstance(table, str):
+            tables.add(table)
+    return tables
+
+
+def synthetic_database(
+    path: str, jsonsql: JsonSQL, rows: int = 1000, tables: Iterable[str] = (), seed: int = 0,
+    overwrite: bool = False
+) -> List[str]:
+    """Create a SQLite database whose tables hold random rows of the policy's columns.
+
+    Every table gets every column of ``ALLOWED_COLUMNS`` (qualifiers
+    dropped) with values of the column's type, plus the columns listed for
+    it in ``ALLOWED_TABLES``, with their own types if given. Tables are the
+    explicitly allowed ones and ``tables``; names that are not plain
+    identifiers (``*``, ``schema.table``) are skipped.
+
+    Args:
+        overwrite (bool): Replace the file at ``path`` if there is one.
+            Without it an existing file is refused, so that a real database
+            is never filled with random rows.
+
+    Returns:
+        The names of the tables created.
+
+    Raises:
+        FileExistsError: If ``path`` exists and ``overwrite`` is not set.
+    """
+    if path != ":memory:" and os.path.lexists(path):
+        if not overwrite:
+            raise FileExistsError(f"{path} already exists; refusing to overwrite it")
+        os.remove(path)
+
+    columns: Dict[str, Any] = {}
+    for column, valuetype in jsonsql.ALLOWED_COLUMNS.items():
+        name = column.rpartition(".")[2]
+        if _IDENTIFIER.match(name):
+            columns.setdefault(name, _column_type(valuetype))
+    columns.setdefault("id", int)
+
+    names = sorted({name for name in (*jsonsql.ALLOWED_TABLES, *tables)
+                    if _IDENTIFIER.match(name)})
+    rng = random.Random(seed)
+    connection = sqlite3.connect(path)
+    try:
+        for table in names:
+            extra = jsonsql.ALLOWED_TABLES.get(table) or ()
+            table_columns = dict(columns)
+            for column in extra:
+                if isinstance(column, str) and _IDENTIFIER.match(column):
+                    if isinstance(extra, Mapping):
+                        table_columns[column] = _column_type(extra[column])
+                    else:
+                        table_columns.setdefault(column, object)
+            definition = ", ".join(f'"{column}" {_SQL_TYPES.get(valuetype, "")}'.rstrip()
+                                   for column, valuetype in table_columns.items())
+            connection.execute(f'CREATE TABLE "{table}" ({definition})')
+            placeholders = ",".join("?" * len(table_columns))
+            connection.executemany(
+                f'INSERT INTO "{table}" VALUES ({placeholders})',
+                ([_synthetic_value(rng, column, valuetype, row)
+                  for column, valuetype in table_columns.items()] for row in range(rows)))
+        connection.commit()
+    finally:
+        connection.close()
+    return names
+
+
+def load_requests(lines: Iterable[bytes]) -> List[Any]:
+    """Decode log lines; a line that is not JSON becomes its ``ValueError``."""
+    requests = []
+    for line in lines:
+        try:
+            requests.append(json.loads(line))
+        except ValueError as e:
+            requests.append(e)
+    return requests
+
+
+def replay(
+    requests: Sequence[Any],
+    jsonsql: JsonSQL,
+    concurrency: int = 1,
+    pool: Optional[ConnectionPool] = None,
+    repeat: int = 1,
+    with_values: bool = False
+) -> Dict[str, Any]:
+    """Run ``requests`` ``repeat`` times through ``jsonsql`` from ``concurrency`` threads.
+
+    Args:
+        requests: Decoded requests, as from ``load_requests``.
+        pool: If given, valid requests are also executed there.
+
+    Returns:
+        dict: ``requests``, ``valid``, ``rejected``, ``errors`` (failed
+        executions), ``seconds``, ``requests_per_second``, ``concurrency``,
+        the ``parse`` and ``execute`` ``LatencyHistogram`` (the latter None
+        without a pool), and the ``reasons`` and ``error_reasons`` Counters.
+    """
+    if not isinstance(concurrency, int) or concurrency < 1:
+        raise ValueError(f"concurrency must be a positive int, got {concurrency!r}")
+    total = len(requests) * repeat
+    lock = threading.Lock()
+    position = [0]
+    results = []
+
+    def work():
+        parse, execute = LatencyHistogram(), LatencyHistogram()
+        reasons: Counter = Counter()
+        errors: Counter = Counter()
+        clock = time.perf_counter
+        while True:
+            with lock:
+                index = position[0]
+                if index >= total:
+                    break
+                position[0] = index + 1
+            request = requests[index % len(requests)]
+            if isinstance(request, ValueError):
+                reasons["json"] += 1
+                continue
+
+            start = clock()
+            result = jsonsql.sql_parse(request, with_values=with_values)
+            parse.add(clock() - start)
+            if not result[0]:
+                reasons[rejection_reason(result[1])] += 1
+                continue
+            if pool is None:
+                continue
+
+            start = clock()
+            try:
+                for _ in jsonsql.execute(request, pool):
+                    pass
+            except (sqlite3.Error, ValueError) as e:
+                errors[rejection_reason(str(e))] += 1
+            else:
+                execute.add(clock() - start)
+        with lock:
+            results.append((parse, execute, reasons, errors))
+
+    threads = [threading.Thread(target=work) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - start
+
+    parse, execute = LatencyHistogram(), LatencyHistogram()
+    reasons: Counter = Counter()
+    errors: Counter = Counter()
+    for result in results:
+        parse.merge(result[0])
+        execute.merge(result[1])
+        reasons.update(result[2])
+        errors.update(result[3])
+    rejected = sum(reasons.values())
+    return {
+        "requests": total,
+        "valid": total - rejected,
+        "rejected": rejected,
+        "errors": sum(errors.values()),
+        "seconds": seconds,
+        "requests_per_second": total / seconds if seconds else 0.0,
+        "concurrency": concurrency,
+        "parse": parse,
+        "execute": execute if pool is not None else None,
+        "reasons": reasons,
+        "error_reasons": errors,
+    }
+
+
+def report_json(summary: Dict[str, Any]) -> Dict[str, Any]:
+    """The summary of ``replay`` with histograms as dicts, for ``json.dumps``."""
+    return {**summary,
+            "parse": summary["parse"].to_dict(),
+            "execute": summary["execute"] and summary["execute"].to_dict(),
+            "reasons": dict(summary["reasons"].most_common()),
+            "error_reasons": dict(summary["error_reasons"].most_common())}
+
+
+def format_report(summary: Dict[str, Any], top: int = 10) -> str:
+    lines = [
+        f"requests: {summary['requests']}  valid: {summary['valid']}  "
+        f"rejected: {summary['rejected']}  errors: {summary['errors']}",
+        f"elapsed: {summary['seconds']:.2f}s  concurrency: {summary['concurrency']}  "
+        f"throughput: {summary['requests_per_second']:.0f} requests/s",
+    ]
+    for name in ("parse", "execute"):
+        histogram = summary[name]
+        if histogram is None or not histogram.count:
+            continue
+        lines.append(f"{name} latency: p50 {histogram.percentile(0.5):.0f}us  "
+                     f"p90 {histogram.percentile(0.9):.0f}us  "
+                     f"p99 {histogram.percentile(0.99):.0f}us  max {histogram.max:.0f}us")
+        lines.extend(histogram.format())
+    for title, counter in (("rejections", summary["reasons"]),
+                           ("execution errors", summary["error_reasons"])):
+        if counter:
+            lines.append(f"{title}:")
+            for reason, count in counter.most_common(top):
+                lines.append(f"{count:>10}  {reason}")
+    return "\n".join(lines)
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m jsonsql.replay",
+        description="Replay a captured JsonSQL request log as a load test.")
+    parser.add_argument("log", help="JSONL request log (.gz allowed)")
+    parser.add_argument("-c", "--config", required=True,
+                        help="JSON file of JsonSQL constructor arguments")
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="replaying threads (default: 1)")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="times the log is replayed (default: 1)")
+    parser.add_argument("--with-values", action="store_true",
+                        help="inline parameter values into the SQL")
+    parser.add_argument("--execute", action="store_true",
+                        help="also execute valid requests on a synthetic SQLite database")
+    parser.add_argument("--database", default=None,
+                        help="SQLite file to generate, which must not exist yet "
+                             "(default: a temporary file)")
+    parser.add_argument("--overwrite", action="store_true",
+                        help="replace the --database file if it exists")
+    parser.add_argument("--rows", type=int, default=1000,
+                        help="rows per synthetic table (default: 1000)")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--top", type=int, default=10,
+                        help="rejection reasons to list in the report")
+    args = parser.parse_args(argv)
+    if args.repeat < 1:
+        parser.error("--repeat must be positive")
+
+    jsonsql = JsonSQL(**load_config(args.config))
+    requests = load_requests(read_log(args.log))
+    if not requests:
+        parser.error(f"no requests in {args.log}")
+
+    pool = None
+    directory = None
+    database = args.database
+    if args.execute:
+        if database is None:
+            directory = tempfile.mkdtemp()
+            database = os.path.join(directory, "replay.db")
+        tables = set().union(*map(request_tables, requests))
+        try:
+            synthetic_database(database, jsonsql, args.rows, tables, overwrite=args.overwrite)
+        except FileExistsError:
+            parser.error(f"{database} already exists; pass --overwrite to replace it")
+        pool = ConnectionPool(database, size=args.concurrency)
+    try:
+        summary = replay(requests, jsonsql, args.concurrency, pool, args.repeat,
+                         args.with_values)
+    finally:
+        if pool is not None:
+            pool.close()
+        if directory is not None:
+            shutil.rmtree(directory)
+
+    if args.json:
+        print(json.dumps(report_json(summary), indent=2))
+    else:
+        print(format_report(summary, args.top))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,268 @@
+"""Policies read from a SQLite database (see ``JsonSQL.from_sqlite``).
+
+``read_sqlite_schema`` lists the tables and views in ``sqlite_master`` and
+reads the columns of each one from ``pragma_table_info``. Declared types are mapped to Python types with SQLite's affinity rules (see
+``sqlite_type``). The result is a ``Schema``, which holds the
+database's ``schema_version`` and a fingerprint of its definitions. It can
+be pickled, or stored with ``to_dict``, and given back to
+``read_sqlite_schema``, which then only re-reads the tables if the schema
+has changed since, or belongs to a different database.
+"""
+
+import hashlib
+import sqlite3
+from fnmatch import fnmatchcase
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+TYPE_NAMES = {
+    "int": int,
+    "float": float,
+    "str": str,
+    "bool": bool,
+    "bytes": bytes,
+    "object": object,
+}
+
+_TYPE_NAMES_BY_TYPE = {valuetype: name for name, valuetype in TYPE_NAMES.items()}
+
+_TABLES = ("SELECT name FROM sqlite_master WHERE type IN ('table', 'view') "
+           "AND name NOT LIKE 'sqlite\\_%' ESCAPE '\\' ORDER BY name")
+
+# Columns of one table with their declared type and primary key position
+_COLUMNS = "SELECT name, type, pk FROM pragma_table_info(?) ORDER BY cid"
+
+# The schema version and every definition in sqlite_master. schema_version
+# is only a change counter, so two databases can share one; the definitions
+# tell them apart
+_IDENTITY = """
+SELECT schema_version,
+       (SELECT group_concat(type || ' ' || name || ' ' || ifnull(sql, ''), char(10))
+        FROM (SELECT type, name, sql FROM sqlite_master ORDER BY type, name))
+FROM pragma_schema_version
+"""
+
+
+def sqlite_type(declared: str) -> Any:
+    """Python type(s) for a column's declared type, by SQLite type affinity.
+
+    INTEGER affinity gives ``int`` and TEXT gives ``str``. BLOB gives
+    ``bytes``, and no declared type gives ``object``. REAL gives ``float``.
+    NUMERIC gives ``(int, float)``, except that BOOLEAN gives ``bool``, and
+    DATE and TIME types give ``str``, which is how they are usually stored.
+    """
+    declared = declared.upper()
+    if "INT" in declared:
+        return int
+    if "CHAR" in declared or "CLOB" in declared or "TEXT" in declared:
+        return str
+    if "BLOB" in declared:
+        return bytes
+    if not declared:
+        return object
+    if "REAL" in declared or "FLOA" in declared or "DOUB" in declared:
+        return float
+    if "BOOL" in declared:
+        return bool
+    if "DATE" in declared or "TIME" in declared:
+        return str
+    return (int, float)
+
+
+def _type_names(valuetype: Any) -> Union[str, List[str]]:
+    if isinstance(valuetype, tuple):
+        return [_TYPE_NAMES_BY_TYPE[t] for t in valuetype]
+    return _TYPE_NAMES_BY_TYPE[valuetype]
+
+
+def _union(a: Any, b: Any) -> Any:
+    """The types of ``a`` and ``b`` together, as one type or a tuple."""
+    types = []
+    for valuetype in (*(a if isinstance(a, tuple) else (a,)),
+                      *(b if isinstance(b, tuple) else (b,))):
+        if valuetype is object:
+            return object
+        if valuetype not in types:
+            types.append(valuetype)
+    return types[0] if len(types) == 1 else tuple(types)
+
+
+class TableSchema:
+    """The columns of one table or view.
+
+    Attributes:
+        name (str): The table name.
+        columns (Dict[str, type]): Column → Python type(s), in table order.
+        primary_key (Tuple[str, ...]): Primary key columns, in key order.
+    """
+
+    __slots__ = ("name", "columns", "primary_key")
+
+    def __init__(
+        self,
+        name: str,
+        columns: Dict[str, Any],
+        primary_key: Iterable[str] = ()
+    ):
+        self.name = name
+        self.columns = columns
+        self.primary_key: Tuple[str, ...] = tuple(primary_key)
+
+    def __repr__(self) -> str:
+        return f"TableSchema({self.name!r}, {len(self.columns)} columns)"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "columns": {column: _type_names(valuetype)
+                        for column, valuetype in self.columns.items()},
+            "primary_key": list(self.primary_key),
+        }
+
+    @classmethod
+    def from_dict(cls, name: str, data: Dict[str, Any]) -> "TableSchema":
+        columns = {}
+        for column, names in data["columns"].items():
+            columns[column] = (tuple(TYPE_NAMES[n] for n in names)
+                               if isinstance(names, list) else TYPE_NAMES[names])
+        return cls(name, columns, data.get("primary_key", ()))
+
+
+class Schema:
+    """Tables read from a SQLite database.
+
+    Attributes:
+        tables (Dict[str, TableSchema]): Table name → its columns, by name.
+        version (int): ``PRAGMA schema_version`` when the tables were read.
+        include, exclude (Optional[Tuple[str, ...]]): The table filters the
+            schema was read with.
+        fingerprint (Optional[str]): SHA-256 of the ``sqlite_master``
+            definitions of the database the tables were read from. Only a
+            database with the same definitions, whose tables read the same,
+            has the same fingerprint. A schema without one is never reused
+            by ``read_sqlite_schema``.
+    """
+
+    __slots__ = ("tables", "version", "include", "exclude", "fingerprint")
+
+    def __init__(
+        self,
+        tables: Dict[str, TableSchema],
+        version: int,
+        include: Optional[Iterable[str]] = None,
+        exclude: Optional[Iterable[str]] = None,
+        fingerprint: Optional[str] = None
+    ):
+        self.tables = tables
+        self.version = version
+        self.include = None if include is None else tuple(include)
+        self.exclude = None if exclude is None else tuple(exclude)
+        self.fingerprint = fingerprint
+
+    def __repr__(self) -> str:
+        return f"Schema({len(self.tables)} tables, version={self.version})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """A JSON-serializable form, read back with ``from_dict``."""
+        return {
+            "version": self.version,
+            "fingerprint": self.fingerprint,
+            "include": None if self.include is None else list(self.include),
+            "exclude": None if self.exclude is None else list(self.exclude),
+            "tables": {name: table.to_dict() for name, table in self.tables.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Schema":
+        """Rebuild a schema from ``to_dict``.
+
+        Raises:
+            KeyError: If a type name is unknown (see ``TYPE_NAMES``).
+        """
+        tables = {name: TableSchema.from_dict(name, table)
+                  for name, table in data["tables"].items()}
+        return cls(tables, data["version"], data.get("include"), data.get("exclude"),
+                   data.get("fingerprint"))
+
+    def policy(self) -> Dict[str, Any]:
+        """JsonSQL arguments that allow SELECTs of these tables' columns.
+
+        Each table is given with its ``{column: type}`` map, so a column is
+        only accepted for a table that has it, and is checked against that
+        table's type. ``allowed_columns`` maps each bare column name to its
+        type, or to the union of its types when tables disagree. It applies
+        to ``logic_parse`` and to bare columns shared by joined tables.
+        """
+        columns: Dict[str, Any] = {}
+        for table in self.tables.values():
+            for column, valuetype in table.columns.items():
+                known = columns.get(column)
+                columns[column] = valuetype if known is None else _union(known, valuetype)
+        return {
+            "allowed_queries": ["SELECT"],
+            "allowed_items": ["*"],
+            "allowed_tables": [{name: dict(table.columns)}
+                               for name, table in self.tables.items()],
+            "allowed_connections": ["WHERE"],
+            "allowed_columns": columns,
+        }
+
+
+def _selected(name: str, include: Optional[Tuple[str, ...]],
+              exclude: Optional[Tuple[str, ...]]) -> bool:
+    if include is not None and not any(fnmatchcase(name, p) for p in include):
+        return False
+    return exclude is None or not any(fnmatchcase(name, p) for p in exclude)
+
+
+def read_sqlite_schema(
+    connection: Union[sqlite3.Connection, str],
+    include: Optional[Iterable[str]] = None,
+    exclude: Optional[Iterable[str]] = None,
+    cached: Optional[Schema] = None
+) -> Schema:
+    """Read the tables and views of a SQLite database.
+
+    Args:
+        connection: An open connection, or the path of a database file.
+        include (Iterable[str], optional): Names or ``fnmatch`` patterns of
+            the tables to read. Defaults to None (all of them).
+        exclude (Iterable[str], optional): Names or patterns of tables to
+            skip, even if included. SQLite's internal ``sqlite_*`` tables are
+            always skipped.
+        cached (Schema, optional): A schema read earlier. It is returned
+            unchanged if it was read with the same filters, from a database
+            with the same definitions (its ``fingerprint``), and the
+            ``schema_version`` has not changed since.
+
+    Returns:
+        The ``Schema``. It takes one query per table, plus two for the
+        schema identity and the table list, or only the identity query when
+        ``cached`` is reused.
+    """
+    if isinstance(connection, str):
+        opened = sqlite3.connect(connection)
+        try:
+            return read_sqlite_schema(opened, include, exclude, cached)
+        finally:
+            opened.close()
+
+    include = None if include is None else tuple(include)
+    exclude = None if exclude is None else tuple(exclude)
+    version, definitions = connection.execute(_IDENTITY).fetchone()
+    fingerprint = hashlib.sha256((definitions or "").encode()).hexdigest()
+    if (cached is not None and cached.fingerprint == fingerprint
+            and cached.version == version
+            and cached.include == include and cached.exclude == exclude):
+        return cached
+
+    tables = {}
+    for (name,) in connection.execute(_TABLES).fetchall():
+        if not _selected(name, include, exclude):
+            continue
+        columns, key = {}, []
+        for column, declared, pk in connection.execute(_COLUMNS, (name,)):
+            columns[column] = sqlite_type(declared or "")
+            if pk:
+                key.append((pk, column))
+        key.sort()
+        tables[name] = TableSchema(name, columns, [column for _, column in key])
+    return Schema(tables, version, include, exclude, fingerprint)
@@ -0,0 +1,21 @@
+import pytest
+
+from src.jsonsql import JsonSQL
+
+# Policy shared by the tests that only vary JsonSQL's options
+POLICY = dict(
+    allowed_queries=["SELECT", "DELETE"],
+    allowed_items=["*"],
+    allowed_tables=["users", "roles"],
+    allowed_connections=["WHERE"],
+    allowed_columns={"id": int, "age": int, "name": str, "active": bool, "score": float,
+                     "note": object, "users.id": int, "roles.id": int, "COUNT(*)": int},
+)
+
+
+@pytest.fixture
+def make_jsonsql():
+    """Build a JsonSQL with ``POLICY``; keyword arguments override it or add options."""
+    def make(**options) -> JsonSQL:
+        return JsonSQL(**{**POLICY, **options})
+    return make
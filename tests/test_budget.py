@@ -0,0 +1,125 @@
+import json
+import pickle
+
+import pytest
+
+from src.jsonsql import Budget, Metrics
+from src.jsonsql.cli import load_config
+
+
+def select(where=None, **clauses):
+    request = {"query": "SELECT", "items": ["*"], "from": "users", **clauses}
+    if where is not None:
+        request["where"] = where
+    return request
+
+
+def nested(depth):
+    """A tree of ``depth`` levels: ``depth - 1`` AND groups around one condition."""
+    logic = {"id": {"=": 1}}
+    for _ in range(depth - 1):
+        logic = {"AND": [logic, {"name": {"=": "x"}}]}
+    return logic
+
+
+NESTED = {"OR": [{"id": {"IN": [1, 2, 3]}},
+                 {"AND": [{"name": {"=": "a"}}, {"id": {">": 1, "<": 9}}]}]}
+
+
+class TestLimits:
+    def test_within_budget(self, make_jsonsql):
+        jsonsql = make_jsonsql(budget=Budget(max_depth=3, max_leaves=4, max_in_list=3,
+                                             max_items=1))
+        assert jsonsql.sql_parse(select(NESTED))[0]
+        assert jsonsql.logic_parse(NESTED)[0]
+
+    def test_depth(self, make_jsonsql):
+        jsonsql = make_jsonsql(budget=Budget(max_depth=3))
+        assert jsonsql.sql_parse(select(nested(3)))[0]
+        assert jsonsql.sql_parse(select(nested(4))) == (
+            False, "Budget exceeded: max_depth=3 in where (0 conditions, depth 4; "
+                   "passed: items, tables)", ())
+        # An implicit AND over several columns is a level too
+        assert not jsonsql.logic_parse({"AND": [{"id": {"=": 1}, "name": {"=": "x"}},
+                                                {"OR": [nested(2), nested(1)]}]})[0]
+
+    def test_depth_is_checked_before_the_subtree(self, make_jsonsql):
+        # Far deeper than the recursion limit, and invalid at the bottom
+        jsonsql = make_jsonsql(budget=Budget(max_depth=10))
+        logic = {"secret": {"=": 1}}
+        for _ in range(100000):
+            logic = {"OR": [logic, {"id": {"=": 1}}]}
+        result = jsonsql.logic_parse(logic)
+        assert result[1].startswith("Budget exceeded: max_depth=10 in logic")
+
+    def test_leaves_across_where_and_having(self, make_jsonsql):
+        jsonsql = make_jsonsql(budget=Budget(max_leaves=4))
+        result = jsonsql.sql_parse(select(NESTED, having={"id": {"=": 1}}))
+        assert result[1] == ("Budget exceeded: max_leaves=4 in having "
+                             "(5 conditions, depth 3; passed: items, tables, where)")
+
+    def test_in_list(self, make_jsonsql):
+        jsonsql = make_jsonsql(budget=Budget(max_in_list=3))
+        assert jsonsql.sql_parse(select({"id": {"IN": [1, 2, 3]}}))[0]
+        result = jsonsql.sql_parse(select({"id": {"IN": [1, 2, 3, 4]}}))
+        assert result[1].startswith("Budget exceeded: max_in_list=3 in where")
+        assert jsonsql.sql_parse(select({"id": {"BETWEEN": [1, 2]}}))[0]
+
+    @pytest.mark.parametrize("limits, request_, message", [
+        ({"max_items": 1}, {"items": ["id", "name"]},
+         "Budget exceeded: max_items=1 in items (passed: nothing)"),
+        ({"max_joins": 1}, {"joins": [{"table": "roles"}] * 2},
+         "Budget exceeded: max_joins=1 in joins (passed: items, tables)"),
+        ({"max_order_by": 1}, {"order_by": ["id", "name"], "where": {"id": {"=": 1}}},
+         "Budget exceeded: max_order_by=1 in order_by (1 conditions, depth 1; "
+         "passed: items, tables, where)"),
+    ])
+    def test_clause_lengths(self, limits, request_, message, make_jsonsql):
+        jsonsql = make_jsonsql(budget=Budget(**limits))
+        assert jsonsql.sql_parse({**select(), **request_}) == (False, message, ())
+
+    def test_legacy_logic(self, make_jsonsql):
+        jsonsql = make_jsonsql(budget=Budget(max_leaves=1))
+        request = {"query": "SELECT", "items": ["*"], "table": "users",
+                   "connection": "WHERE", "logic": {"id": {">": 1, "<": 5}}}
+        assert jsonsql.sql_parse(request)[1] == (
+            "Budget exceeded: max_leaves=1 in logic (2 conditions, depth 1; "
+            "passed: items, tables)")
+
+    def test_other_rejections_come_first(self, make_jsonsql):
+        jsonsql = make_jsonsql(budget=Budget(max_in_list=1))
+        assert jsonsql.sql_parse(select({"secret": {"IN": [1, 2]}}))[1] == "Invalid Input - secret"
+
+
+class TestBudget:
+    def test_template_cache(self, make_jsonsql):
+        jsonsql = make_jsonsql(budget=Budget())
+        request = select({"id": {"IN": [1, 2, 3]}})
+        assert jsonsql.sql_parse(request)[0]
+        jsonsql.budget = Budget(max_in_list=2)
+        assert not jsonsql.sql_parse(request)[0]
+        assert not jsonsql.sql_parse(request)[0]
+
+    def test_metrics_reason(self, make_jsonsql):
+        jsonsql = make_jsonsql(budget=Budget(max_items=1))
+        jsonsql.metrics = Metrics()
+        jsonsql.sql_parse(select(items=["id", "name"]))
+        assert jsonsql.metrics.snapshot()["jsonsql_rejections_total"] == {
+            ("sql_parse", "budget"): 1}
+
+    @pytest.mark.parametrize("limit", [0, -1, 1.5, "10", True])
+    def test_invalid(self, limit):
+        with pytest.raises(ValueError):
+            Budget(max_depth=limit)
+
+    def test_read_only_and_picklable(self):
+        budget = Budget(max_depth=3, max_items=10)
+        with pytest.raises(AttributeError):
+            budget.max_depth = 4
+        assert pickle.loads(pickle.dumps(budget)).to_dict() == budget.to_dict()
+        assert repr(budget) == "Budget(max_depth=3, max_items=10)"
+
+    def test_load_config(self, tmp_path):
+        path = tmp_path / "policy.json"
+        path.write_text(json.dumps({"allowed_tables": ["users"], "budget": {"max_joins": 2}}))
+        assert load_config(str(path))["budget"].max_joins == 2
@@ -0,0 +1,86 @@
+import io
+import json
+
+import pytest
+
+from src.jsonsql.cli import compile_stream, load_config, main
+
+
+@pytest.fixture
+def config_path(tmp_path):
+    path = tmp_path / "policy.json"
+    path.write_text(json.dumps({
+        "allowed_queries": ["SELECT"],
+        "allowed_items": ["*"],
+        "allowed_tables": ["users"],
+        "allowed_connections": ["WHERE"],
+        "allowed_columns": {"id": "int", "name": ["str", "bytes"]},
+    }))
+    return str(path)
+
+
+def request(table: str, value: int) -> dict:
+    return {
+        "query": "SELECT",
+        "items": ["*"],
+        "table": table,
+        "connection": "WHERE",
+        "logic": {"id": {"=": value}},
+    }
+
+
+def test_load_config(config_path):
+    config = load_config(config_path)
+    assert config["allowed_columns"] == {"id": int, "name": (str, bytes)}
+
+
+def test_load_config_table_types(tmp_path):
+    path = tmp_path / "policy.json"
+    path.write_text(json.dumps({"allowed_tables": [
+        "roles", {"users": ["id"]}, {"events": {"id": "int", "score": ["int", "float"]}}]}))
+    assert load_config(str(path))["allowed_tables"] == [
+        "roles", {"users": ["id"]}, {"events": {"id": int, "score": (int, float)}}]
+
+
+def test_load_config_unknown_type(tmp_path):
+    path = tmp_path / "policy.json"
+    path.write_text(json.dumps({"allowed_columns": {"id": "integer"}}))
+    with pytest.raises(ValueError):
+        load_config(str(path))
+
+
+def test_compile_stream_keeps_order(config_path):
+    lines = []
+    for i in range(50):
+        lines.append(json.dumps(request("admins" if i % 5 == 0 else "users", i)))
+    lines.insert(3, "{not json")
+    source = io.BytesIO(("\n".join(lines) + "\n").encode())
+    sink = io.BytesIO()
+
+    summary = compile_stream(source, sink, load_config(config_path),
+                             workers=2, chunk_size=4)
+
+    records = [json.loads(line) for line in sink.getvalue().splitlines()]
+    assert len(records) == 51
+    assert records[0] == {"valid": False, "error": "Table not allowed: admins"}
+    assert records[1] == {"valid": True,
+                          "sql": "SELECT * FROM users WHERE id = ?",
+                          "params": [1]}
+    assert records[3]["error"].startswith("Invalid JSON")
+    assert records[50]["params"] == [49]
+    assert summary["requests"] == 51
+    assert summary["rejected"] == 11
+    assert summary["reasons"] == {"table": 10, "json": 1}
+
+
+def test_main(config_path, tmp_path, capsys):
+    source = tmp_path / "requests.jsonl"
+    source.write_text(json.dumps(request("users", 1)) + "\n")
+    output = tmp_path / "out.ndjson"
+
+    assert main([str(source), "-c", config_path, "-o", str(output),
+                 "-j", "1", "--with-values"]) == 0
+
+    assert json.loads(output.read_text()) == {
+        "valid": True, "sql": "SELECT * FROM users WHERE id = 1", "params": []}
+    assert "requests: 1" in capsys.readouterr().err
@@ -0,0 +1,115 @@
+import sqlite3
+
+import pytest
+
+
+LOGIC = {"OR": [{"id": {"IN": [1, 2]}}, {"age": {"BETWEEN": [18, 30]}}]}
+
+
+def request(**extra) -> dict:
+    return {
+        "query": "SELECT",
+        "items": ["name"],
+        "from": "users",
+        "where": {"name": {"=": "bob"}, "age": {">": 21}},
+        **extra,
+    }
+
+
+class TestParamstyle:
+    @pytest.mark.parametrize("paramstyle, expected", [
+        ("qmark", "(id IN (?,?) OR age BETWEEN ? AND ?)"),
+        ("numeric", "(id IN (:1,:2) OR age BETWEEN :3 AND :4)"),
+        ("named", "(id IN (:p1,:p2) OR age BETWEEN :p3 AND :p4)"),
+        ("format", "(id IN (%s,%s) OR age BETWEEN %s AND %s)"),
+        ("pyformat", "(id IN (%(p1)s,%(p2)s) OR age BETWEEN %(p3)s AND %(p4)s)"),
+        ("dollar", "(id IN ($1,$2) OR age BETWEEN $3 AND $4)"),
+    ])
+    def test_placeholders(self, paramstyle, expected, make_jsonsql):
+        result, sql, params = make_jsonsql(paramstyle=paramstyle).logic_parse(LOGIC)
+        assert sql == expected
+
+    def test_named_params_are_a_dict(self, make_jsonsql):
+        jsonsql = make_jsonsql(paramstyle="named")
+        assert jsonsql.logic_parse(LOGIC)[2] == {"p1": 1, "p2": 2, "p3": 18, "p4": 30}
+        # Served from the template cache
+        assert jsonsql.logic_parse({"OR": [{"id": {"IN": [5, 6]}},
+                                           {"age": {"BETWEEN": [1, 2]}}]})[2] == \
+            {"p1": 5, "p2": 6, "p3": 1, "p4": 2}
+        assert jsonsql.template_cache.hits == 1
+
+    def test_numbering_spans_where_and_having(self, make_jsonsql):
+        jsonsql = make_jsonsql(paramstyle="dollar")
+        result = jsonsql.sql_parse(request(group_by=["name"],
+                                           having={"COUNT(*)": {">": 1}}))
+        assert result[1] == ("SELECT name FROM users WHERE name = $1 AND age > $2 "
+                             "GROUP BY name HAVING COUNT(*) > $3")
+        assert result[2] == ("bob", 21, 1)
+
+    def test_with_values(self, make_jsonsql):
+        jsonsql = make_jsonsql(paramstyle="numeric")
+        assert jsonsql.sql_parse(request(), with_values=True) == \
+            (True, "SELECT name FROM users WHERE name = 'bob' AND age > 21", ())
+
+    @pytest.mark.parametrize("paramstyle", ["qmark", "numeric", "named"])
+    def test_executes_on_sqlite(self, paramstyle, make_jsonsql):
+        connection = sqlite3.connect(":memory:")
+        connection.execute("CREATE TABLE users (id INTEGER, age INTEGER, name TEXT)")
+        connection.executemany("INSERT INTO users VALUES (?, ?, ?)",
+                               [(1, 40, "bob"), (2, 22, "bob"), (3, 25, "eve")])
+        jsonsql = make_jsonsql(dialect="sqlite", paramstyle=paramstyle)
+        result, sql, params = jsonsql.sql_parse(request())
+        assert connection.execute(sql, params).fetchall() == [("bob",), ("bob",)]
+
+    def test_percent_escaped_for_format_styles(self, make_jsonsql):
+        jsonsql = make_jsonsql(paramstyle="format")
+        jsonsql.ALLOWED_COLUMNS = {"100%": int}
+        assert jsonsql.logic_parse({"100%": {"=": 1}}) == (True, "100%% = %s", (1,))
+
+    def test_invalid(self, make_jsonsql):
+        with pytest.raises(ValueError):
+            make_jsonsql(paramstyle="colon")
+        with pytest.raises(ValueError):
+            make_jsonsql(dialect="db2")
+
+
+class TestDialect:
+    def test_default_paramstyle(self, make_jsonsql):
+        assert make_jsonsql(dialect="postgresql").logic_parse({"id": {"=": 1}})[1] == "id = %s"
+        assert make_jsonsql(dialect="oracle").logic_parse({"id": {"=": 1}})[1] == "id = :p1"
+
+    def test_limit_offset(self, make_jsonsql):
+        extra = {"limit": 10, "offset": 20}
+        assert make_jsonsql(dialect="mysql").sql_parse(request(**extra))[1].endswith(
+            "LIMIT 10 OFFSET 20")
+        assert make_jsonsql(dialect="oracle").sql_parse(request(limit=10))[1].endswith(
+            "FETCH FIRST 10 ROWS ONLY")
+        assert make_jsonsql(dialect="oracle").sql_parse(request(**extra))[1].endswith(
+            "OFFSET 20 ROWS FETCH NEXT 10 ROWS ONLY")
+
+    def test_mssql_needs_order_by(self, make_jsonsql):
+        jsonsql = make_jsonsql(dialect="mssql")
+        assert jsonsql.sql_parse(request(limit=5))[1].endswith(
+            "ORDER BY (SELECT NULL) OFFSET 0 ROWS FETCH NEXT 5 ROWS ONLY")
+        ordered = request(limit=5, order_by=[{"column": "name", "direction": "ASC"}])
+        assert jsonsql.sql_parse(ordered)[1].endswith(
+            "ORDER BY name ASC OFFSET 0 ROWS FETCH NEXT 5 ROWS ONLY")
+
+    def test_quote_identifiers(self, make_jsonsql):
+        jsonsql = make_jsonsql(dialect="mysql", quote_identifiers=True)
+        jsonsql.ALLOWED_ITEMS = ["*"]
+        result = jsonsql.sql_parse({
+            "query": "SELECT",
+            "items": ["u.name", "COUNT(*)"],
+            "from": {"table": "users", "alias": "u"},
+            "where": {"name": {"=": "bob"}},
+            "group_by": ["u.name"],
+        })
+        assert result[1] == ("SELECT `u`.`name`,COUNT(*) FROM `users` AS `u` "
+                             "WHERE `name` = %s GROUP BY `u`.`name`")
+
+    def test_changing_dialect_clears_templates(self, make_jsonsql):
+        jsonsql = make_jsonsql()
+        assert jsonsql.logic_parse({"id": {"=": 1}})[1] == "id = ?"
+        jsonsql.paramstyle = "dollar"
+        assert jsonsql.logic_parse({"id": {"=": 1}})[1] == "id = $1"
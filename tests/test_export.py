@@ -0,0 +1,128 @@
+import csv
+import gzip
+import io
+import json
+import sqlite3
+
+import pytest
+
+from src.jsonsql import ConnectionPool, JsonSQL
+from src.jsonsql.export import column_names, csv_chunks, gzip_chunks, ndjson_chunks
+
+
+@pytest.fixture
+def pool(tmp_path):
+    path = str(tmp_path / "users.db")
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE users (id INTEGER, name TEXT, avatar BLOB)")
+    connection.executemany("INSERT INTO users VALUES (?, ?, ?)",
+                           [(i, f"user, \"{i}\"", None) for i in range(25)])
+    connection.execute("UPDATE users SET avatar = x'00ff' WHERE id = 0")
+    connection.commit()
+    connection.close()
+    with ConnectionPool(path, read_only=True) as pool:
+        yield pool
+
+
+@pytest.fixture
+def jsonsql():
+    return JsonSQL(
+        allowed_queries=["SELECT"],
+        allowed_items=["*", "id", "name", "COUNT(*) AS total"],
+        allowed_tables=["users"],
+        allowed_columns={"id": int, "name": str},
+    )
+
+
+def request(items, where=None):
+    data = {"query": "SELECT", "items": items, "from": "users", "order_by": ["id"]}
+    if where is not None:
+        data["where"] = where
+    return data
+
+
+class TestColumnNames:
+    def test_names(self):
+        assert column_names(["u.name", "COUNT(u.id) as user_count", "COUNT(*)"]) == (
+            "u.name", "user_count", "COUNT(*)")
+
+    @pytest.mark.parametrize("items", [["*"], ["id", "u.*"]])
+    def test_wildcard(self, items):
+        assert column_names(items) is None
+
+
+class TestEncoders:
+    def test_ndjson_batches(self):
+        rows = [(i, f"n{i}") for i in range(5)]
+        chunks = list(ndjson_chunks(rows, ["id", "name"], batch_size=2))
+        assert len(chunks) == 3
+        assert chunks[0] == b'{"id":0,"name":"n0"}\n{"id":1,"name":"n1"}\n'
+
+    def test_ndjson_values(self):
+        chunk = b"".join(ndjson_chunks([(b"\x00\xff", None, 1.5, "é")], "abcd"))
+        assert json.loads(chunk) == {"a": "AP8=", "b": None, "c": 1.5, "d": "é"}
+
+    def test_csv_batches(self):
+        chunks = list(csv_chunks([(1, "a,b"), (2, None)], ["id", "name"], batch_size=1))
+        assert chunks == [b'id,name\r\n1,"a,b"\r\n', b"2,\r\n"]
+
+    def test_csv_header_without_rows(self):
+        assert list(csv_chunks([], ["id"])) == [b"id\r\n"]
+        assert list(csv_chunks([], ["id"], header=False)) == []
+
+    def test_gzip(self):
+        chunks = list(gzip_chunks(iter([b"a" * 1000, b"b" * 1000])))
+        assert gzip.decompress(b"".join(chunks)) == b"a" * 1000 + b"b" * 1000
+
+    def test_lazy(self):
+        def rows():
+            yield (1,)
+            raise AssertionError("read past the first batch")
+
+        assert next(ndjson_chunks(rows(), ["id"], batch_size=1)) == b'{"id":1}\n'
+
+
+class TestExport:
+    def test_ndjson(self, jsonsql, pool):
+        data = b"".join(jsonsql.export(request(["id", "name"]), pool, batch_size=10))
+        lines = [json.loads(line) for line in data.splitlines()]
+        assert len(lines) == 25
+        assert lines[3] == {"id": 3, "name": 'user, "3"'}
+
+    def test_csv_roundtrip(self, jsonsql, pool):
+        data = b"".join(jsonsql.export(request(["id", "name"]), pool, format="csv"))
+        rows = list(csv.reader(io.StringIO(data.decode("utf-8"))))
+        assert rows[0] == ["id", "name"]
+        assert rows[4] == ["3", 'user, "3"']
+        assert len(rows) == 26
+
+    def test_wildcard_names_from_cursor(self, jsonsql, pool):
+        data = jsonsql.export(request(["*"], {"id": {"=": 0}}), pool)
+        assert json.loads(b"".join(data)) == {"id": 0, "name": 'user, "0"', "avatar": "AP8="}
+
+    def test_alias(self, jsonsql, pool):
+        data = jsonsql.export(request(["COUNT(*) AS total"]), pool, format="csv")
+        assert b"".join(data) == b"total\r\n25\r\n"
+
+    def test_empty_csv_has_header(self, jsonsql, pool):
+        data = jsonsql.export(request(["*"], {"id": {"<": 0}}), pool, format="csv")
+        assert b"".join(data) == b"id,name,avatar\r\n"
+
+    @pytest.mark.parametrize("format", ["ndjson", "csv"])
+    def test_gzip(self, jsonsql, pool, format):
+        plain = b"".join(jsonsql.export(request(["id", "name"]), pool, format=format))
+        compressed = b"".join(jsonsql.export(
+            request(["id", "name"]), pool, format=format, compress=True))
+        assert gzip.decompress(compressed) == plain
+
+    def test_chunk_per_batch(self, jsonsql, pool):
+        chunks = list(jsonsql.export(request(["id"]), pool, batch_size=10))
+        assert [chunk.count(b"\n") for chunk in chunks] == [10, 10, 5]
+
+    def test_invalid(self, jsonsql, pool):
+        with pytest.raises(ValueError, match="Table not allowed"):
+            jsonsql.export({"query": "SELECT", "items": ["id"], "from": "secrets"}, pool)
+        with pytest.raises(ValueError, match="export format"):
+            jsonsql.export(request(["id"]), pool, format="xml")
+        with pytest.raises(ValueError, match="batch_size"):
+            jsonsql.export(request(["id"]), pool, batch_size=None)
@@ -0,0 +1,180 @@
+import json
+import pickle
+import sqlite3
+
+import pytest
+
+from src.jsonsql import JsonSQL, Schema
+from src.jsonsql.schema import read_sqlite_schema, sqlite_type
+
+DDL = """
+CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL,
+                    email VARCHAR(80) UNIQUE, status INT, password TEXT);
+CREATE TABLE events (id INTEGER, user_id INT, status TEXT, payload BLOB,
+                     at DATETIME, score REAL, PRIMARY KEY (id, user_id));
+CREATE INDEX events_user_at ON events (user_id, at);
+CREATE TABLE audit_log (entry);
+CREATE VIEW active_users AS SELECT id, name FROM users WHERE status = 1;
+"""
+
+
+@pytest.fixture
+def connection():
+    connection = sqlite3.connect(":memory:")
+    connection.executescript(DDL)
+    yield connection
+    connection.close()
+
+
+def select(where, **request):
+    return {"query": "SELECT", "items": ["u.name"], "from": {"table": "users", "alias": "u"},
+            "joins": [{"table": "events", "alias": "e", "on": "u.id = e.user_id"}],
+            "where": where, **request}
+
+
+@pytest.mark.parametrize("declared, valuetype", [
+    ("INTEGER", int), ("bigint", int), ("VARCHAR(80)", str), ("CLOB", str),
+    ("BLOB", bytes), ("", object), ("DOUBLE PRECISION", float), ("BOOLEAN", bool),
+    ("DATETIME", str), ("DECIMAL(10,2)", (int, float)),
+])
+def test_sqlite_type(declared, valuetype):
+    assert sqlite_type(declared) == valuetype
+
+
+class TestReadSchema:
+    def test_tables(self, connection):
+        schema = read_sqlite_schema(connection)
+        # sqlite_sequence, created by AUTOINCREMENT, is internal
+        assert list(schema.tables) == ["active_users", "audit_log", "events", "users"]
+        users, events = schema.tables["users"], schema.tables["events"]
+        assert users.columns == {"id": int, "name": str, "email": str, "status": int,
+                                 "password": str}
+        assert events.columns["status"] is str and events.columns["payload"] is bytes
+        assert users.primary_key == ("id",)
+        assert events.primary_key == ("id", "user_id")
+        assert schema.tables["active_users"].columns == {"id": int, "name": str}
+
+    def test_filters(self, connection):
+        schema = read_sqlite_schema(connection, include=["*s"], exclude=["active_*"])
+        assert list(schema.tables) == ["events", "users"]
+
+    def test_one_query_per_table(self, connection):
+        statements = []
+        connection.set_trace_callback(statements.append)
+        schema = read_sqlite_schema(connection, exclude=["audit_log"])
+        # Statements SQLite runs internally for the pragmas start with "--"
+        statements = [sql for sql in statements if not sql.startswith("--")]
+        assert len(statements) == 2 + len(schema.tables)
+
+        statements = []
+        connection.set_trace_callback(statements.append)
+        assert read_sqlite_schema(connection, exclude=["audit_log"], cached=schema) is schema
+        assert len([sql for sql in statements if not sql.startswith("--")]) == 1
+
+    def test_cache_invalidation(self, connection):
+        schema = read_sqlite_schema(connection)
+        assert read_sqlite_schema(connection, include=["users"], cached=schema) is not schema
+        connection.execute("ALTER TABLE users ADD COLUMN age INT")
+        assert read_sqlite_schema(connection, cached=schema).tables["users"].columns["age"] is int
+
+    def test_other_database_same_version(self, connection, tmp_path):
+        schema = read_sqlite_schema(connection)
+        other = sqlite3.connect(str(tmp_path / "other.db"))
+        other.executescript("CREATE TABLE users (id INTEGER, secret TEXT);" + "".join(
+            f"CREATE TABLE t{i} (x);" for i in range(schema.version - 1)))
+        assert other.execute("PRAGMA schema_version").fetchone()[0] == schema.version
+        reread = read_sqlite_schema(other, cached=schema)
+        assert reread is not schema
+        assert reread.tables["users"].columns == {"id": int, "secret": str}
+        assert reread.fingerprint != schema.fingerprint
+
+        # Identical definitions read the same, so the schema is shared
+        twin = sqlite3.connect(":memory:")
+        twin.executescript(DDL)
+        assert read_sqlite_schema(twin, cached=schema) is schema
+        other.close()
+        twin.close()
+
+    def test_serializable(self, connection):
+        schema = read_sqlite_schema(connection, include=["users", "events"])
+        for copy in (Schema.from_dict(json.loads(json.dumps(schema.to_dict()))),
+                     pickle.loads(pickle.dumps(schema))):
+            assert copy.to_dict() == schema.to_dict()
+            assert copy.fingerprint == schema.fingerprint
+            assert read_sqlite_schema(connection, include=["users", "events"],
+                                      cached=copy) is copy
+        # Stored before schemas had a fingerprint
+        data = schema.to_dict()
+        del data["fingerprint"]
+        legacy = Schema.from_dict(data)
+        assert read_sqlite_schema(connection, include=["users", "events"],
+                                  cached=legacy) is not legacy
+
+    def test_path(self, tmp_path):
+        path = str(tmp_path / "app.db")
+        with sqlite3.connect(path) as connection:
+            connection.executescript(DDL)
+        connection.close()
+        assert "users" in read_sqlite_schema(path).tables
+
+
+class TestFromSqlite:
+    def test_per_table_types(self, connection):
+        jsonsql = JsonSQL.from_sqlite(connection)
+        # "status" is an INT in users and TEXT in events
+        sql = jsonsql.sql_parse(select({"u.status": {"=": 1}, "e.status": {"=": "open"}}))
+        assert sql[0] and sql[2] == (1, "open")
+        assert jsonsql.sql_parse(select({"u.status": {"=": "open"}})) == (
+            False, "Bad u.status, non <class 'int'>", ())
+        assert jsonsql.sql_parse(select({"e.status": {"=": 1}}))[0] is False
+
+    def test_having_aggregates(self, connection):
+        jsonsql = JsonSQL.from_sqlite(connection)
+        request = select({"u.status": {"=": 1}}, group_by=["u.name"])
+        for having in ({"COUNT(*)": {">": 1}}, {"AVG(e.score)": {">": 1}},
+                       {"MAX(e.status)": {"=": "open"}}):
+            assert jsonsql.sql_parse({**request, "having": having})[0]
+        assert jsonsql.sql_parse({**request, "having": {"MAX(u.score)": {">": 1}}}) == (
+            False, "Column not allowed: MAX(u.score)", ())
+
+    def test_unknown_columns(self, connection):
+        jsonsql = JsonSQL.from_sqlite(connection)
+        assert jsonsql.sql_parse(select({"u.score": {">": 1.0}})) == (
+            False, "Column not allowed: u.score", ())
+        assert jsonsql.sql_parse(select({"e.score": {">": 1.0}}))[0]
+        assert not jsonsql.sql_parse(select({"e.score": {">": 1.0}}, items=["u.secret"]))[0]
+        assert not jsonsql.sql_parse({"query": "SELECT", "items": ["id"],
+                                      "from": "sqlite_sequence"})[0]
+
+    def test_options(self, connection):
+        jsonsql = JsonSQL.from_sqlite(connection, exclude=["audit_log"],
+                                      not_allowed_columns=["password"])
+        assert "audit_log" not in jsonsql.ALLOWED_TABLES
+        assert jsonsql.sql_parse(select({"u.password": {"=": "x"}})) == (
+            False, "Invalid Input - u.password", ())
+        assert not jsonsql.sql_parse({"query": "DELETE", "from": "users"})[0]
+
+    def test_schema_reuse(self, connection):
+        schema = JsonSQL.from_sqlite(connection).schema
+        assert JsonSQL.from_sqlite(connection, schema=schema).schema is schema
+        assert schema.tables["events"].primary_key == ("id", "user_id")
+
+    def test_select_star(self, connection):
+        jsonsql = JsonSQL.from_sqlite(connection)
+        for request in ({"query": "SELECT", "items": ["*"], "table": "users"},
+                        {"query": "SELECT", "items": ["*"], "from": "users"},
+                        select({"u.id": {"=": 1}}, items=["*"]),
+                        select({"u.id": {"=": 1}}, items=["u.*", "e.at"])):
+            assert jsonsql.sql_parse(request)[0], request
+        assert jsonsql.sql_parse({"query": "SELECT", "items": ["x.*"], "from": "users"}) == (
+            False, "Column not allowed: x.*", ())
+
+        # A hand-written list that leaves columns out does not cover "*"
+        narrowed = JsonSQL.from_sqlite(
+            connection, allowed_tables=[{"users": {"id": int, "name": str}}])
+        assert narrowed.sql_parse({"query": "SELECT", "items": ["*"], "from": "users"}) == (
+            False, "Column not allowed: *", ())
+        # Nor does a table with a denied column
+        hidden = JsonSQL.from_sqlite(connection, not_allowed_columns=["password"])
+        assert not hidden.sql_parse({"query": "SELECT", "items": ["*"], "table": "users"})[0]
+        assert hidden.sql_parse({"query": "SELECT", "items": ["*"], "table": "events"})[0]
@@ -0,0 +1,129 @@
+import sqlite3
+
+import pytest
+
+
+def request(ids: list, **extra) -> dict:
+    return {
+        "query": "SELECT",
+        "items": ["id"],
+        "from": "users",
+        "where": {"id": {"IN": ids}, "name": {"!=": "nobody"}},
+        **extra,
+    }
+
+
+@pytest.fixture
+def connection():
+    connection = sqlite3.connect(":memory:")
+    connection.execute("CREATE TABLE users (id INTEGER, name TEXT)")
+    connection.executemany("INSERT INTO users VALUES (?, ?)",
+                           [(i, f"user{i}") for i in range(1000)])
+    yield connection
+    connection.close()
+
+
+def run(plan, connection) -> list:
+    return sorted(row[0] for row in plan.execute(connection))
+
+
+class TestSingleStatement:
+    def test_below_threshold_uses_placeholders(self, make_jsonsql):
+        jsonsql = make_jsonsql(in_list_strategy="json", in_list_threshold=3)
+        assert jsonsql.logic_parse({"id": {"IN": [1, 2, 3]}}) == \
+            (True, "id IN (?,?,?)", (1, 2, 3))
+
+    def test_json(self, connection, make_jsonsql):
+        jsonsql = make_jsonsql(in_list_strategy="json", in_list_threshold=3)
+        assert jsonsql.logic_parse({"id": {"IN": [1, 2, 3, 4]}}) == \
+            (True, "id IN (SELECT value FROM json_each(?))", ("[1, 2, 3, 4]",))
+        valid, sql, params = jsonsql.sql_parse(request([5, 7, 9, 5000]))
+        assert sorted(connection.execute(sql, params).fetchall()) == [(5,), (7,), (9,)]
+
+    def test_postgresql_binds_an_array(self, make_jsonsql):
+        jsonsql = make_jsonsql(dialect="postgresql", in_list_strategy="auto",
+                               in_list_threshold=3)
+        assert jsonsql.logic_parse({"id": {"IN": [1, 2, 3, 4]}}) == \
+            (True, "id = ANY(%s)", ([1, 2, 3, 4],))
+
+    def test_multi_statement_strategies_fall_back_to_json(self, make_jsonsql):
+        jsonsql = make_jsonsql(in_list_strategy="temp_table", in_list_threshold=3)
+        assert jsonsql.logic_parse({"id": {"IN": [1, 2, 3, 4]}})[1] == \
+            "id IN (SELECT value FROM json_each(?))"
+
+    def test_no_json_support_keeps_placeholders(self, make_jsonsql):
+        jsonsql = make_jsonsql(dialect="oracle", in_list_strategy="json",
+                               in_list_threshold=3)
+        assert jsonsql.logic_parse({"id": {"IN": [1, 2, 3, 4]}})[1] == \
+            "id IN (:p1,:p2,:p3,:p4)"
+
+    def test_invalid_options(self, make_jsonsql):
+        with pytest.raises(ValueError):
+            make_jsonsql(in_list_strategy="bitmap")
+        with pytest.raises(ValueError):
+            make_jsonsql(in_list_threshold=0)
+
+
+class TestPlan:
+    def test_single(self, make_jsonsql):
+        jsonsql = make_jsonsql()
+        valid, plan = jsonsql.sql_plan(request([1, 2]))
+        assert plan.single
+        statement = plan.statements[0]
+        assert (statement.sql, statement.params) == jsonsql.sql_parse(request([1, 2]))[1:]
+
+    def test_failure(self, make_jsonsql):
+        assert make_jsonsql().sql_plan({"query": "DROP", "items": ["*"]}) == \
+            (False, "Query not allowed: DROP")
+
+    def test_temp_table(self, connection, make_jsonsql):
+        jsonsql = make_jsonsql(in_list_strategy="temp_table", in_list_threshold=10)
+        ids = list(range(0, 2000, 3))
+        valid, plan = jsonsql.sql_plan(request(ids))
+        assert plan.statements[0].sql == ("SELECT id FROM users WHERE id IN "
+                                          "(SELECT value FROM jsonsql_in_1) AND name <> ?")
+        assert [statement.sql for statement in plan.setup] == [
+            "CREATE TEMP TABLE jsonsql_in_1 (value BIGINT)",
+            "INSERT INTO jsonsql_in_1 (value) VALUES (?)",
+        ]
+        assert run(plan, connection) == [i for i in ids if i < 1000]
+        # Dropped again by the teardown
+        assert connection.execute(
+            "SELECT COUNT(*) FROM sqlite_temp_master").fetchone() == (0,)
+
+    def test_chunked(self, connection, make_jsonsql):
+        jsonsql = make_jsonsql(in_list_strategy="chunked", in_list_threshold=100)
+        ids = list(range(0, 1500, 2)) + [4, 4]
+        valid, plan = jsonsql.sql_plan(request(ids))
+        assert len(plan.statements) == 8
+        assert all(len(statement.params) <= 101 for statement in plan.statements)
+        assert run(plan, connection) == list(range(0, 1000, 2))
+
+    def test_chunked_needs_plain_filter(self, make_jsonsql):
+        jsonsql = make_jsonsql(in_list_strategy="chunked", in_list_threshold=100)
+        ids = list(range(500))
+        for extra in ({"limit": 10}, {"order_by": ["id"]}, {"items": ["COUNT(*)"]}):
+            valid, plan = jsonsql.sql_plan(request(ids, **extra))
+            assert plan.single
+            assert "json_each" in plan.statements[0].sql
+
+        or_request = request(ids)
+        or_request["where"] = {"OR": [{"id": {"IN": ids}}, {"name": {"=": "x"}}]}
+        assert jsonsql.sql_plan(or_request)[1].single
+
+    def test_auto_by_size(self, connection, make_jsonsql):
+        jsonsql = make_jsonsql(in_list_strategy="auto", in_list_threshold=10)
+        assert jsonsql.sql_plan(request(list(range(5))))[1].statements[0].params[:5] == \
+            (0, 1, 2, 3, 4)
+        assert "json_each" in jsonsql.sql_plan(request(list(range(100))))[1].statements[0].sql
+        valid, plan = jsonsql.sql_plan(request(list(range(50000))))
+        assert len(plan.setup) == 2
+        assert run(plan, connection) == list(range(1000))
+
+    def test_auto_without_json_or_temp_tables_chunks(self, make_jsonsql):
+        jsonsql = make_jsonsql(dialect="oracle", in_list_strategy="auto",
+                               in_list_threshold=10)
+        valid, plan = jsonsql.sql_plan(request(list(range(25))))
+        assert len(plan.statements) == 3
+        assert plan.statements[2].params == {"p1": 20, "p2": 21, "p3": 22, "p4": 23,
+                                             "p5": 24, "p6": "nobody"}
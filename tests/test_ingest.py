@@ -0,0 +1,115 @@
+import json
+
+import pytest
+
+from src.jsonsql import JsonSQL, Metrics
+from src.jsonsql.ingest import iter_members, load_value
+
+
+@pytest.fixture
+def jsonsql():
+    return JsonSQL(
+        allowed_queries=["SELECT"],
+        allowed_items=["*", "u.name"],
+        allowed_tables=["users", "roles"],
+        allowed_connections=["WHERE"],
+        allowed_columns={"id": int, "name": str},
+        allowed_joins=["INNER JOIN", "LEFT JOIN"],
+    )
+
+
+def body(request):
+    return json.dumps(request).encode()
+
+
+VALID = {"query": "SELECT", "items": ["*"], "from": "users",
+         "where": {"id": {"IN": [1, 2, 3]}, "name": {"=": "a \"}] b"}}}
+
+
+class TestIterMembers:
+    def test_spans(self):
+        data = b' {"a": [1, {"b": "]"}], "c" : "x\\"y", "d":null}\n'
+        members = [(key, load_value(data, start, end)) for key, start, end in iter_members(data)]
+        assert members == [("a", [1, {"b": "]"}]), ("c", 'x"y'), ("d", None)]
+
+    def test_memoryview(self):
+        data = memoryview(bytearray(b'{"k": {"n": [1.5e3, true]}}'))
+        assert [key for key, _, _ in iter_members(data)] == ["k"]
+        assert list(iter_members(memoryview(b"{}"))) == []
+
+    def test_stops_early(self):
+        members = iter_members(b'{"a": 1, "b": [1, 2')
+        assert next(members)[0] == "a"
+        with pytest.raises(ValueError):
+            next(members)
+
+    @pytest.mark.parametrize("data", [
+        b"", b"[]", b'{"a"}', b'{"a": [1}', b'{"a": "x', b'{"a": 1,}', b'{"a": 1} 2', b'{a: 1}',
+    ])
+    def test_invalid(self, data):
+        with pytest.raises(ValueError):
+            list(iter_members(data))
+
+
+class TestSqlParseBytes:
+    @pytest.mark.parametrize("wrap", [bytes, bytearray, memoryview])
+    def test_same_as_sql_parse(self, jsonsql, wrap):
+        assert jsonsql.sql_parse_bytes(wrap(body(VALID))) == jsonsql.sql_parse(VALID)
+        assert jsonsql.sql_parse_bytes(wrap(body(VALID)), with_values=True, with_id=True) == \
+            jsonsql.sql_parse(VALID, with_values=True, with_id=True)
+
+    @pytest.mark.parametrize("request_, message", [
+        ({"query": "DELETE", "items": ["*"], "from": "users"}, "Query not allowed: DELETE"),
+        ({"query": "SELECT", "items": ["*"], "from": {"table": "admins", "alias": "a"}},
+         "Table not allowed: admins"),
+        ({"query": "SELECT", "items": ["*"], "table": "admins"}, "Table not allowed: admins"),
+        ({"query": "SELECT", "items": ["*"], "from": "users",
+          "joins": [{"type": "cross join", "table": "roles"}]},
+         "Error parsing SQL: JOIN type not allowed: CROSS JOIN"),
+        ({"query": "SELECT", "items": ["*"], "from": "users", "joins": [{"table": "admins"}]},
+         "Error parsing SQL: Table not allowed: admins"),
+    ])
+    def test_rejections_match_sql_parse(self, jsonsql, request_, message):
+        assert jsonsql.sql_parse(request_) == (False, message, ())
+        assert jsonsql.sql_parse_bytes(body(request_)) == (False, message, ())
+
+    def test_rejects_before_the_rest_is_read(self, jsonsql):
+        # Reading stops at the rejected member, so the broken rest is never seen
+        data = b'{"from": "admins", "where": {"id": {"IN": [1, 2, nope'
+        assert jsonsql.sql_parse_bytes(data) == (False, "Table not allowed: admins", ())
+        data = b'{"query": "DROP", "items": ["*"], "from": "users", "where": ]'
+        assert jsonsql.sql_parse_bytes(data, with_id=True) == (
+            False, "Query not allowed: DROP", (), None)
+
+    def test_table_ignored_with_from(self, jsonsql):
+        request = {"query": "SELECT", "items": ["*"], "table": "admins", "from": "users"}
+        assert jsonsql.sql_parse_bytes(body(request)) == jsonsql.sql_parse(request)
+        assert jsonsql.sql_parse_bytes(body(request))[0]
+
+    @pytest.mark.parametrize("data", [b'{"query": "SELECT"', b"[1]", b"\xff", b'{"a": 1, "a": 2}'])
+    def test_invalid_json(self, jsonsql, data):
+        result = jsonsql.sql_parse_bytes(data)
+        assert result[0] is False and result[1].startswith("Invalid JSON: ")
+
+    def test_duplicate_keys_differ_from_json_loads(self, jsonsql):
+        # json.loads keeps the last value; sql_parse_bytes rejects the body
+        data = b'{"query": "SELECT", "items": ["*"], "from": "users", "from": "users"}'
+        assert jsonsql.sql_parse(json.loads(data))[0]
+        assert jsonsql.sql_parse_bytes(data) == (False, "Invalid JSON: Duplicate key: from", ())
+
+        data = b'{"query": "SELECT", "items": ["*"], "from": "admins", "from": "users"}'
+        assert jsonsql.sql_parse(json.loads(data))[0]
+        assert jsonsql.sql_parse_bytes(data) == (False, "Table not allowed: admins", ())
+
+        # Nested keys are decoded by json.loads, last value winning
+        data = b'{"query": "SELECT", "items": ["*"], "from": {"table": "admins", "table": "users"}}'
+        assert jsonsql.sql_parse_bytes(data) == jsonsql.sql_parse(json.loads(data))
+        assert jsonsql.sql_parse_bytes(data)[0]
+
+    def test_early_rejections_are_counted(self, jsonsql):
+        jsonsql.metrics = Metrics()
+        jsonsql.sql_parse_bytes(b'{"query": "SELECT", "from": "admins", "items": ["*"]}')
+        jsonsql.sql_parse_bytes(body(VALID))
+        snapshot = jsonsql.metrics.snapshot()
+        assert snapshot["jsonsql_requests_total"] == {("sql_parse", "SELECT"): 2}
+        assert snapshot["jsonsql_rejections_total"] == {("sql_parse", "table"): 1}
@@ -0,0 +1,123 @@
+import pytest
+
+from src.jsonsql import Instrumentation, JsonSQL, PhaseCollector
+from src.jsonsql.instrument import LatencyHistogram, request_shape
+
+
+class Recorder(Instrumentation):
+    def __init__(self):
+        self.events = []
+
+    def span_start(self, span):
+        self.events.append(("start", span.name))
+
+    def phase(self, span, name, seconds):
+        assert seconds >= 0
+        self.events.append(("phase", name))
+
+    def span_end(self, span):
+        assert span.duration >= sum(seconds for _, seconds in span.phases)
+        self.events.append(("end", span.attributes["valid"], span.attributes.get("cached")))
+
+
+@pytest.fixture
+def recorder():
+    return Recorder()
+
+
+@pytest.fixture
+def jsonsql(recorder):
+    return JsonSQL(
+        allowed_queries=["SELECT"],
+        allowed_items=["u.name"],
+        allowed_tables=["users", "roles"],
+        allowed_connections=["WHERE"],
+        allowed_columns={"id": int, "u.id": int, "r.id": int, "u.role_id": int},
+        instrumentation=recorder,
+    )
+
+
+JOINED = {"query": "SELECT", "items": ["u.name"], "from": {"table": "users", "alias": "u"},
+          "joins": [{"table": "roles", "alias": "r", "on": "u.role_id = r.id"}],
+          "where": {"u.id": {"=": 1}}, "order_by": ["u.name"], "limit": 5}
+
+
+def phases(events):
+    return [event[1] for event in events if event[0] == "phase"]
+
+
+class TestSpans:
+    def test_sql_parse_phases(self, jsonsql, recorder):
+        jsonsql.sql_parse(JOINED)
+        assert recorder.events[0] == ("start", "sql_parse")
+        assert phases(recorder.events) == [
+            "template", "items", "tables", "joins", "where", "clauses", "render", "bind"]
+        assert recorder.events[-1] == ("end", True, False)
+
+    def test_cache_hit(self, jsonsql, recorder):
+        jsonsql.sql_parse(JOINED)
+        recorder.events.clear()
+        jsonsql.sql_parse(JOINED, with_values=True)
+        assert phases(recorder.events) == ["template", "with_values"]
+        assert recorder.events[-1] == ("end", True, True)
+
+    def test_legacy_and_rejected(self, jsonsql, recorder):
+        jsonsql.sql_parse({"query": "SELECT", "items": ["u.name"], "table": "users",
+                           "connection": "WHERE", "logic": {"id": {"=": 1}}})
+        assert phases(recorder.events) == ["template", "items", "tables", "where", "render",
+                                           "bind"]
+        recorder.events.clear()
+        jsonsql.sql_parse({**JOINED, "from": "admins"})
+        assert phases(recorder.events) == ["template", "items"]
+        assert recorder.events[-1] == ("end", False, False)
+
+    def test_logic_parse(self, jsonsql, recorder):
+        for _ in range(2):
+            jsonsql.logic_parse({"id": {"=": 1}})
+        assert phases(recorder.events) == ["template", "logic", "render", "bind",
+                                           "template", "bind"]
+
+    def test_sql_parse_many(self, jsonsql, recorder):
+        list(jsonsql.sql_parse_many([JOINED, JOINED], group_size=2))
+        assert [event for event in recorder.events if event[0] == "end"] == [
+            ("end", True, False), ("end", True, True)]
+
+    def test_results_unchanged(self, jsonsql):
+        expected = JsonSQL(allowed_queries=["SELECT"], allowed_items=["u.name"],
+                           allowed_tables=["users", "roles"], allowed_connections=["WHERE"],
+                           allowed_columns=jsonsql.ALLOWED_COLUMNS)
+        assert expected.instrumentation is None
+        for with_values in (False, True):
+            assert jsonsql.sql_parse(JOINED, with_values, with_id=True) == expected.sql_parse(
+                JOINED, with_values, with_id=True)
+
+    def test_request_shape(self):
+        assert request_shape("sql_parse", JOINED) == {
+            "query": "SELECT", "items": 1, "joins": 1, "format": "extended",
+            "clauses": ("where", "order_by", "limit")}
+        assert request_shape("logic_parse", {"a": 1, "b": 2}) == {"columns": 2}
+        assert request_shape("sql_parse", []) == {"type": "list"}
+
+
+class TestPhaseCollector:
+    def test_aggregates(self, jsonsql):
+        collector = jsonsql.instrumentation = PhaseCollector()
+        for value in range(5):
+            jsonsql.sql_parse({**JOINED, "where": {"u.id": {"=": value}}})
+        jsonsql.sql_parse({**JOINED, "from": "admins"})
+        stats = collector.stats()["sql_parse"]
+        assert (stats["valid"], stats["invalid"], stats["cached"]) == (5, 1, 4)
+        assert stats["phases"]["total"]["count"] == 6
+        assert stats["phases"]["joins"]["count"] == 1
+        assert stats["phases"]["template"]["count"] == 6
+        table = collector.format()
+        assert table.splitlines()[1].split()[:2] == ["sql_parse", "template"]
+        assert table.splitlines()[-1].split()[1] == "total"
+        collector.reset()
+        assert collector.stats() == {}
+
+
+def test_histogram_sub_microsecond():
+    histogram = LatencyHistogram()
+    histogram.add(150e-9)
+    assert histogram.to_dict()["buckets"] == {"<=0.2us": 1}
@@ -0,0 +1,122 @@
+import pytest
+
+from src.jsonsql import JsonSQL
+from src.jsonsql.ir import (Between, BoolOp, ColumnRef, Compare, InList, Select,
+                            TableRef, Value)
+
+
+@pytest.fixture
+def jsonsql() -> JsonSQL:
+    return JsonSQL(
+        allowed_queries=["SELECT"],
+        allowed_items=["*", "u.name", "COUNT(*)"],
+        allowed_tables=["users", "roles"],
+        allowed_connections=["WHERE"],
+        allowed_columns={"id": int, "name": str, "age": int, "u.id": int, "role_id": int,
+                         "COUNT(*)": int},
+    )
+
+
+EXTENDED = {
+    "query": "SELECT",
+    "items": ["u.name", "COUNT(*)"],
+    "from": {"table": "users", "alias": "u"},
+    "joins": [{"type": "left join", "table": "roles", "alias": "r",
+               "on": "u.role_id = r.id"}],
+    "where": {"OR": [{"u.id": {"IN": [1, 2, 3]}}, {"age": {"BETWEEN": [18, 30]}}]},
+    "group_by": ["u.name"],
+    "having": {"COUNT(*)": {">": 1}},
+    "order_by": [{"column": "u.name", "direction": "desc"}, "age"],
+    "limit": 10,
+    "offset": 20,
+}
+
+
+class TestNodes:
+    def test_equal_nodes_hash_equal(self):
+        first = Compare("id", "=", Value(1))
+        second = Compare("id", "=", Value(1))
+        assert first == second
+        assert hash(first) == hash(second)
+        assert len({first, second, Compare("id", "=", Value(2))}) == 2
+
+    def test_type_is_part_of_identity(self):
+        assert Compare("id", "=", Value("name")) != Compare("id", "=", ColumnRef("name"))
+        assert Value(1) != Value(True)
+
+    def test_immutable(self):
+        node = InList("id", [1, 2])
+        assert node.values == (1, 2)
+        with pytest.raises(AttributeError):
+            node.column = "name"
+        with pytest.raises(AttributeError):
+            node.extra = 1
+
+    def test_unhashable_literal(self):
+        node = Compare("id", "=", Value([1, 2]))
+        with pytest.raises(TypeError):
+            hash(node)
+        assert node == Compare("id", "=", Value([1, 2]))
+
+    def test_deep_tree(self):
+        def chain(depth):
+            node = Between("age", 1, 2)
+            for level in range(depth):
+                node = BoolOp("OR" if level % 2 else "AND", [Compare("id", ">", Value(level)), node])
+            return node
+
+        first, second = chain(5000), chain(5000)
+        assert first == second
+        assert hash(first) == hash(second)
+
+    def test_hash_is_computed_on_first_use(self):
+        inner = Compare("id", "=", Value(1))
+        node = BoolOp("AND", [inner, InList("id", [1, 2])])
+        assert not hasattr(inner, "_hash")
+        assert hash(node) == hash(BoolOp("AND", [Compare("id", "=", Value(1)),
+                                                 InList("id", [1, 2])]))
+        assert hash(inner) == inner._hash
+
+
+class TestCompile:
+    def test_logic_compile(self, jsonsql: JsonSQL):
+        valid, node = jsonsql.logic_compile({"id": {">": 1}, "name": {"=": "age"}})
+        assert valid
+        assert node == BoolOp("AND", [Compare("id", ">", Value(1)),
+                                      Compare("name", "=", ColumnRef("age"))],
+                              implicit=True)
+        assert jsonsql.render(node) == ("id > ? AND name = age", (1,))
+
+    def test_logic_compile_failure(self, jsonsql: JsonSQL):
+        assert jsonsql.logic_compile({"id": {"=": "x"}}) == (False, "Bad id, non <class 'int'>")
+
+    def test_sql_compile_legacy(self, jsonsql: JsonSQL):
+        valid, select = jsonsql.sql_compile({
+            "query": "SELECT", "items": ["*"], "table": "users",
+            "connection": "WHERE", "logic": {"name": {"=": "age"}},
+        })
+        assert valid
+        # WHERE/HAVING values are always bound, never column references
+        assert select == Select("SELECT", ["*"], TableRef("users"),
+                                where=Compare("name", "=", Value("age")))
+
+    def test_render_matches_sql_parse(self, jsonsql: JsonSQL):
+        valid, select = jsonsql.sql_compile(EXTENDED)
+        assert valid
+        assert select.joins[0].join_type == "LEFT JOIN"
+        assert jsonsql.render(select) == jsonsql.sql_parse(EXTENDED)[1:]
+
+    def test_render_many_times(self, jsonsql: JsonSQL):
+        _, select = jsonsql.sql_compile(EXTENDED)
+        assert jsonsql.render(select) == jsonsql.render(select)
+        assert jsonsql.sql_compile(EXTENDED)[1] == select
+
+    def test_sql_compile_failure(self, jsonsql: JsonSQL):
+        assert jsonsql.sql_compile({"query": "DROP", "items": ["*"]}) == \
+            (False, "Query not allowed: DROP")
+        assert jsonsql.sql_compile({**EXTENDED, "items": [1]})[0] is False
+
+    def test_renderer_follows_padding(self, jsonsql: JsonSQL):
+        _, node = jsonsql.logic_compile({"id": {"IN": [1, 2, 3]}})
+        jsonsql.in_list_padding = "null"
+        assert jsonsql.render(node) == ("id IN (?,?,?,?)", (1, 2, 3, None))
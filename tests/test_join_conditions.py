@@ -0,0 +1,117 @@
+import pytest
+
+from src.jsonsql import JsonSQL
+from src.jsonsql.joins import parse_join_condition
+
+
+@pytest.fixture
+def jsonsql():
+    return JsonSQL(
+        allowed_queries=["SELECT"],
+        allowed_items=["*"],
+        allowed_tables=["users", "roles", "wst.users"],
+        allowed_columns={"id": int, "role_id": int, "status": str, "u.level": int},
+        not_allowed_columns=["password"],
+        allowed_joins=["INNER JOIN"],
+    )
+
+
+def request(on, table="users", alias="u"):
+    source = {"table": table, "alias": alias} if alias else table
+    return {
+        "query": "SELECT",
+        "items": ["*"],
+        "from": source,
+        "joins": [{"type": "INNER JOIN", "table": "roles", "alias": "r", "on": on}],
+    }
+
+
+class TestParser:
+    def test_columns_in_order(self):
+        assert parse_join_condition("u.role_id = r.id") == (("u", "role_id"), ("r", "id"))
+
+    def test_schema_qualifier(self):
+        assert parse_join_condition("wst.users.id=r.id") == (("wst.users", "id"), ("r", "id"))
+
+    @pytest.mark.parametrize("condition", [
+        "u.id = r.id AND u.status = 'active'",
+        "u.id = r.id and (u.level >= 3 or r.id <> 0)",
+        "((u.id = r.id))",
+        "u.name = 'O''Brien'",
+        "'x' != u.name",
+        "u.level < -1.5",
+    ])
+    def test_accepts(self, condition):
+        assert parse_join_condition(condition) is not None
+
+    @pytest.mark.parametrize("condition", [
+        "",
+        "u.id",
+        "u.id =",
+        "id = r.id",
+        "u.id = r.id AND",
+        "u.id = r.id OR 1 = 1",
+        "'a' = 'a'",
+        "u.id = r.id; DROP TABLE users; --",
+        "u.id = r.id -- comment",
+        "u.id = r.id /* comment */",
+        "u.id = LOWER(r.id)",
+        "u.id = (SELECT r.id)",
+        "(u.id = r.id",
+        "u.id = r.id)",
+        "u.id = r.id r.id",
+        "u.name = 'unterminated",
+        "u.id IN (r.id)",
+        "NOT u.id = r.id",
+    ])
+    def test_rejects(self, condition):
+        assert parse_join_condition(condition) is None
+
+    def test_long_condition(self):
+        condition = " AND ".join(f"u.c{i} = r.c{i}" for i in range(5000))
+        assert len(parse_join_condition(condition)) == 10000
+
+
+class TestValidation:
+    def test_declared_aliases(self, jsonsql):
+        result, sql, _ = jsonsql.sql_parse(request("u.role_id = r.id"))
+        assert result
+        assert sql.endswith("INNER JOIN roles AS r ON u.role_id = r.id")
+
+    def test_undeclared_alias(self, jsonsql):
+        result, msg, _ = jsonsql.sql_parse(request("u.role_id = x.id"))
+        assert not result
+        assert "Invalid JOIN condition" in msg
+
+    def test_alias_of_later_join(self, jsonsql):
+        data = request("u.role_id = r.id")
+        data["joins"].insert(0, {"type": "INNER JOIN", "table": "roles", "alias": "q",
+                                 "on": "q.id = r.id"})
+        result, msg, _ = jsonsql.sql_parse(data)
+        assert not result
+
+    def test_unaliased_table_names(self, jsonsql):
+        assert jsonsql.sql_parse(request("users.role_id = r.id", alias=None))[0]
+        assert jsonsql.sql_parse(request("wst.users.role_id = r.id", "wst.users", None))[0]
+        assert jsonsql.sql_parse(request("users.role_id = r.id", "wst.users", None))[0]
+
+    def test_aliased_table_name_not_declared(self, jsonsql):
+        assert not jsonsql.sql_parse(request("users.role_id = r.id"))[0]
+
+    def test_column_not_allowed(self, jsonsql):
+        assert not jsonsql.sql_parse(request("u.group_id = r.id"))[0]
+
+    def test_qualified_column_allowed(self, jsonsql):
+        assert jsonsql.sql_parse(request("u.id = r.id AND u.level > 2"))[0]
+        assert not jsonsql.sql_parse(request("u.id = r.id AND r.level > 2"))[0]
+
+    def test_column_denied(self, jsonsql):
+        jsonsql.ALLOWED_COLUMNS = {"*": object}
+        assert jsonsql.sql_parse(request("u.id = r.id AND u.status = 'active'"))[0]
+        assert not jsonsql.sql_parse(request("u.password = r.id"))[0]
+
+    def test_literal_operand(self, jsonsql):
+        result, sql, params = jsonsql.sql_parse(request("u.id = r.id AND u.status = 'active'"))
+        assert result
+        assert sql.endswith("ON u.id = r.id AND u.status = 'active'")
+        assert params == ()
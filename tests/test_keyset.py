@@ -0,0 +1,163 @@
+import sqlite3
+
+import pytest
+
+from src.jsonsql import ConnectionPool, JsonSQL
+from src.jsonsql.paging import decode_token, encode_token
+
+
+@pytest.fixture
+def jsonsql():
+    return JsonSQL(
+        allowed_queries=["SELECT"],
+        allowed_items=["*", "id", "name", "u.id"],
+        allowed_tables=["users"],
+        allowed_columns={"id": int, "name": str, "score": float, "u.id": int},
+    )
+
+
+@pytest.fixture
+def pool(tmp_path):
+    path = str(tmp_path / "users.db")
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT, score REAL)")
+    connection.executemany("INSERT INTO users VALUES (?, ?, ?)",
+                           [(i, f"user{i % 7}", (i * 37) % 11 / 2) for i in range(1, 101)])
+    connection.commit()
+    connection.close()
+    with ConnectionPool(path) as pool:
+        yield pool
+
+
+def request(order_by, after=None, **extra):
+    data = {"query": "SELECT", "items": ["*"], "from": "users", "order_by": order_by,
+            "limit": 10, **extra}
+    if after is not None:
+        data["after"] = after
+    return data
+
+
+class TestRendering:
+    def test_single_column(self, jsonsql):
+        assert jsonsql.sql_parse(request(["id"], {"id": 5})) == (
+            True, "SELECT * FROM users WHERE id > ? ORDER BY id LIMIT 10", (5,))
+
+    def test_descending(self, jsonsql):
+        result = jsonsql.sql_parse(request([{"column": "id", "direction": "desc"}], {"id": 5}))
+        assert result[1] == "SELECT * FROM users WHERE id < ? ORDER BY id DESC LIMIT 10"
+
+    def test_row_value(self, jsonsql):
+        result = jsonsql.sql_parse(request(["name", "id"], {"name": "b", "id": 5}))
+        assert result == (True, "SELECT * FROM users WHERE (name,id) > (?,?) "
+                                "ORDER BY name,id LIMIT 10", ("b", 5))
+
+    def test_mixed_directions(self, jsonsql):
+        order = [{"column": "name", "direction": "DESC"}, {"column": "id", "direction": "ASC"}]
+        result = jsonsql.sql_parse(request(order, {"id": 5, "name": "b"}))
+        assert result == (True, "SELECT * FROM users WHERE (name < ? OR (name = ? AND id > ?)) "
+                                "ORDER BY name DESC,id ASC LIMIT 10", ("b", "b", 5))
+
+    def test_no_row_values_dialect(self, jsonsql):
+        jsonsql.dialect = "mssql"
+        result = jsonsql.sql_parse(request(["name", "id"], {"name": "b", "id": 5}))
+        assert "WHERE (name > ? OR (name = ? AND id > ?)) ORDER BY name,id" in result[1]
+
+    def test_anded_with_where(self, jsonsql):
+        where = {"OR": [{"id": {"<": 3}}, {"id": {">": 8}}]}
+        result = jsonsql.sql_parse(request(["id"], {"id": 1}, where=where))
+        assert result[1].startswith("SELECT * FROM users WHERE (id < ? OR id > ?) AND id > ?")
+        assert result[2] == (3, 8, 1)
+
+    def test_cached(self, jsonsql):
+        for value in range(3):
+            result = jsonsql.sql_parse(request(["name", "id"], {"name": "b", "id": value}))
+            assert result[2] == ("b", value)
+        assert jsonsql.template_cache.stats()["hits"] == 2
+
+
+class TestValidation:
+    @pytest.mark.parametrize("data, message", [
+        (request([], {"id": 1}), "requires order_by"),
+        (request(["id DESC"], {"id": 1}), "requires order_by columns"),
+        (request(["id", "id"], {"id": 1}), "distinct"),
+        (request(["name", "id"], {"id": 1}), "each order_by column"),
+        (request(["id"], {"id": 1, "name": "x"}), "each order_by column"),
+        (request(["id"], {"id": "1"}), "Bad id"),
+        (request(["id"], {"id": None}), "Bad id"),
+        (request(["id"], [1]), "must be an object"),
+        (request(["id"], "garbage"), "Invalid continuation token"),
+        (request(["id"], {"id": 1}, offset=10), "cannot be combined"),
+        (request(["id"], {"id": 1}, group_by=["id"]), "cannot be combined"),
+    ])
+    def test_rejected(self, jsonsql, data, message):
+        result = jsonsql.sql_parse(data)
+        assert not result[0]
+        assert message in result[1]
+
+
+class TestTokens:
+    def test_roundtrip(self):
+        order = (("name", "ASC"), ("id", "DESC"))
+        token = encode_token(order, ["b", 5])
+        assert decode_token(token, order) == ["b", 5]
+        assert "=" not in token
+
+    def test_other_order(self):
+        token = encode_token((("id", "ASC"),), [5])
+        assert decode_token(token, (("id", "DESC"),)) is None
+
+    def test_unencodable(self):
+        with pytest.raises(ValueError):
+            encode_token((("id", "ASC"),), [b"x"])
+
+    def test_continuation_token(self, jsonsql):
+        data = request(["name", "u.id"])
+        token = jsonsql.continuation_token(data, {"name": "b", "id": 5})
+        result = jsonsql.sql_parse(request(["name", "u.id"], token))
+        assert result[1].startswith("SELECT * FROM users WHERE (name,u.id) > (?,?)")
+        assert result[2] == ("b", 5)
+
+    def test_continuation_token_missing_column(self, jsonsql):
+        with pytest.raises(ValueError, match="no value for order_by column: name"):
+            jsonsql.continuation_token(request(["name", "id"]), {"id": 5})
+
+
+class TestPage:
+    @pytest.mark.parametrize("order_by", [
+        ["id"],
+        ["name", "id"],
+        [{"column": "score", "direction": "DESC"}, "id"],
+        [{"column": "name", "direction": "DESC"}, {"column": "id", "direction": "DESC"}],
+    ])
+    def test_pages_match_offset(self, jsonsql, pool, order_by):
+        expected = []
+        for offset in range(0, 100, 10):
+            expected.extend(jsonsql.execute(request(order_by, offset=offset), pool))
+
+        rows, after = [], None
+        while True:
+            page, after = jsonsql.page(request(order_by, after), pool)
+            rows.extend(page)
+            if after is None:
+                break
+        assert rows == expected
+        assert len(rows) == 100
+
+    def test_named_items(self, jsonsql, pool):
+        data = {"query": "SELECT", "items": ["name", "id"], "from": "users",
+                "order_by": ["name", "id"], "limit": 60}
+        first, token = jsonsql.page(data, pool)
+        second, token = jsonsql.page({**data, "after": token}, pool)
+        assert len(first) == 60 and len(second) == 40
+        assert token is None
+        assert first[-1] < second[0]
+
+    def test_requires_limit(self, jsonsql, pool):
+        data = request(["id"])
+        del data["limit"]
+        with pytest.raises(ValueError, match="limit"):
+            jsonsql.page(data, pool)
+
+    def test_requires_order_column(self, jsonsql, pool):
+        with pytest.raises(ValueError, match="requires order_by"):
+            jsonsql.page(request([]), pool)
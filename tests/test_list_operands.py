@@ -0,0 +1,71 @@
+import array
+
+import pytest
+
+from src.jsonsql import JsonSQL
+
+
+@pytest.fixture
+def jsonsql() -> JsonSQL:
+    return JsonSQL(
+        allowed_queries=["SELECT"],
+        allowed_items=["*"],
+        allowed_tables=["users"],
+        allowed_connections=["WHERE"],
+        allowed_columns={"id": int, "name": str, "score": float, "data": object},
+    )
+
+
+class TestListOperands:
+    def test_homogeneous_list(self, jsonsql: JsonSQL):
+        ids = list(range(10000))
+        valid, sql, params = jsonsql.logic_parse({"id": {"IN": ids}})
+        assert valid
+        assert params == tuple(ids)
+
+    def test_one_bad_member(self, jsonsql: JsonSQL):
+        ids = list(range(10000)) + ["x"]
+        assert jsonsql.logic_parse({"id": {"IN": ids}}) == (False, "Bad id, non <class 'int'>")
+
+    def test_bool_is_an_int(self, jsonsql: JsonSQL):
+        assert jsonsql.logic_parse({"id": {"IN": [1, True]}})[0]
+        assert not jsonsql.logic_parse({"score": {"IN": [1.5, 2]}})[0]
+
+    def test_members_are_never_column_references(self, jsonsql: JsonSQL):
+        # "name" is an allowed column, but IN members are bound as values
+        assert jsonsql.logic_parse({"id": {"IN": [1, "name"]}}) == \
+            (False, "Bad id, non <class 'int'>")
+        assert jsonsql.logic_parse({"name": {"IN": ["id", "x"]}}) == \
+            (True, "name IN (?,?)", ("id", "x"))
+
+    def test_cached_shape_keeps_member_types(self, jsonsql: JsonSQL):
+        assert jsonsql.logic_parse({"id": {"IN": [1, 2]}})[0]
+        assert not jsonsql.logic_parse({"id": {"IN": [1, "2"]}})[0]
+        assert jsonsql.logic_parse({"id": {"IN": [3, 4]}}) == (True, "id IN (?,?)", (3, 4))
+
+    @pytest.mark.parametrize("values", [
+        (1, 2, 3),
+        range(1, 4),
+        array.array("q", [1, 2, 3]),
+    ])
+    def test_sequence_types(self, jsonsql: JsonSQL, values):
+        assert jsonsql.logic_parse({"id": {"IN": values}}) == \
+            (True, "id IN (?,?,?)", (1, 2, 3))
+
+    def test_sequence_type_mismatch(self, jsonsql: JsonSQL):
+        assert not jsonsql.logic_parse({"id": {"IN": array.array("d", [1.0])}})[0]
+        assert not jsonsql.logic_parse({"name": {"IN": range(3)}})[0]
+        assert not jsonsql.logic_parse({"id": {"IN": range(0)}})[0]
+        assert not jsonsql.logic_parse({"id": {"IN": {1, 2}}})[0]
+
+    def test_between(self, jsonsql: JsonSQL):
+        assert jsonsql.logic_parse({"id": {"BETWEEN": range(1, 3)}}) == \
+            (True, "id BETWEEN ? AND ?", (1, 2))
+        assert not jsonsql.logic_parse({"id": {"BETWEEN": range(1, 4)}})[0]
+
+    def test_numpy(self, jsonsql: JsonSQL):
+        numpy = pytest.importorskip("numpy")
+        valid, sql, params = jsonsql.logic_parse({"id": {"IN": numpy.arange(3)}})
+        assert (valid, sql, params) == (True, "id IN (?,?,?)", (0, 1, 2))
+        assert all(type(param) is int for param in params)
+        assert not jsonsql.logic_parse({"id": {"IN": numpy.zeros((2, 2))}})[0]
@@ -188,4 +188,28 @@ def test_valid_aggregate_condition_column(jsonsql: JsonSQL):
     result, sql, params = jsonsql.logic_parse(input)
     assert result is True
     assert sql == "col1 = MIN(col2)"
-    assert params == ()
\ No newline at end of file
+    assert params == ()
+
+def test_deep_nesting_beyond_recursion_limit(jsonsql: JsonSQL):
+    import sys
+
+    jsonsql.ALLOWED_COLUMNS = {"col1": int}
+    depth = sys.getrecursionlimit() + 100
+    node = {"AND": [{"col1": {"=": 0}}, {"col1": {"=": 1}}]}
+    for level in range(depth):
+        node = {"OR" if level % 2 else "AND": [{"col1": {">": level}}, node]}
+    result, sql, params = jsonsql.logic_parse(node)
+    assert result is True
+    assert sql.count("(") == depth + 1
+    assert sql.endswith("(col1 = ? AND col1 = ?)" + ")" * depth)
+    assert len(params) == depth + 2
+
+
+def test_first_invalid_case_is_reported(jsonsql: JsonSQL):
+    jsonsql.ALLOWED_COLUMNS = {"col1": int}
+    input = {"AND": [
+        {"col1": {"=": 1}},
+        {"OR": [{"col1": {"=": 2}}, {"col2": {"=": 3}}]},
+        {"col3": {"=": 4}},
+    ]}
+    assert jsonsql.logic_parse(input) == (False, "Invalid Input - col2")
@@ -0,0 +1,156 @@
+import threading
+
+import pytest
+
+from src.jsonsql import Budget, Metrics
+from src.jsonsql.metrics import rejection_reason
+
+
+@pytest.fixture
+def jsonsql(make_jsonsql):
+    return make_jsonsql(metrics=Metrics())
+
+
+def select(where, table="users", query="SELECT"):
+    return {"query": query, "items": ["*"], "from": table, "where": where}
+
+
+NESTED = {"OR": [{"id": {"IN": [1, 2, 3]}},
+                 {"AND": [{"name": {"=": "a"}}, {"id": {"IN": list(range(20))}}]}]}
+
+
+class TestRecording:
+    def test_requests_and_rejections(self, jsonsql):
+        for value in range(3):
+            jsonsql.sql_parse(select({"id": {"=": value}}))
+        jsonsql.sql_parse(select({"id": {"=": 1}}, table="admins"))
+        jsonsql.sql_parse(select({"id": {"=": 1}}, query="drop"))
+        jsonsql.sql_parse(select({"secret": {"=": 1}}))
+        jsonsql.logic_parse({"id": {"~": 1}})
+        snapshot = jsonsql.metrics.snapshot()
+        assert snapshot["jsonsql_requests_total"] == {
+            ("sql_parse", "SELECT"): 5, ("sql_parse", "other"): 1, ("logic_parse", None): 1}
+        assert snapshot["jsonsql_rejections_total"] == {
+            ("sql_parse", "table"): 1, ("sql_parse", "query"): 1, ("sql_parse", "column"): 1,
+            ("logic_parse", "comparator"): 1}
+        assert snapshot["jsonsql_compile_seconds"][("sql_parse",)]["count"] == 6
+
+    @pytest.mark.parametrize("cache_size", [0, 1024])
+    def test_depth_and_in_lists(self, cache_size, make_jsonsql):
+        jsonsql = make_jsonsql(metrics=Metrics(), template_cache_size=cache_size)
+        for _ in range(2):
+            jsonsql.sql_parse(select(NESTED))
+        snapshot = jsonsql.metrics.snapshot()
+        depth = snapshot["jsonsql_logic_depth"][("sql_parse",)]
+        assert (depth["count"], depth["sum"]) == (2, 6)
+        sizes = snapshot["jsonsql_in_list_size"][("sql_parse",)]
+        assert sizes["count"] == 4 and sizes["sum"] == 46
+        assert sizes["buckets"][5] == 2 and sizes["buckets"][50] == 2
+
+    def test_logic_parse_cached(self, jsonsql):
+        for _ in range(3):
+            jsonsql.logic_parse({"id": {"IN": [1, 2]}})
+        snapshot = jsonsql.metrics.snapshot()
+        assert snapshot["jsonsql_in_list_size"][("logic_parse",)]["count"] == 3
+        assert jsonsql.template_cache.stats()["hits"] == 2
+
+    def test_enabling_drops_templates_without_stats(self, jsonsql):
+        jsonsql.metrics = None
+        jsonsql.sql_parse(select({"id": {"IN": [1]}}))
+        jsonsql.metrics = Metrics()
+        jsonsql.sql_parse(select({"id": {"IN": [1]}}))
+        assert jsonsql.metrics.snapshot()["jsonsql_in_list_size"][("sql_parse",)]["count"] == 1
+
+    def test_sql_parse_many_and_results(self, jsonsql, make_jsonsql):
+        plain = make_jsonsql()
+        requests = [select(NESTED), select({"id": {"=": 1}}, table="admins")]
+        assert list(jsonsql.sql_parse_many(requests)) == list(plain.sql_parse_many(requests))
+        assert jsonsql.sql_parse(requests[0], with_values=True) == plain.sql_parse(
+            requests[0], with_values=True)
+        assert sum(jsonsql.metrics.snapshot()["jsonsql_requests_total"].values()) == 3
+
+    def test_threads(self, jsonsql):
+        def work():
+            for value in range(500):
+                jsonsql.sql_parse(select({"id": {"=": value}}))
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # The shards of ended threads are folded into one on the next read
+        assert jsonsql.metrics.snapshot()["jsonsql_requests_total"] == {
+            ("sql_parse", "SELECT"): 2000}
+        assert jsonsql.metrics._shards == []
+
+    def test_short_lived_threads(self, jsonsql):
+        jsonsql.sql_parse(select({"id": {"=": 0}}))
+        for value in range(50):
+            thread = threading.Thread(target=jsonsql.sql_parse, args=(select({"id": {"=": value}}),))
+            thread.start()
+            thread.join()
+        # Only this thread and the last one hold a shard
+        assert len(jsonsql.metrics._shards) == 2
+        assert jsonsql.metrics.snapshot()["jsonsql_requests_total"] == {
+            ("sql_parse", "SELECT"): 51}
+        jsonsql.metrics.reset()
+        assert jsonsql.metrics.snapshot()["jsonsql_requests_total"] == {}
+
+    def test_reset(self, jsonsql):
+        jsonsql.sql_parse(select({"id": {"=": 1}}))
+        jsonsql.metrics.reset()
+        assert jsonsql.metrics.snapshot()["jsonsql_requests_total"] == {}
+
+
+class TestRender:
+    def test_prometheus_text(self, jsonsql):
+        jsonsql.sql_parse(select({"id": {"IN": [1, 2, 3]}}))
+        jsonsql.sql_parse(select({"id": {"=": 1}}, table="admins"))
+        text = jsonsql.metrics.render()
+        lines = text.splitlines()
+        assert "# TYPE jsonsql_requests_total counter" in lines
+        assert 'jsonsql_requests_total{method="sql_parse",query="SELECT"} 2' in lines
+        assert 'jsonsql_rejections_total{method="sql_parse",reason="table"} 1' in lines
+        assert "# TYPE jsonsql_compile_seconds histogram" in lines
+        assert 'jsonsql_compile_seconds_bucket{method="sql_parse",le="+Inf"} 2' in lines
+        assert 'jsonsql_compile_seconds_count{method="sql_parse"} 2' in lines
+        assert 'jsonsql_in_list_size_bucket{method="sql_parse",le="2"} 0' in lines
+        assert 'jsonsql_in_list_size_bucket{method="sql_parse",le="5"} 1' in lines
+        assert 'jsonsql_in_list_size_sum{method="sql_parse"} 3' in lines
+        assert text.endswith("\n")
+
+    def test_buckets_cumulative(self, jsonsql):
+        for _ in range(3):
+            jsonsql.logic_parse({"id": {"=": 1}})
+        counts = [int(line.rsplit(" ", 1)[1]) for line in jsonsql.metrics.render().splitlines()
+                  if line.startswith("jsonsql_compile_seconds_bucket")]
+        assert counts == sorted(counts) and counts[-1] == 3
+
+
+@pytest.mark.parametrize("message, reason", [
+    ("Query not allowed: DROP", "query"),
+    ("Item not allowed: secret", "item"),
+    ("Table not allowed: admins", "table"),
+    ("Error parsing SQL: JOIN type not allowed: CROSS JOIN", "join"),
+    ("Error parsing SQL: Invalid JOIN condition: 1 = 1", "join"),
+    ("Invalid Input - secret", "column"),
+    ("Non Valid comparitor - ~", "comparator"),
+    ("Bad id, non <class 'int'>", "value"),
+    ("Bad OR, non list", "logic"),
+    ("Missing required field: query", "missing_field"),
+    ("Invalid JSON: Duplicate key: from", "json"),
+    ("no such column: u.secret", "column"),
+    ("Something else", "other"),
+])
+def test_rejection_reason(message, reason):
+    assert rejection_reason(message) == reason
+
+
+def test_stats_with_budget(jsonsql):
+    # Stats come from the tracker the budget also uses
+    jsonsql.budget = Budget(max_depth=8)
+    jsonsql.sql_parse(select(NESTED))
+    depth = jsonsql.metrics.snapshot()["jsonsql_logic_depth"][("sql_parse",)]
+    assert (depth["count"], depth["sum"]) == (1, 3)
+
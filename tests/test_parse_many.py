@@ -0,0 +1,75 @@
+import itertools
+
+import pytest
+
+from src.jsonsql import JsonSQL
+
+
+@pytest.fixture
+def jsonsql() -> JsonSQL:
+    return JsonSQL(
+        allowed_queries=["SELECT"],
+        allowed_items=["*"],
+        allowed_tables=["users"],
+        allowed_connections=["WHERE"],
+        allowed_columns={"id": int, "name": str},
+    )
+
+
+def request(logic: dict, table: str = "users") -> dict:
+    return {
+        "query": "SELECT",
+        "items": ["*"],
+        "table": table,
+        "connection": "WHERE",
+        "logic": logic,
+    }
+
+
+def test_matches_sql_parse(jsonsql: JsonSQL):
+    requests = [
+        request({"id": {"=": 1}}),
+        request({"name": {"=": "a"}}, table="admins"),
+        request({"id": {"IN": [1, 2]}}),
+    ]
+    assert list(jsonsql.sql_parse_many(requests)) == [
+        jsonsql.sql_parse(r) for r in requests]
+
+
+def test_with_values(jsonsql: JsonSQL):
+    results = list(jsonsql.sql_parse_many(
+        [request({"id": {"=": 7}})], with_values=True))
+    assert results == [(True, "SELECT * FROM users WHERE id = 7", ())]
+
+
+def test_lazy(jsonsql: JsonSQL):
+    requests = (request({"id": {"=": i}}) for i in itertools.count())
+    results = jsonsql.sql_parse_many(requests)
+    assert next(results) == (True, "SELECT * FROM users WHERE id = ?", (0,))
+    assert next(results)[2] == (1,)
+    assert jsonsql.template_cache.hits == 1
+
+
+def test_grouped(jsonsql: JsonSQL):
+    requests = [
+        request({"id": {"=": 1}}),
+        request({"name": {"=": "a"}}),
+        request({"id": {"=": 2}}, table="admins"),
+        request({"id": {"=": 3}}),
+        request({"name": {"=": "b"}}),
+    ]
+    groups = list(jsonsql.sql_parse_many(requests, group_size=3))
+    assert groups == [
+        (True, "SELECT * FROM users WHERE id = ?", [(1,)], [0]),
+        (True, "SELECT * FROM users WHERE name = ?", [("a",)], [1]),
+        (False, "Table not allowed: admins", [], [2]),
+        (True, "SELECT * FROM users WHERE id = ?", [(3,)], [3]),
+        (True, "SELECT * FROM users WHERE name = ?", [("b",)], [4]),
+    ]
+
+    groups = list(jsonsql.sql_parse_many(requests, group_size=100))
+    assert groups == [
+        (True, "SELECT * FROM users WHERE id = ?", [(1,), (3,)], [0, 3]),
+        (True, "SELECT * FROM users WHERE name = ?", [("a",), ("b",)], [1, 4]),
+        (False, "Table not allowed: admins", [], [2]),
+    ]
@@ -0,0 +1,113 @@
+import pytest
+
+from src.jsonsql import JsonSQL
+from src.jsonsql.policy import EntityRule, PolicyIndex
+
+
+@pytest.fixture
+def jsonsql() -> JsonSQL:
+    return JsonSQL(
+        allowed_queries=["SELECT"],
+        allowed_items=["*"],
+        allowed_tables=["users", {"images": ["userID"]}],
+        allowed_connections=["WHERE"],
+        allowed_columns={"*": object, "id": int},
+        not_allowed_items=["password"],
+        not_allowed_columns=["secret"],
+    )
+
+
+class TestEntityRule:
+    def test_strict_mode(self):
+        rule = EntityRule([], [])
+        assert rule.allows("anything") is False
+
+    def test_wildcard(self):
+        rule = EntityRule(["*"], ["blocked"])
+        assert rule.wildcard is True
+        assert rule.allows("anything") is True
+        assert rule.allows("blocked") is False
+
+    def test_explicit(self):
+        rule = EntityRule(["a", "b"], ["b"])
+        assert rule.allows("a") is True
+        assert rule.allows("b") is False
+        assert rule.allows("c") is False
+
+    def test_unhashable_entity_denied(self):
+        rule = EntityRule(["*"], [])
+        assert rule.allows(["a"]) is False
+
+    def test_immutable(self):
+        rule = EntityRule(["a"], [])
+        with pytest.raises(AttributeError):
+            rule.wildcard = True
+
+
+class TestPolicyIndex:
+    def test_built_at_construction(self, jsonsql: JsonSQL):
+        policy = jsonsql.policy
+        assert isinstance(policy, PolicyIndex)
+        assert policy.tables.allowed == frozenset({"users", "images"})
+        assert policy.columns.wildcard is True
+        assert policy.explicit_columns == frozenset({"id"})
+        assert policy.column_type("id") is int
+        assert policy.column_type("other") is object
+
+    def test_immutable(self, jsonsql: JsonSQL):
+        with pytest.raises(AttributeError):
+            jsonsql.policy.tables = None
+        with pytest.raises(TypeError):
+            jsonsql.policy.column_types["id"] = str
+
+    def test_reassignment_rebuilds_index(self, jsonsql: JsonSQL):
+        before = jsonsql.policy
+        jsonsql.ALLOWED_TABLES = {"orders": []}
+        after = jsonsql.policy
+        assert after is not before
+        assert after.tables.allows("orders") is True
+        assert after.tables.allows("users") is False
+
+    def test_policy_attributes_read_only(self):
+        items, columns = ["id"], {"id": int}
+        jsonsql = JsonSQL(allowed_queries=["SELECT"], allowed_items=items,
+                          allowed_tables=[{"users": ["id"]}], allowed_columns=columns)
+        # The caller's lists are copied
+        items.append("secret")
+        columns["secret"] = str
+        assert jsonsql.ALLOWED_ITEMS == ("id",)
+        assert not jsonsql.policy.items.allows("secret")
+
+        with pytest.raises(AttributeError):
+            jsonsql.ALLOWED_ITEMS.append("secret")
+        with pytest.raises(TypeError):
+            jsonsql.ALLOWED_COLUMNS["secret"] = str
+        with pytest.raises(TypeError):
+            jsonsql.ALLOWED_TABLES["admins"] = [None]
+        with pytest.raises(AttributeError):
+            jsonsql.ALLOWED_TABLES["users"].append("secret")
+
+        jsonsql.ALLOWED_ITEMS = ["id", "name"]
+        assert jsonsql.ALLOWED_ITEMS == ("id", "name")
+        assert jsonsql.policy.items.allows("name")
+
+    def test_index_reused_between_calls(self, jsonsql: JsonSQL):
+        assert jsonsql.policy is jsonsql.policy
+
+    def test_validators_use_index(self, jsonsql: JsonSQL):
+        assert jsonsql._is_table_allowed("users") is True
+        assert jsonsql._is_table_allowed("admins") is False
+        assert jsonsql._is_column_allowed("secret") is False
+        assert jsonsql.is_another_column("id") is True
+        assert jsonsql.is_another_column("secret") is False
+
+        result, msg, params = jsonsql.sql_parse(
+            {"query": "SELECT", "items": ["password"], "table": "users"})
+        assert result is False
+        assert msg == "Item not allowed: password"
+
+    def test_unhashable_query_rejected(self, jsonsql: JsonSQL):
+        result, msg, params = jsonsql.sql_parse(
+            {"query": ["SELECT"], "items": ["*"], "table": "users"})
+        assert result is False
+        assert "Query not allowed" in msg
@@ -0,0 +1,192 @@
+import sqlite3
+import threading
+
+import pytest
+
+from src.jsonsql import JsonSQL
+from src.jsonsql.plan import Plan, Statement
+from src.jsonsql.pool import PROFILES, ConnectionPool, PoolProfile, _uri
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = str(tmp_path / "users.db")
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE users (id INTEGER, name TEXT)")
+    connection.executemany("INSERT INTO users VALUES (?, ?)",
+                           [(i, f"user{i}") for i in range(1000)])
+    connection.commit()
+    connection.close()
+    return path
+
+
+@pytest.fixture
+def jsonsql():
+    return JsonSQL(
+        allowed_queries=["SELECT"],
+        allowed_items=["*", "name"],
+        allowed_tables=["users"],
+        allowed_columns={"id": int, "name": str},
+    )
+
+
+REQUEST = {"query": "SELECT", "items": ["*"], "from": "users",
+           "where": {"id": {"<": 10}}, "order_by": ["id"]}
+
+
+class CountingConnection:
+    """Wraps a connection and records the size of every fetchmany call."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.fetches = []
+
+    def cursor(self):
+        outer = self
+        cursor = self.connection.cursor()
+
+        class Cursor:
+            def execute(self, sql, params=()):
+                cursor.execute(sql, params)
+
+            def fetchmany(self, size):
+                rows = cursor.fetchmany(size)
+                outer.fetches.append(len(rows))
+                return rows
+
+            def close(self):
+                cursor.close()
+
+        return Cursor()
+
+
+class TestExecute:
+    def test_rows(self, jsonsql, database):
+        with ConnectionPool(database) as pool:
+            rows = list(jsonsql.execute(REQUEST, pool))
+        assert rows == [(i, f"user{i}") for i in range(10)]
+
+    def test_lazy(self, jsonsql, database):
+        with ConnectionPool(database, size=1) as pool:
+            rows = jsonsql.execute(REQUEST, pool)
+            assert pool._opened == 0
+            assert next(rows) == (0, "user0")
+            assert pool._idle.qsize() == 0
+            rows.close()
+            assert pool._idle.qsize() == 1
+
+    def test_invalid_request(self, jsonsql, database):
+        with ConnectionPool(database) as pool:
+            with pytest.raises(ValueError, match="Table not allowed"):
+                jsonsql.execute({"query": "SELECT", "items": ["*"], "from": "secrets"}, pool)
+
+    @pytest.mark.parametrize("batch_size", [0, -1, 1.5, True])
+    def test_invalid_batch_size(self, jsonsql, database, batch_size):
+        with ConnectionPool(database) as pool:
+            with pytest.raises(ValueError, match="batch_size"):
+                jsonsql.execute(REQUEST, pool, batch_size)
+
+    def test_fetchmany_batches(self, database):
+        connection = CountingConnection(sqlite3.connect(database))
+        plan = Plan((Statement("SELECT id FROM users"),))
+        assert len(list(plan.execute(connection, batch_size=300))) == 1000
+        assert connection.fetches == [300, 300, 300, 100, 0]
+
+    def test_large_in_list_plan(self, jsonsql, database):
+        jsonsql.in_list_strategy = "temp_table"
+        jsonsql.in_list_threshold = 10
+        request = {"query": "SELECT", "items": ["name"], "from": "users",
+                   "where": {"id": {"IN": list(range(0, 1000, 2))}}}
+        with ConnectionPool(database, read_only=True) as pool:
+            assert len(list(jsonsql.execute(request, pool, batch_size=64))) == 500
+
+
+class TestPool:
+    def test_read_only(self, database):
+        with ConnectionPool(database, read_only=True) as pool:
+            with pool.connection() as connection:
+                with pytest.raises(sqlite3.OperationalError, match="readonly"):
+                    connection.execute("DELETE FROM users")
+
+    def test_wal(self, database):
+        with ConnectionPool(database, wal=True) as pool:
+            with pool.connection() as connection:
+                assert connection.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+
+    def test_profile(self, database):
+        profile = PoolProfile(mmap_size=1 << 20, cache_size=-4096, cached_statements=16)
+        with ConnectionPool(database, profile=profile) as pool:
+            with pool.connection() as connection:
+                assert connection.execute("PRAGMA cache_size").fetchone() == (-4096,)
+
+    @pytest.mark.parametrize("options", [
+        {"size": 0}, {"profile": "fast"}, {"profile": {"mmap_size": 1}},
+    ])
+    def test_invalid_options(self, database, options):
+        with pytest.raises(ValueError):
+            ConnectionPool(database, **options)
+
+    def test_invalid_profile(self):
+        with pytest.raises(ValueError):
+            PoolProfile(mmap_size=-1)
+        with pytest.raises(AttributeError):
+            PROFILES["default"].cache_size = 0
+
+    def test_bounded(self, database):
+        pool = ConnectionPool(database, size=1, timeout=0.01)
+        connection = pool.acquire()
+        with pytest.raises(TimeoutError):
+            pool.acquire()
+        pool.release(connection)
+        assert pool.acquire() is connection
+
+    def test_rolls_back_on_release(self, database):
+        pool = ConnectionPool(database, size=1)
+        with pool.connection() as connection:
+            connection.execute("DELETE FROM users")
+            assert connection.in_transaction
+        with pool.connection() as connection:
+            assert not connection.in_transaction
+            assert connection.execute("SELECT COUNT(*) FROM users").fetchone() == (1000,)
+
+    def test_commits_completed_plan(self, database):
+        pool = ConnectionPool(database, size=1)
+        list(pool.execute(Plan((Statement("DELETE FROM users WHERE id < ?", (10,)),))))
+        with pool.connection() as connection:
+            assert connection.execute("SELECT COUNT(*) FROM users").fetchone() == (990,)
+
+    def test_close(self, database):
+        pool = ConnectionPool(database)
+        connection = pool.acquire()
+        pool.close()
+        pool.release(connection)
+        assert pool._opened == 0
+        with pytest.raises(RuntimeError):
+            pool.acquire()
+
+    def test_threads(self, jsonsql, database):
+        pool = ConnectionPool(database, size=2)
+        counts = []
+
+        def work():
+            for _ in range(20):
+                counts.append(len(list(jsonsql.execute(REQUEST, pool, batch_size=3))))
+
+        threads = [threading.Thread(target=work) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        pool.close()
+        assert counts == [10] * 120
+        assert pool._opened == 0
+
+
+@pytest.mark.parametrize("database, read_only, expected", [
+    ("data.db", False, "file:data.db"),
+    ("data.db", True, "file:data.db?mode=ro"),
+    ("my data?.db", True, "file:my%20data%3F.db?mode=ro"),
+    ("file:data.db?cache=shared", True, "file:data.db?cache=shared&mode=ro"),
+])
+def test_uri(database, read_only, expected):
+    assert _uri(database, read_only) == expected
@@ -0,0 +1,149 @@
+import pytest
+
+from src.jsonsql import JsonSQL
+
+
+@pytest.fixture
+def jsonsql() -> JsonSQL:
+    return JsonSQL(
+        allowed_queries=["SELECT"],
+        allowed_items=["*"],
+        allowed_tables=["users", "roles"],
+        allowed_connections=["WHERE"],
+        allowed_columns={"id": int, "name": str, "u.id": int, "r.name": str,
+                         "COUNT(u.id)": int},
+        not_allowed_columns=["password"],
+    )
+
+
+def extended(**clauses) -> dict:
+    request = {
+        "query": "SELECT",
+        "items": ["*"],
+        "from": {"table": "users", "alias": "u"},
+    }
+    request.update(clauses)
+    return request
+
+
+class TestWhere:
+    def test_nested_and_or(self, jsonsql: JsonSQL):
+        result = jsonsql.sql_parse(extended(where={"OR": [
+            {"u.id": {"=": 1}},
+            {"AND": [{"u.id": {">": 5}}, {"r.name": {"IN": ["a", "b"]}}]},
+        ]}))
+        assert result == (
+            True,
+            "SELECT * FROM users AS u WHERE (u.id = ? OR (u.id > ? AND r.name IN (?,?)))",
+            (1, 5, "a", "b"),
+        )
+
+    def test_implicit_and(self, jsonsql: JsonSQL):
+        result = jsonsql.sql_parse(extended(where={
+            "u.id": {">": 1, "<": 9},
+            "r.name": {"=": "x"},
+        }))
+        assert result == (
+            True,
+            "SELECT * FROM users AS u WHERE u.id > ? AND u.id < ? AND r.name = ?",
+            (1, 9, "x"),
+        )
+
+    def test_implicit_and_nested_is_parenthesized(self, jsonsql: JsonSQL):
+        result = jsonsql.sql_parse(extended(where={"OR": [
+            {"u.id": {">": 1, "<": 9}},
+            {"u.id": {"=": 20}, "r.name": {"=": "x"}},
+        ]}))
+        assert result[1] == (
+            "SELECT * FROM users AS u WHERE "
+            "((u.id > ? AND u.id < ?) OR (u.id = ? AND r.name = ?))")
+
+    def test_column_validation(self, jsonsql: JsonSQL):
+        result = jsonsql.sql_parse(extended(where={"email": {"=": "x"}}))
+        assert result == (False, "Invalid Input - email", ())
+
+        result = jsonsql.sql_parse(extended(where={"password": {"=": "x"}}))
+        assert result == (False, "Invalid Input - password", ())
+
+    def test_type_validation(self, jsonsql: JsonSQL):
+        result = jsonsql.sql_parse(extended(where={"u.id": {"=": "one"}}))
+        assert result == (False, "Bad u.id, non <class 'int'>", ())
+
+    def test_comparator_validation(self, jsonsql: JsonSQL):
+        result = jsonsql.sql_parse(extended(where={"u.id": {"LIKE": 1}}))
+        assert result == (False, "Non Valid comparitor - LIKE", ())
+
+    def test_column_names_are_bound_as_values(self, jsonsql: JsonSQL):
+        result = jsonsql.sql_parse(extended(where={"name": {"=": "id"}}))
+        assert result == (True, "SELECT * FROM users AS u WHERE name = ?", ("id",))
+
+    def test_having_aggregate(self, jsonsql: JsonSQL):
+        result = jsonsql.sql_parse(extended(
+            group_by=["u.id"], having={"COUNT(u.id)": {">": {"MIN": "id"}}}))
+        assert result == (
+            True,
+            "SELECT * FROM users AS u GROUP BY u.id HAVING COUNT(u.id) > MIN(id)",
+            (),
+        )
+
+    @pytest.mark.parametrize("key, value, rendered", [
+        ("COUNT(*)", 1, "COUNT(*)"), ("count( u.id )", 1, "COUNT(u.id)"),
+        ("COUNT(DISTINCT name)", 1, "COUNT(DISTINCT name)"), ("MAX(name)", "x", "MAX(name)"),
+        ("AVG(id)", 1.5, "AVG(id)"),
+    ])
+    def test_having_aggregate_keys(self, key, value, rendered):
+        # An explicit column map, without the aggregate keys themselves
+        jsonsql = JsonSQL(allowed_queries=["SELECT"], allowed_items=["*", "u.name", "COUNT(*)"],
+                          allowed_tables=["users"],
+                          allowed_columns={"u.id": int, "id": int, "name": str, "age": int})
+        request = extended(items=["u.name", "COUNT(*)"], group_by=["u.name"],
+                           having={key: {">": value}})
+        assert jsonsql.sql_parse(request) == (
+            True, f"SELECT u.name,COUNT(*) FROM users AS u GROUP BY u.name "
+                  f"HAVING {rendered} > ?", (value,))
+
+    def test_having_aggregate_key_validation(self, jsonsql: JsonSQL):
+        for key, error in (("COUNT(password)", "Invalid Input - COUNT(password)"),
+                           ("MAX(secret)", "Invalid Input - MAX(secret)"),
+                           ("COUNT(id) OR 1=1", "Invalid Input - COUNT(id) OR 1=1")):
+            assert jsonsql.sql_parse(extended(having={key: {">": 1}})) == (False, error, ())
+        assert jsonsql.sql_parse(extended(having={"COUNT(*)": {">": "x"}})) == (
+            False, "Bad COUNT(*), non <class 'int'>", ())
+
+    def test_having_aggregate_keys_with_table_columns(self):
+        jsonsql = JsonSQL(allowed_queries=["SELECT"], allowed_items=["*"],
+                          allowed_tables=[{"users": {"id": int, "name": str}}, "roles"],
+                          allowed_columns={"id": int})
+        request = extended(items=["u.name"], group_by=["u.name"],
+                           joins=[{"table": "roles", "alias": "r", "on": "u.id = r.id"}])
+        assert jsonsql.sql_parse({**request, "having": {"COUNT(*)": {">": 1}}})[0]
+        assert jsonsql.sql_parse({**request, "having": {"MAX(u.name)": {"=": "x"}}})[0]
+        assert jsonsql.sql_parse({**request, "having": {"MAX(u.name)": {"=": 1}}}) == (
+            False, "Bad MAX(u.name), non <class 'str'>", ())
+        assert jsonsql.sql_parse({**request, "having": {"MAX(u.secret)": {"=": 1}}}) == (
+            False, "Column not allowed: MAX(u.secret)", ())
+
+    def test_malformed_between(self, jsonsql: JsonSQL):
+        result = jsonsql.sql_parse(extended(where={"u.id": {"BETWEEN": [1, 2, 3]}}))
+        assert result == (False, "Bad u.id, non <class 'int'>", ())
+
+    def test_legacy_logic_uses_same_engine(self, jsonsql: JsonSQL):
+        result = jsonsql.sql_parse({
+            "query": "SELECT",
+            "items": ["*"],
+            "table": "users",
+            "connection": "WHERE",
+            "logic": {"AND": [{"id": {"=": 1}}, {"name": {"!=": "x"}}]},
+        })
+        assert result == (
+            True, "SELECT * FROM users WHERE (id = ? AND name <> ?)", (1, "x"))
+
+
+class TestLogicParse:
+    def test_multiple_comparators(self, jsonsql: JsonSQL):
+        result = jsonsql.logic_parse({"id": {">=": 1, "<=": 5}})
+        assert result == (True, "id >= ? AND id <= ?", (1, 5))
+
+    def test_column_reference(self, jsonsql: JsonSQL):
+        assert jsonsql.logic_parse({"name": {"=": "r.name"}}) == (
+            True, "name = r.name", ())
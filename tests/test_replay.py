@@ -0,0 +1,234 @@
+import array
+import io
+import json
+import sqlite3
+import threading
+
+import pytest
+
+from src.jsonsql import ConnectionPool, JsonSQL, RequestCapture
+from src.jsonsql.capture import read_log
+from src.jsonsql.replay import (LatencyHistogram, format_report, load_requests, main,
+                                replay, report_json, request_tables, synthetic_database)
+
+POLICY = {
+    "allowed_queries": ["SELECT"],
+    "allowed_items": ["*", "u.name", "r.role_name"],
+    "allowed_tables": ["users", "roles"],
+    "allowed_connections": ["WHERE"],
+    "allowed_columns": {"id": "int", "name": "str", "role_id": "int", "u.role_id": "int",
+                        "r.id": "int", "score": "float"},
+}
+COLUMNS = {"id": int, "name": str, "role_id": int, "u.role_id": int, "r.id": int,
+           "score": float}
+
+
+@pytest.fixture
+def jsonsql():
+    return JsonSQL(**{**POLICY, "allowed_columns": COLUMNS})
+
+
+def select(table, value):
+    return {"query": "SELECT", "items": ["*"], "from": table, "where": {"id": {"<": value}}}
+
+
+JOINED = {"query": "SELECT", "items": ["u.name", "r.role_name"],
+          "from": {"table": "users", "alias": "u"},
+          "joins": [{"table": "roles", "alias": "r", "on": "u.role_id = r.id"}]}
+
+
+class TestCapture:
+    def test_records_every_entry_point(self, jsonsql, tmp_path):
+        path = str(tmp_path / "db.sqlite")
+        synthetic_database(path, jsonsql, rows=5)
+        stream = io.BytesIO()
+        jsonsql.capture = RequestCapture(stream)
+        jsonsql.sql_parse(select("users", 1))
+        list(jsonsql.sql_parse_many([select("users", 2), select("admins", 3)]))
+        with jsonsql.capture, ConnectionPool(path) as pool:
+            list(jsonsql.execute(select("users", 4), pool))
+        lines = stream.getvalue().splitlines()
+        assert [json.loads(line)["where"]["id"]["<"] for line in lines] == [1, 2, 3, 4]
+        assert b" " not in lines[0]
+
+    def test_sampling(self):
+        stream = io.BytesIO()
+        capture = RequestCapture(stream, sample_rate=0.25, seed=1)
+        for i in range(1000):
+            capture.record({"i": i})
+        capture.flush()
+        assert 200 < capture.recorded < 300
+        assert len(stream.getvalue().splitlines()) == capture.recorded
+
+    def test_max_requests_and_close(self):
+        capture = RequestCapture(io.BytesIO(), max_requests=2)
+        assert [capture.record({}) for _ in range(3)] == [True, True, False]
+        capture.close()
+        assert not capture.record({})
+        assert capture.stats() == {"seen": 4, "recorded": 2, "skipped": 0}
+
+    def test_list_like_operands_and_unserializable(self):
+        stream = io.BytesIO()
+        capture = RequestCapture(stream)
+        assert capture.record({"id": {"IN": range(3)}, "x": {"IN": array.array("i", [4])}})
+        assert not capture.record({"id": {"=": object()}})
+        capture.flush()
+        assert json.loads(stream.getvalue()) == {"id": {"IN": [0, 1, 2]}, "x": {"IN": [4]}}
+        assert capture.skipped == 1
+
+    def test_buffering(self):
+        stream = io.BytesIO()
+        capture = RequestCapture(stream, buffer_size=40)
+        capture.record({"i": 1})
+        capture.record({"i": 2})
+        assert stream.getvalue() == b""
+        capture.record({"padding": "x" * 20})
+        assert stream.getvalue().count(b"\n") == 3
+        capture.record({"i": 3})
+        capture.close()
+        assert stream.getvalue().count(b"\n") == 4
+
+        unbuffered = io.BytesIO()
+        RequestCapture(unbuffered, buffer_size=0).record({"i": 1})
+        assert unbuffered.getvalue() == b'{"i":1}\n'
+        with pytest.raises(ValueError):
+            RequestCapture(io.BytesIO(), buffer_size=-1)
+
+    def test_concurrent_records(self):
+        stream = io.BytesIO()
+        capture = RequestCapture(stream, max_requests=500, buffer_size=100)
+        threads = [threading.Thread(target=lambda: [capture.record({"i": i})
+                                                    for i in range(200)])
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        capture.close()
+        assert capture.stats() == {"seen": 800, "recorded": 500, "skipped": 0}
+        assert len(stream.getvalue().splitlines()) == 500
+
+    def test_gzip_roundtrip(self, tmp_path):
+        path = str(tmp_path / "log.jsonl.gz")
+        with RequestCapture(path) as capture:
+            capture.record(select("users", 1))
+        assert load_requests(read_log(path)) == [select("users", 1)]
+
+    @pytest.mark.parametrize("options", [
+        {"sample_rate": 0}, {"sample_rate": 1.5}, {"max_requests": -1},
+    ])
+    def test_invalid(self, options):
+        with pytest.raises(ValueError):
+            RequestCapture(io.BytesIO(), **options)
+
+
+class TestSyntheticDatabase:
+    def test_tables_and_types(self, jsonsql, tmp_path):
+        path = str(tmp_path / "db.sqlite")
+        assert synthetic_database(path, jsonsql, rows=50, tables=["audit", "wst.users"]) == [
+            "audit", "roles", "users"]
+        connection = sqlite3.connect(path)
+        columns = connection.execute("PRAGMA table_info(users)").fetchall()
+        assert [(c[1], c[2]) for c in columns] == [
+            ("id", "INTEGER"), ("name", "TEXT"), ("role_id", "INTEGER"), ("score", "REAL")]
+        assert connection.execute("SELECT COUNT(*), MAX(id) FROM roles").fetchone() == (50, 49)
+
+    def test_existing_file(self, jsonsql, tmp_path):
+        path = str(tmp_path / "db.sqlite")
+        connection = sqlite3.connect(path)
+        connection.execute("CREATE TABLE users (keep INTEGER)")
+        connection.commit()
+        connection.close()
+        with pytest.raises(FileExistsError):
+            synthetic_database(path, jsonsql, rows=5)
+        connection = sqlite3.connect(path)
+        assert connection.execute("SELECT name FROM sqlite_master").fetchall() == [("users",)]
+        assert connection.execute("PRAGMA table_info(users)").fetchall()[0][1] == "keep"
+        connection.close()
+
+        assert synthetic_database(path, jsonsql, rows=5, overwrite=True) == ["roles", "users"]
+        connection = sqlite3.connect(path)
+        assert connection.execute("SELECT COUNT(*) FROM users").fetchone() == (5,)
+        connection.close()
+
+    def test_request_tables(self):
+        assert request_tables(JOINED) == {"users", "roles"}
+        assert request_tables({"table": "audit"}) == {"audit"}
+        assert request_tables([]) == set()
+
+
+class TestReplay:
+    def test_parse_only(self, jsonsql):
+        requests = load_requests([json.dumps(select("users", 3)).encode(),
+                                  json.dumps(select("admins", 3)).encode(), b"{nope"])
+        summary = replay(requests, jsonsql, concurrency=3, repeat=10)
+        assert (summary["requests"], summary["valid"], summary["rejected"]) == (30, 10, 20)
+        assert summary["reasons"] == {"table": 10, "json": 10}
+        assert summary["parse"].count == 20
+        assert summary["execute"] is None
+
+    def test_execute(self, jsonsql, tmp_path):
+        path = str(tmp_path / "db.sqlite")
+        synthetic_database(path, jsonsql, rows=100)
+        with ConnectionPool(path, size=2) as pool:
+            summary = replay([select("users", 10), JOINED], jsonsql, concurrency=2,
+                             pool=pool, repeat=5)
+        assert summary["errors"] == 5  # roles has no role_name column
+        assert summary["error_reasons"] == {"column": 5}
+        assert summary["execute"].count == 5
+        assert "execute latency" in format_report(summary)
+        json.dumps(report_json(summary))
+
+    def test_invalid_concurrency(self, jsonsql):
+        with pytest.raises(ValueError):
+            replay([select("users", 1)], jsonsql, concurrency=0)
+
+
+class TestLatencyHistogram:
+    def test_percentiles(self):
+        histogram = LatencyHistogram()
+        for micros in [3] * 90 + [300] * 9 + [20_000_000]:
+            histogram.add(micros / 1e6)
+        assert histogram.percentile(0.5) == 5
+        assert histogram.percentile(0.99) == 500
+        assert histogram.percentile(1.0) == pytest.approx(20_000_000)
+        assert histogram.to_dict()["buckets"] == {"<=5us": 90, "<=500us": 9, "inf": 1}
+
+    def test_merge(self):
+        first, second = LatencyHistogram(), LatencyHistogram()
+        first.add(1e-6)
+        second.add(1.0)
+        first.merge(second)
+        assert first.count == 2 and first.max == pytest.approx(1e6)
+
+
+def test_main(tmp_path, capsys):
+    config = tmp_path / "policy.json"
+    config.write_text(json.dumps(POLICY))
+    log = tmp_path / "log.jsonl"
+    log.write_text("\n".join(json.dumps(select(table, 5)) for table in ("users", "admins")))
+    assert main([str(log), "-c", str(config), "--execute", "--concurrency", "2",
+                 "--rows", "20", "--json"]) == 0
+    report = json.loads(capsys.readouterr().out)
+    assert report["valid"] == 1 and report["errors"] == 0
+    assert report["execute"]["count"] == 1
+    assert report["reasons"] == {"table": 1}
+
+
+def test_main_database(tmp_path, capsys):
+    config = tmp_path / "policy.json"
+    config.write_text(json.dumps(POLICY))
+    log = tmp_path / "log.jsonl"
+    log.write_text(json.dumps(select("users", 5)))
+    database = tmp_path / "existing.db"
+    database.write_bytes(b"not a replay database")
+    argv = [str(log), "-c", str(config), "--execute", "--rows", "5", "--json",
+            "--database", str(database)]
+    with pytest.raises(SystemExit):
+        main(argv)
+    assert "--overwrite" in capsys.readouterr().err
+    assert database.read_bytes() == b"not a replay database"
+
+    assert main(argv + ["--overwrite"]) == 0
+    assert json.loads(capsys.readouterr().out)["execute"]["count"] == 1
+    assert sqlite3.connect(str(database)).execute("SELECT COUNT(*) FROM users").fetchone() == (5,)
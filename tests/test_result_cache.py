@@ -0,0 +1,165 @@
+import sqlite3
+import time
+
+import pytest
+
+from src.jsonsql import ConnectionPool, JsonSQL, ResultCache
+
+
+@pytest.fixture
+def pool(tmp_path):
+    path = str(tmp_path / "app.db")
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE users (id INTEGER, name TEXT, role_id INTEGER)")
+    connection.execute("CREATE TABLE roles (id INTEGER, role_name TEXT)")
+    connection.execute("CREATE TABLE audit (id INTEGER)")
+    connection.executemany("INSERT INTO users VALUES (?, ?, ?)",
+                           [(i, f"user{i}", i % 2) for i in range(10)])
+    connection.executemany("INSERT INTO roles VALUES (?, ?)", [(0, "admin"), (1, "member")])
+    connection.commit()
+    connection.close()
+    with ConnectionPool(path) as pool:
+        yield pool
+
+
+@pytest.fixture
+def jsonsql():
+    return JsonSQL(
+        allowed_queries=["SELECT", "DELETE"],
+        allowed_items=["*", "u.name", "r.role_name"],
+        allowed_tables=["users", "roles", "audit"],
+        allowed_columns={"id": int, "name": str, "role_id": int, "u.id": int,
+                         "r.id": int, "u.role_id": int},
+        result_cache=ResultCache(),
+    )
+
+
+USERS = {"query": "SELECT", "items": ["*"], "from": "users", "where": {"id": {"<": 3}}}
+JOINED = {"query": "SELECT", "items": ["u.name", "r.role_name"],
+          "from": {"table": "users", "alias": "u"},
+          "joins": [{"table": "roles", "alias": "r", "on": "u.role_id = r.id"}],
+          "order_by": ["u.name"]}
+ROLES = {"query": "SELECT", "items": ["*"], "from": "roles"}
+AUDIT = {"query": "SELECT", "items": ["*"], "from": "audit"}
+
+
+def delete(table, where):
+    return {"query": "DELETE", "items": [], "from": table, "where": where}
+
+
+class TestResultCache:
+    def test_lru(self):
+        cache = ResultCache(capacity=2)
+        for key in "abc":
+            assert cache.put(key, None, [(key,)], ("t",), (0,))
+        assert cache.get("a") is None
+        assert cache.get("b") == (None, [("b",)])
+        assert cache.stats()["evictions"] == 1
+
+    def test_byte_budget(self):
+        cache = ResultCache(max_bytes=400)
+        cache.put("a", None, [("x" * 250,)], ("t",), (0,))
+        cache.put("b", None, [("y" * 250,)], ("t",), (0,))
+        assert cache.get("a") is None
+        assert cache.bytes <= 400
+        assert not cache.put("c", None, [("z" * 1000,)], ("t",), (0,))
+
+    def test_ttl(self):
+        cache = ResultCache(ttl=0.01)
+        cache.put("a", None, [(1,)], ("t",), (0,))
+        assert cache.get("a") is not None
+        time.sleep(0.02)
+        assert cache.get("a") is None
+        assert cache.stats()["expirations"] == 1
+
+    def test_compress(self):
+        plain, compressed = ResultCache(), ResultCache(compress=True)
+        rows = [(i, f"row {i % 10}", "same text") for i in range(1000)]
+        for cache in (plain, compressed):
+            cache.put("a", (("c",),), rows, ("t",), (0,))
+            assert cache.get("a") == ((("c",),), rows)
+        assert compressed.bytes < plain.bytes / 4
+
+    def test_invalidate_by_tag(self):
+        cache = ResultCache()
+        cache.put("a", None, [], ("users", "roles"), (0, 0))
+        cache.put("b", None, [], ("roles",), (0,))
+        cache.put("c", None, [], ("audit",), (0,))
+        assert cache.invalidate("users") == 1
+        assert cache.invalidate("roles") == 1
+        assert len(cache) == 1 and cache.get("c") is not None
+
+    def test_table_names_normalized(self):
+        cache = ResultCache()
+        cache.put("a", None, [], ("wst.users",), cache.generation(("wst.users",)))
+        cache.put("b", None, [], ('"Users"', "roles"), cache.generation(('"Users"', "roles")))
+        assert cache.invalidate("users") == 2
+        generation = cache.generation(("main.roles",))
+        cache.invalidate("ROLES")
+        assert not cache.put("c", None, [], ("roles",), generation)
+
+    def test_stale_put_refused(self):
+        cache = ResultCache()
+        generation = cache.generation(("users",))
+        cache.invalidate("users")
+        assert not cache.put("a", None, [], ("users",), generation)
+
+    def test_max_rows(self):
+        cache = ResultCache(max_rows=2)
+        assert not cache.put("a", None, [(1,), (2,), (3,)], ("t",), (0,))
+
+    @pytest.mark.parametrize("options", [
+        {"capacity": -1}, {"max_bytes": "1"}, {"ttl": 0}, {"max_rows": True},
+    ])
+    def test_invalid(self, options):
+        with pytest.raises(ValueError):
+            ResultCache(**options)
+
+    def test_key(self):
+        assert ResultCache.key("db", "sql", {"p2": 2, "p1": 1}) == ResultCache.key(
+            "db", "sql", {"p1": 1, "p2": 2})
+        assert ResultCache.key("db", "sql", ([1, 2],)) is None
+
+
+class TestExecuteCache:
+    def test_hit(self, jsonsql, pool):
+        first = list(jsonsql.execute(USERS, pool))
+        pool.close()  # a hit needs no connection
+        assert list(jsonsql.execute(USERS, pool)) == first
+        assert jsonsql.result_cache.stats()["hits"] == 1
+
+    def test_partial_read_not_cached(self, jsonsql, pool):
+        rows = jsonsql.execute(USERS, pool, batch_size=1)
+        next(rows)
+        rows.close()
+        assert len(jsonsql.result_cache) == 0
+
+    def test_write_invalidates_dependents(self, jsonsql, pool):
+        for request in (USERS, JOINED, ROLES, AUDIT):
+            list(jsonsql.execute(request, pool))
+        assert len(jsonsql.result_cache) == 4
+
+        list(jsonsql.execute(delete("users", {"id": {"=": 0}}), pool))
+        assert len(jsonsql.result_cache) == 2
+        assert [row[0] for row in jsonsql.execute(USERS, pool)] == [1, 2]
+        assert len(list(jsonsql.execute(JOINED, pool))) == 9
+        assert jsonsql.result_cache.stats()["hits"] == 0
+
+        list(jsonsql.execute(delete("roles", {"id": {"=": 1}}), pool))
+        assert len(list(jsonsql.execute(JOINED, pool))) == 4
+        list(jsonsql.execute(AUDIT, pool))
+        assert jsonsql.result_cache.stats()["hits"] == 1
+
+    def test_page_and_export_use_cache(self, jsonsql, pool):
+        request = {**USERS, "order_by": ["id"], "limit": 2}
+        assert jsonsql.page(request, pool) == jsonsql.page(request, pool)
+        first = b"".join(jsonsql.export(USERS, pool))
+        assert b"".join(jsonsql.export(USERS, pool)) == first
+        assert first.startswith(b'{"id":0,"name":"user0","role_id":0}')
+        assert jsonsql.result_cache.stats()["hits"] == 2
+
+    def test_disabled_by_default(self, pool):
+        jsonsql = JsonSQL(allowed_queries=["SELECT"], allowed_items=["*"],
+                          allowed_tables=["users"], allowed_columns={"id": int})
+        assert jsonsql.result_cache is None
+        assert len(list(jsonsql.execute(USERS, pool))) == 3
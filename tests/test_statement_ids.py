@@ -0,0 +1,69 @@
+import pytest
+
+from src.jsonsql import JsonSQL
+
+
+def request(ids: list) -> dict:
+    return {
+        "query": "SELECT",
+        "items": ["*"],
+        "table": "users",
+        "connection": "WHERE",
+        "logic": {"id": {"IN": ids}},
+    }
+
+
+class TestInListPadding:
+    def test_disabled_by_default(self, make_jsonsql):
+        jsonsql = make_jsonsql()
+        result, sql, params = jsonsql.logic_parse({"id": {"IN": [1, 2, 3]}})
+        assert sql == "id IN (?,?,?)"
+        assert params == (1, 2, 3)
+
+    def test_repeat(self, make_jsonsql):
+        jsonsql = make_jsonsql(in_list_padding="repeat")
+        result, sql, params = jsonsql.logic_parse({"id": {"IN": [1, 2, 3]}})
+        assert sql == "id IN (?,?,?,?)"
+        assert params == (1, 2, 3, 3)
+
+    def test_null(self, make_jsonsql):
+        jsonsql = make_jsonsql(in_list_padding="null")
+        result, sql, params = jsonsql.sql_parse(request([1, 2, 3, 4, 5]))
+        assert sql == "SELECT * FROM users WHERE id IN (?,?,?,?,?,?,?,?)"
+        assert params == (1, 2, 3, 4, 5, None, None, None)
+
+    def test_bounded_sql_texts(self, make_jsonsql):
+        jsonsql = make_jsonsql(in_list_padding="repeat")
+        texts = {jsonsql.sql_parse(request(list(range(1, n))))[1]
+                 for n in range(2, 130)}
+        assert len(texts) == 8
+
+    def test_cached_template_keeps_padding(self, make_jsonsql):
+        jsonsql = make_jsonsql(in_list_padding="repeat")
+        jsonsql.logic_parse({"id": {"IN": [1, 2, 3]}})
+        result = jsonsql.logic_parse({"id": {"IN": [4, 5, 6]}})
+        assert result == (True, "id IN (?,?,?,?)", (4, 5, 6, 6))
+        assert jsonsql.template_cache.hits == 1
+
+    def test_invalid_mode(self, make_jsonsql):
+        with pytest.raises(ValueError):
+            make_jsonsql(in_list_padding="zero")
+
+
+class TestStatementId:
+    def test_stable_and_distinct(self, make_jsonsql):
+        jsonsql = make_jsonsql()
+        first = jsonsql.sql_parse(request([1, 2]), with_id=True)
+        second = jsonsql.sql_parse(request([3, 4]), with_id=True)
+        third = jsonsql.sql_parse(request([3, 4, 5]), with_id=True)
+        assert len(first) == 4
+        assert first[3] == second[3]
+        assert first[3] != third[3]
+        assert first[3] == JsonSQL.statement_id(first[1])
+        assert len(first[3]) == 16
+
+    def test_failure(self, make_jsonsql):
+        jsonsql = make_jsonsql()
+        result = jsonsql.sql_parse({"query": "DROP", "items": ["*"]}, with_id=True)
+        assert result[0] is False
+        assert result[2:] == ((), None)
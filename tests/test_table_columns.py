@@ -0,0 +1,117 @@
+import pytest
+
+from src.jsonsql import JsonSQL
+from src.jsonsql.metrics import rejection_reason
+from src.jsonsql.policy import ColumnScope
+
+
+@pytest.fixture
+def jsonsql():
+    return JsonSQL(
+        allowed_queries=["SELECT"],
+        allowed_items=["*"],
+        allowed_tables=[{"users": ["id", "name", "role_id"]}, "roles",
+                        {"wst.images": ["userID", "creature"]}, {"logs": []}],
+        allowed_connections=["WHERE"],
+        allowed_columns={"*": object, "id": int, "userID": int},
+    )
+
+
+def select(items, table="users", **clauses):
+    return {"query": "SELECT", "items": items, "from": table, **clauses}
+
+
+JOINED = {"from": {"table": "users", "alias": "u"},
+          "joins": [{"table": "roles", "alias": "r", "on": "u.role_id = r.id"}]}
+
+
+class TestSingleTable:
+    @pytest.mark.parametrize("items", [["id", "name"], ["users.id"], ["COUNT(*)"],
+                                       ["MAX(id)"], ["count( name )"]])
+    def test_allowed_items(self, jsonsql, items):
+        assert jsonsql.sql_parse(select(items))[0]
+
+    @pytest.mark.parametrize("item", ["*", "password", "users.password", "users.*",
+                                      "MAX(password)", "x.id", "LOWER(name)"])
+    def test_rejected_items(self, jsonsql, item):
+        assert jsonsql.sql_parse(select([item])) == (False, f"Column not allowed: {item}", ())
+
+    def test_clauses(self, jsonsql):
+        assert jsonsql.sql_parse(select(["id"], where={"name": {"=": "x"}},
+                                        order_by=["id"], group_by=["role_id"]))[0]
+        for clauses, column in (({"where": {"password": {"=": "x"}}}, "password"),
+                                ({"where": {"id": {">": {"MAX": "password"}}}}, "password"),
+                                ({"having": {"password": {"=": 1}}}, "password"),
+                                ({"group_by": ["password"]}, "password"),
+                                ({"order_by": [{"column": "password"}]}, "password")):
+            assert jsonsql.sql_parse(select(["id"], **clauses)) == (
+                False, f"Column not allowed: {column}", ())
+
+    def test_legacy_format(self, jsonsql):
+        request = {"query": "SELECT", "items": ["userID"], "table": "wst.images",
+                   "connection": "WHERE", "logic": {"creature": {"=": "owlbear"}}}
+        assert jsonsql.sql_parse(request)[0]
+        request["logic"] = {"imageID": {"=": "x"}}
+        assert jsonsql.sql_parse(request) == (False, "Column not allowed: imageID", ())
+        assert jsonsql.sql_parse({**request, "items": ["*"]})[1] == "Column not allowed: *"
+
+    @pytest.mark.parametrize("table", ["roles", "logs"])
+    def test_unrestricted_tables(self, jsonsql, table):
+        assert jsonsql.sql_parse(select(["*", "anything"], table,
+                                        where={"secret": {"=": 1}}))[0]
+
+    def test_schema_qualified_table(self, jsonsql):
+        for item in ("wst.images.userID", "images.creature", "creature"):
+            assert jsonsql.sql_parse(select([item], "wst.images"))[0]
+        assert not jsonsql.sql_parse(select(["images.imageID"], "wst.images"))[0]
+
+
+class TestJoins:
+    @pytest.mark.parametrize("items", [["u.name", "r.role_name"], ["r.*"], ["name"]])
+    def test_allowed(self, jsonsql, items):
+        assert jsonsql.sql_parse(select(items, **JOINED))[0]
+
+    @pytest.mark.parametrize("item", ["u.password", "users.name", "role_name", "u.*", "*"])
+    def test_rejected(self, jsonsql, item):
+        # users is only known by its alias; a bare column could come from users
+        assert jsonsql.sql_parse(select([item], **JOINED)) == (
+            False, f"Column not allowed: {item}", ())
+
+    def test_on_condition(self, jsonsql):
+        request = select(["u.id"], **JOINED)
+        request["joins"] = [{"table": "roles", "alias": "r", "on": "u.password = r.id"}]
+        assert jsonsql.sql_parse(request) == (False, "Column not allowed: u.password", ())
+
+    def test_two_restricted_tables(self, jsonsql):
+        request = select(["u.id", "i.creature"], **JOINED)
+        request["joins"] = [{"table": "wst.images", "alias": "i", "on": "u.id = i.userID"}]
+        assert jsonsql.sql_parse(request)[0]
+        # A bare column must be allowed by both
+        assert not jsonsql.sql_parse({**request, "items": ["name"]})[0]
+
+    def test_reason(self, jsonsql):
+        result = jsonsql.sql_parse(select(["u.password"], **JOINED))
+        assert rejection_reason(result[1]) == "column"
+
+
+class TestColumnScope:
+    def test_resolve(self):
+        scope = ColumnScope([("users", "u", frozenset({"id", "name"})),
+                             ("roles", None, None), ("wst.images", None, frozenset({"id"}))])
+        assert scope.resolve("u.name") == ("users", "name")
+        assert scope.resolve("roles.anything") == ("roles", "anything")
+        assert scope.resolve("images.id") == ("wst.images", "id")
+        assert scope.resolve("id") == (None, "id")
+        assert scope.resolve("name") is None
+        assert scope.resolve("users.id") is None
+        assert scope.resolve(3) is None
+
+    def test_single_table(self):
+        scope = ColumnScope([("users", None, frozenset({"id"}))])
+        assert scope.resolve("id") == ("users", "id")
+
+    def test_policy_index(self, jsonsql):
+        assert dict(jsonsql.policy.table_columns) == {
+            "users": frozenset({"id", "name", "role_id"}),
+            "wst.images": frozenset({"userID", "creature"})}
+        assert jsonsql.policy.scope([("roles", None), ("logs", "l")]) is None
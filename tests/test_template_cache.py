@@ -0,0 +1,119 @@
+import pytest
+
+from src.jsonsql import JsonSQL
+from src.jsonsql.cache import TemplateCache, Uncacheable, fingerprint
+
+
+@pytest.fixture
+def jsonsql() -> JsonSQL:
+    return JsonSQL(
+        allowed_queries=["SELECT"],
+        allowed_items=["*"],
+        allowed_tables=["users"],
+        allowed_connections=["WHERE"],
+        allowed_columns={"id": int, "name": str, "nickname": str},
+    )
+
+
+def request(logic: dict) -> dict:
+    return {
+        "query": "SELECT",
+        "items": ["*"],
+        "table": "users",
+        "connection": "WHERE",
+        "logic": logic,
+    }
+
+
+class TestTemplateCache:
+    def test_lru_eviction(self):
+        cache = TemplateCache(2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        assert cache.get("a") == 1
+        cache.put("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.stats() == {
+            "hits": 2, "misses": 1, "evictions": 1, "size": 2, "capacity": 2}
+
+    def test_zero_capacity_disables(self):
+        cache = TemplateCache(0)
+        cache.put("a", 1)
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+    def test_invalid_capacity(self):
+        with pytest.raises(ValueError):
+            TemplateCache(-1)
+
+    def test_fingerprint_tags_types(self):
+        assert fingerprint(1) != fingerprint(True) != fingerprint(1.0)
+        assert fingerprint([1, 2]) != fingerprint({"1": 2})
+        assert fingerprint({"a": 1, "b": 2}) != fingerprint({"b": 2, "a": 1})
+        assert fingerprint(["a", "b"]) == fingerprint(["a", "b"])
+
+    def test_fingerprint_rejects_other_objects(self):
+        with pytest.raises(Uncacheable):
+            fingerprint([object()])
+
+
+class TestSqlParseCache:
+    def test_hit_on_different_literals(self, jsonsql: JsonSQL):
+        first = jsonsql.sql_parse(request({"id": {"=": 123}}))
+        second = jsonsql.sql_parse(request({"id": {"=": 456}}))
+        assert first == (True, "SELECT * FROM users WHERE id = ?", (123,))
+        assert second == (True, "SELECT * FROM users WHERE id = ?", (456,))
+        assert jsonsql.template_cache.hits == 1
+        assert jsonsql.template_cache.misses == 1
+
+    def test_in_list_length_is_part_of_shape(self, jsonsql: JsonSQL):
+        jsonsql.sql_parse(request({"id": {"IN": [1, 2]}}))
+        result = jsonsql.sql_parse(request({"id": {"IN": [1, 2, 3]}}))
+        assert result == (True, "SELECT * FROM users WHERE id IN (?,?,?)", (1, 2, 3))
+        assert jsonsql.template_cache.hits == 0
+
+    def test_with_values_on_hit(self, jsonsql: JsonSQL):
+        jsonsql.sql_parse(request({"name": {"=": "a"}}))
+        result = jsonsql.sql_parse(request({"name": {"=": "O'Neil"}}), with_values=True)
+        assert result == (True, "SELECT * FROM users WHERE name = 'O''Neil'", ())
+        assert jsonsql.template_cache.hits == 1
+
+    def test_rejections_not_cached(self, jsonsql: JsonSQL):
+        bad = {"query": "SELECT", "items": ["*"], "table": "admins"}
+        assert jsonsql.sql_parse(bad)[0] is False
+        assert jsonsql.sql_parse(bad)[0] is False
+        assert len(jsonsql.template_cache) == 0
+
+    def test_policy_change_clears_cache(self, jsonsql: JsonSQL):
+        jsonsql.sql_parse(request({"id": {"=": 1}}))
+        jsonsql.ALLOWED_TABLES = {"orders": []}
+        result = jsonsql.sql_parse(request({"id": {"=": 2}}))
+        assert result[0] is False
+        assert "users" in result[1]
+
+    def test_disabled(self):
+        jsonsql = JsonSQL(["SELECT"], ["*"], ["users"], ["WHERE"], {"id": int},
+                          template_cache_size=0)
+        jsonsql.sql_parse(request({"id": {"=": 1}}))
+        jsonsql.sql_parse(request({"id": {"=": 2}}))
+        assert jsonsql.template_cache.stats()["size"] == 0
+
+
+class TestLogicParseCache:
+    def test_hit_on_different_literals(self, jsonsql: JsonSQL):
+        jsonsql.logic_parse({"AND": [{"id": {"=": 1}}, {"name": {"=": "a"}}]})
+        result = jsonsql.logic_parse({"AND": [{"id": {"=": 2}}, {"name": {"=": "b"}}]})
+        assert result == (True, "(id = ? AND name = ?)", (2, "b"))
+        assert jsonsql.template_cache.hits == 1
+
+    def test_type_change_is_revalidated(self, jsonsql: JsonSQL):
+        assert jsonsql.logic_parse({"id": {"=": 1}})[0] is True
+        assert jsonsql.logic_parse({"id": {"=": "one"}}) == (
+            False, "Bad id, non <class 'int'>")
+
+    def test_column_reference_not_confused_with_literal(self, jsonsql: JsonSQL):
+        assert jsonsql.logic_parse({"name": {"=": "nickname"}}) == (
+            True, "name = nickname", ())
+        assert jsonsql.logic_parse({"name": {"=": "bob"}}) == (
+            True, "name = ?", ("bob",))
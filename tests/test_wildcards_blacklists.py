@@ -193,11 +193,11 @@ class TestBlacklistSupport:
         result, sql, params = jsonsql.sql_parse(input_data)
         assert result is True
 
-        # Should deny blacklisted column (but current library doesn't support this)
+        # Should deny blacklisted column
         input_data["logic"] = {"password": {"=": "secret"}}
         result, msg, params = jsonsql.sql_parse(input_data)
-        # NOTE: Current library doesn't implement column blacklisting in WHERE clauses
-        assert result is True  # Blacklist doesn't work yet
+        assert result is False
+        assert msg == "Invalid Input - password"
 
 
 class TestStrictModeDefault:
@@ -0,0 +1,70 @@
+import pytest
+
+from src.jsonsql import JsonSQL
+
+
+def request(logic: dict) -> dict:
+    return {
+        "query": "SELECT",
+        "items": ["*"],
+        "table": "users",
+        "connection": "WHERE",
+        "logic": logic,
+    }
+
+
+class TestWithValues:
+    def test_bool_renders_as_boolean(self, make_jsonsql):
+        jsonsql = make_jsonsql()
+        assert jsonsql.sql_parse(request({"active": {"=": True}}), with_values=True)[1] == \
+            "SELECT * FROM users WHERE active = TRUE"
+        assert jsonsql.sql_parse(request({"active": {"=": False}}), with_values=True)[1] == \
+            "SELECT * FROM users WHERE active = FALSE"
+
+    @pytest.mark.parametrize("value, literal", [
+        (None, "NULL"),
+        (7, "7"),
+        (2.5, "2.5"),
+        ("O'Neil", "'O''Neil'"),
+        (b"raw", "'b''raw'''"),
+    ])
+    def test_literals(self, value, literal, make_jsonsql):
+        jsonsql = make_jsonsql()
+        result = jsonsql.sql_parse(request({"note": {"=": value}}), with_values=True)
+        assert result == (True, f"SELECT * FROM users WHERE note = {literal}", ())
+
+    def test_placeholder_inside_value_is_kept(self, make_jsonsql):
+        jsonsql = make_jsonsql()
+        logic = {"AND": [{"name": {"=": "who?"}}, {"id": {"=": 1}}]}
+        assert jsonsql.sql_parse(request(logic), with_values=True)[1] == \
+            "SELECT * FROM users WHERE (name = 'who?' AND id = 1)"
+
+    @pytest.mark.parametrize("paramstyle", ["numeric", "named", "format", "pyformat", "dollar"])
+    def test_paramstyles(self, paramstyle, make_jsonsql):
+        jsonsql = make_jsonsql(paramstyle=paramstyle)
+        logic = {"AND": [{"name": {"=": "50% :1 $1 %s"}}, {"id": {"IN": [1, 2]}}]}
+        assert jsonsql.sql_parse(request(logic), with_values=True)[1] == \
+            "SELECT * FROM users WHERE (name = '50% :1 $1 %s' AND id IN (1,2))"
+
+    @pytest.mark.parametrize("paramstyle", ["qmark", "numeric", "named", "format", "pyformat",
+                                            "dollar"])
+    def test_placeholder_inside_join_literal(self, paramstyle):
+        jsonsql = JsonSQL(["SELECT"], ["*"], ["users", "roles"], ["WHERE"],
+                          {"u.id": int, "u.a": int, "r.a": int, "r.t": str},
+                          allowed_joins=["INNER JOIN"], paramstyle=paramstyle)
+        result = jsonsql.sql_parse({
+            "query": "SELECT",
+            "items": ["*"],
+            "from": {"table": "users", "alias": "u"},
+            "joins": [{"type": "INNER JOIN", "table": "roles", "alias": "r",
+                       "on": "u.a = r.a AND r.t = '10:30?%s $1 :p1'"}],
+            "where": {"u.id": {"=": 1}},
+        }, with_values=True)
+        assert result == (True, "SELECT * FROM users AS u INNER JOIN roles AS r ON "
+                          "u.a = r.a AND r.t = '10:30?%s $1 :p1' WHERE u.id = 1", ())
+
+    def test_large_in_list(self, make_jsonsql):
+        jsonsql = make_jsonsql()
+        ids = list(range(5000))
+        sql = jsonsql.sql_parse(request({"id": {"IN": ids}}), with_values=True)[1]
+        assert sql == f"SELECT * FROM users WHERE id IN ({','.join(map(str, ids))})"